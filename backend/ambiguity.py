@@ -0,0 +1,152 @@
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from models import AmbiguityMatch
+
+
+AMBIGUOUS_PHRASES = [
+    "user-friendly", "easy to use", "fast", "secure", "reliable",
+    "good performance", "nice to have", "should be", "might need",
+    "probably", "maybe", "as needed", "when possible", "if required"
+]
+
+VAGUE_QUANTIFIERS = [
+    "a lot", "some", "many", "few", "several", "most", "often",
+    "rarely", "sometimes", "usually", "generally"
+]
+
+MISSING_DETAILS = [
+    "etc", "and so on", "among others", "for example", "such as"
+]
+
+CATEGORIES = [
+    ("ambiguous_term", AMBIGUOUS_PHRASES, "Ambiguous term detected: '{}' - needs specific definition"),
+    ("vague_quantifier", VAGUE_QUANTIFIERS, "Vague quantifier detected: '{}' - needs specific numbers"),
+    ("incomplete_specification", MISSING_DETAILS, "Incomplete specification detected: '{}' - needs complete list"),
+]
+
+
+
+def _trie_pattern(phrases) -> str:
+    """Build a regex alternation with shared prefixes factored out (longest match wins)"""
+    trie: dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in " ".join(phrase.split()):
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        group = "(?:" + "|".join(branches) + ")"
+        # Optional continuation is greedy, so longer phrases are preferred
+        return group + "?" if "" in node else group
+
+    return build(trie)
+
+
+# Words whose absence is itself an ambiguity; matched in the same pass as the phrases
+ROLE_WORDS = {
+    "actor": ["user", "customer", "admin", "manager", "employee", "client"],
+    "success": ["success", "complete", "done", "finish", "achieve"],
+}
+
+
+class AmbiguityDetector:
+    """Single-pass matcher for ambiguous wording in raw notes
+
+    All phrases, plus the actor and success-criteria words, are compiled once
+    into one trie-shaped alternation with word boundaries, so "some" no longer
+    matches inside "handsome" and the notes are scanned only once. Each phrase
+    belongs to exactly one category; quantifiers like "some" or "many" are
+    reported as vague quantifiers only.
+    """
+
+    def __init__(self, categories: List[Tuple[str, List[str], str]] = CATEGORIES,
+                 role_words: Dict[str, List[str]] = ROLE_WORDS):
+        # phrase -> (category order, phrase order, category, message); category is None for role words
+        self._entries: Dict[str, Tuple[int, int, Optional[str], Optional[str]]] = {}
+        for category_order, (category, phrases, template) in enumerate(categories):
+            for phrase_order, phrase in enumerate(phrases):
+                self._entries.setdefault(phrase, (category_order, phrase_order, category, template.format(phrase)))
+
+        # phrase -> roles it satisfies ("user-friendly" still names a user)
+        self._roles: Dict[str, Set[str]] = {}
+        for role, words in role_words.items():
+            for word in words:
+                self._entries.setdefault(word, (len(categories), 0, None, None))
+                for phrase in self._entries:
+                    if re.search(rf"\b{re.escape(word)}\b", phrase):
+                        self._roles.setdefault(phrase, set()).add(role)
+
+        # Phrases are compiled as a character trie so the engine tries one branch per
+        # leading character instead of every phrase at every position. Matching runs
+        # on lowercased text so the pattern doesn't need IGNORECASE.
+        body = _trie_pattern(self._entries)
+        self._pattern = re.compile(rf"(?<!\w){body}(?!\w)")
+        self._fallback_pattern = re.compile(rf"(?<!\w){body}(?!\w)", re.IGNORECASE)
+
+    def _scan(self, content: str, lowered: str) -> Tuple[List[AmbiguityMatch], Set[str]]:
+        if len(lowered) == len(content):
+            matches = self._pattern.finditer(lowered)
+        else:
+            # Lowercasing changed offsets (rare Unicode case); match the original text instead
+            matches = self._fallback_pattern.finditer(content)
+
+        positions: Dict[str, List[int]] = {}
+        for match in matches:
+            phrase = match.group()
+            if phrase not in self._entries:
+                # Multi-word phrase spread over other whitespace
+                phrase = " ".join(phrase.lower().split())
+            positions.setdefault(phrase, []).append(match.start())
+
+        roles = set()
+        for phrase in positions:
+            roles.update(self._roles.get(phrase, ()))
+
+        # Report in category and list order, independent of where phrases appear
+        ordered = sorted((phrase for phrase in positions if self._entries[phrase][2] is not None),
+                         key=lambda phrase: self._entries[phrase][:2])
+        found = [
+            AmbiguityMatch(
+                phrase=phrase,
+                category=self._entries[phrase][2],
+                message=self._entries[phrase][3],
+                positions=positions[phrase]
+            )
+            for phrase in ordered
+        ]
+        return found, roles
+
+    def find(self, content: str) -> List[AmbiguityMatch]:
+        """Return every detected phrase with the start offsets of its occurrences"""
+        return self._scan(content, content.lower())[0]
+
+    def analyze(self, content: str) -> Tuple[List[str], List[AmbiguityMatch]]:
+        """Return human-readable ambiguity flags together with the phrase matches behind them"""
+        matches, roles = self._scan(content, content.lower())
+        ambiguities = [match.message for match in matches]
+
+        # Check for missing actors
+        if "actor" not in roles:
+            ambiguities.append("No clear user roles identified - specify who will use the system")
+
+        # Check for missing success criteria
+        if "success" not in roles:
+            ambiguities.append("No clear success criteria defined - specify what constitutes completion")
+
+        return ambiguities, matches
+
+    def detect(self, content: str) -> List[str]:
+        """Return human-readable ambiguity flags for the notes"""
+        return self.analyze(content)[0]
+
+
+# Built once at import and shared by every request
+default_detector = AmbiguityDetector()
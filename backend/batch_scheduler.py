@@ -0,0 +1,147 @@
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Set
+
+from models import (
+    BatchJob, BatchJobStatus, BatchItemResult, BatchItemStatus,
+    TransformRequest, TransformResponse
+)
+
+
+class TokenBucket:
+    """Async token bucket that refills continuously up to ``capacity`` per minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.rate = per_minute / 60.0
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1):
+        """Wait until ``amount`` tokens are available and take them"""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+
+def estimate_tokens(request: TransformRequest, completion_tokens: int) -> int:
+    """Rough token cost of a transform: ~4 characters per prompt token plus the completion budget"""
+    prompt_chars = len(request.notes.content) + len(request.notes.context or "")
+    return prompt_chars // 4 + completion_tokens
+
+
+def expired_jobs(jobs: Mapping[str, Any], max_finished: int, ttl: float) -> List[str]:
+    """Ids of finished jobs to forget
+
+    Running jobs are always kept. Finished jobs are kept for ``ttl`` seconds,
+    and only the ``max_finished`` that finished last.
+    """
+    cutoff = datetime.now() - timedelta(seconds=ttl)
+    finished = sorted((job for job in jobs.values() if job.finished_at is not None),
+                      key=lambda job: job.finished_at)
+    excess = len(finished) - max_finished
+    return [job.id for i, job in enumerate(finished) if i < excess or job.finished_at < cutoff]
+
+
+class BatchScheduler:
+    """Runs batch transform jobs with bounded concurrency, rate limits and retries
+
+    A batch holds at most ``max_items`` requests. Finished jobs, with their
+    results, are dropped after ``job_ttl`` seconds or once more than
+    ``max_finished_jobs`` have finished since.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[TransformRequest], Awaitable[TransformResponse]],
+        concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_base_delay: Optional[float] = None,
+        completion_tokens: int = 4000,
+        max_items: Optional[int] = None,
+        max_finished_jobs: Optional[int] = None,
+        job_ttl: Optional[float] = None
+    ):
+        self.process = process
+        self.concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "4"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("BATCH_MAX_RETRIES", "3"))
+        self.retry_base_delay = (retry_base_delay if retry_base_delay is not None
+                                 else float(os.getenv("BATCH_RETRY_BASE_DELAY", "1.0")))
+        self.completion_tokens = completion_tokens
+        self.max_items = max_items or int(os.getenv("BATCH_MAX_ITEMS", "100"))
+        self.max_finished_jobs = (max_finished_jobs if max_finished_jobs is not None
+                                  else int(os.getenv("BATCH_MAX_FINISHED_JOBS", "100")))
+        self.job_ttl = job_ttl if job_ttl is not None else float(os.getenv("BATCH_JOB_TTL", "3600"))
+        self.request_bucket = TokenBucket(requests_per_minute or float(os.getenv("BATCH_REQUESTS_PER_MINUTE", "60")))
+        self.token_bucket = TokenBucket(tokens_per_minute or float(os.getenv("BATCH_TOKENS_PER_MINUTE", "200000")))
+
+        self.jobs: Dict[str, BatchJob] = {}
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        # Keep references so running jobs aren't garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, requests: List[TransformRequest]) -> BatchJob:
+        """Register a job and start working through it in the background"""
+        if len(requests) > self.max_items:
+            raise ValueError(f"A batch holds at most {self.max_items} requests, got {len(requests)}")
+        for job_id in expired_jobs(self.jobs, self.max_finished_jobs, self.job_ttl):
+            del self.jobs[job_id]
+        job = BatchJob(
+            total=len(requests),
+            items=[BatchItemResult(index=i) for i in range(len(requests))]
+        )
+        self.jobs[job.id] = job
+        task = asyncio.create_task(self._run_job(job, requests))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self.jobs.get(job_id)
+
+    async def _run_job(self, job: BatchJob, requests: List[TransformRequest]):
+        job.status = BatchJobStatus.RUNNING
+        await asyncio.gather(*(
+            self._run_item(job, item, request) for item, request in zip(job.items, requests)
+        ))
+        job.status = BatchJobStatus.COMPLETED
+        job.finished_at = datetime.now()
+
+    async def _run_item(self, job: BatchJob, item: BatchItemResult, request: TransformRequest):
+        while True:
+            await self.request_bucket.acquire()
+            await self.token_bucket.acquire(estimate_tokens(request, self.completion_tokens))
+            try:
+                async with self._semaphore:
+                    item.status = BatchItemStatus.RUNNING
+                    item.attempts += 1
+                    result = await self.process(request)
+                if not result.user_stories:
+                    raise RuntimeError("No user stories generated")
+                item.result = result
+                item.error = None
+                item.status = BatchItemStatus.SUCCEEDED
+                job.completed += 1
+                return
+            except Exception as e:
+                item.error = str(e)
+                if item.attempts > self.max_retries:
+                    item.status = BatchItemStatus.FAILED
+                    job.failed += 1
+                    return
+                # Exponential backoff before the next attempt, without holding a slot
+                await asyncio.sleep(self.retry_base_delay * 2 ** (item.attempts - 1))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled ambiguity matcher against the previous per-phrase scan.
+
+    python bench_ambiguity.py --sizes 100000 1000000
+"""
+
+import argparse
+import random
+import re
+import time
+
+from ambiguity import AMBIGUOUS_PHRASES, VAGUE_QUANTIFIERS, MISSING_DETAILS, default_detector
+
+
+NEUTRAL_WORDS = (
+    "the a of to and in we need customer checkout payment order report dashboard "
+    "export invoice team handsome breakfast"
+).split()
+AMBIGUOUS_WORDS = ["fast", "some", "many", "etc", "should be", "a lot"]
+
+
+def legacy_detect(content: str):
+    """The original implementation: one substring scan per phrase"""
+    ambiguities = []
+    content = content.lower()
+    for phrase in AMBIGUOUS_PHRASES + ["some", "few", "many", "several"]:
+        if phrase in content:
+            ambiguities.append(phrase)
+    for quantifier in VAGUE_QUANTIFIERS:
+        if quantifier in content:
+            ambiguities.append(quantifier)
+    for detail in MISSING_DETAILS:
+        if detail in content:
+            ambiguities.append(detail)
+    re.search(r'\b(user|customer|admin|manager|employee|client)\b', content)
+    re.search(r'\b(success|complete|done|finish|achieve)\b', content)
+    return ambiguities
+
+
+def make_notes(size: int) -> str:
+    rng = random.Random(size)
+    words = []
+    length = 0
+    while length < size:
+        # Roughly 3% of words are ambiguous, like typical meeting notes
+        word = rng.choice(AMBIGUOUS_WORDS) if rng.random() < 0.03 else rng.choice(NEUTRAL_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def timed(fn, content: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(content)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 4_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>10}  {'legacy':>10}  {'compiled':>10}  {'compiled MB/s':>14}")
+    for size in args.sizes:
+        content = make_notes(size)
+        legacy = timed(legacy_detect, content, args.repeat)
+        compiled = timed(default_detector.analyze, content, args.repeat)
+        print(f"{size:>10,}  {legacy * 1000:>8.1f}ms  {compiled * 1000:>8.1f}ms  "
+              f"{size / compiled / 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
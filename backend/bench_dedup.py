@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the near-duplicate index: insert rate, lookup latency, recall on
+lightly edited copies and false positives on unrelated stories.
+
+    python bench_dedup.py --stories 100000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from dedup import DuplicateIndex
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+
+
+def make_vocabulary(rng: random.Random, size: int):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def make_story(rng: random.Random, vocabulary) -> UserStory:
+    words = lambda count: " ".join(rng.choice(vocabulary) for _ in range(count))
+    return UserStory.model_validate({
+        **SAMPLE_STORIES[0],
+        "title": f"As a {words(1)}, I want {words(6)} so that {words(5)}",
+        "description": words(20)
+    })
+
+
+def edited_copy(rng: random.Random, story: UserStory, vocabulary) -> UserStory:
+    """Replace one description word, the kind of drift repeated transforms produce"""
+    words = story.description.split()
+    words[rng.randrange(len(words))] = rng.choice(vocabulary)
+    return story.model_copy(update={"id": f"copy-{story.id}", "description": " ".join(words)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    stories = [make_story(rng, vocabulary) for _ in range(args.stories)]
+
+    index = DuplicateIndex(threshold=args.threshold)
+    started = time.perf_counter()
+    for story in stories:
+        index.put(story)
+    insert_time = time.perf_counter() - started
+
+    # Memory is measured on a second build; tracemalloc would distort the insert timing
+    tracemalloc.start()
+    traced = DuplicateIndex(threshold=args.threshold)
+    baseline = tracemalloc.get_traced_memory()[0]
+    for story in stories:
+        traced.put(story)
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del traced
+
+    copies = [edited_copy(rng, story, vocabulary) for story in rng.sample(stories, args.lookups)]
+    unrelated = [make_story(rng, vocabulary) for _ in range(args.lookups)]
+
+    latencies = []
+    found = 0
+    for copy in copies:
+        started = time.perf_counter()
+        match = index.find(copy)
+        latencies.append(time.perf_counter() - started)
+        found += match is not None and match[0] == copy.id[len("copy-"):]
+    false_positives = sum(index.find(story) is not None for story in unrelated)
+
+    latencies.sort()
+    print(f"stories indexed:     {len(index):,}")
+    print(f"insert rate:         {args.stories / insert_time:,.0f}/s")
+    print(f"index memory:        {memory / 1e6:.1f} MB")
+    print(f"lookup p50 / p99:    {statistics.median(latencies) * 1e3:.3f} / "
+          f"{latencies[int(len(latencies) * 0.99)] * 1e3:.3f} ms")
+    print(f"recall (1-word edit): {found / len(copies):.1%}")
+    print(f"false positives:     {false_positives / len(unrelated):.2%}")
+
+
+if __name__ == "__main__":
+    main()
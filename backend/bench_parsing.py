@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark parsing LLM answers: the previous regex + json.loads + nested
+constructors against TypeAdapter validation of the raw bytes.
+
+    python bench_parsing.py --stories 5 50 --repeat 2000
+"""
+
+import argparse
+import copy
+import json
+import re
+import time
+
+from fake_llm import SAMPLE_STORIES
+from models import UserStory, InvestCriteria, GherkinScenario, GherkinStep, GherkinKeyword
+from structured_output import parse_stories
+
+
+def legacy_parse(content: str):
+    """The original implementation: greedy regex, json.loads, then hand-built models"""
+    json_match = re.search(r'\[.*\]', content, re.DOTALL)
+    if not json_match:
+        return []
+    stories = []
+    for story_data in json.loads(json_match.group()):
+        acceptance_criteria = [
+            GherkinScenario(
+                scenario_title=scenario_data['scenario_title'],
+                steps=[GherkinStep(keyword=GherkinKeyword(step['keyword']), text=step['text'])
+                       for step in scenario_data.get('steps', [])]
+            )
+            for scenario_data in story_data.get('acceptance_criteria', [])
+        ]
+        invest_data = story_data.get('invest_criteria', {})
+        stories.append(UserStory(
+            title=story_data['title'],
+            description=story_data['description'],
+            invest_criteria=InvestCriteria(**{field: invest_data.get(field, False)
+                                              for field in InvestCriteria.model_fields}),
+            definition_of_done=story_data['definition_of_done'],
+            acceptance_criteria=acceptance_criteria
+        ))
+    return stories
+
+
+def make_answer(count: int, broken: bool = False) -> str:
+    stories = [copy.deepcopy(SAMPLE_STORIES[i % len(SAMPLE_STORIES)]) for i in range(count)]
+    if broken:
+        stories[-1]["acceptance_criteria"][0]["steps"][0]["keyword"] = "Whenever"
+    return "Here are the user stories:\n" + json.dumps({"user_stories": stories}, indent=2)
+
+
+def timed(fn, content: str, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(content)
+    return (time.perf_counter() - started) / repeat
+
+
+def salvaged(fn, content: str) -> int:
+    """Number of stories recovered from an answer with one malformed story"""
+    try:
+        result = fn(content)
+    except Exception:
+        return 0
+    return len(result[0] if isinstance(result, tuple) else result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, nargs="+", default=[5, 50])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'stories':>8}  {'legacy':>10}  {'typed':>10}  {'kept of broken answer (legacy/typed)':>38}")
+    for count in args.stories:
+        content = make_answer(count)
+        broken = make_answer(count, broken=True)
+        legacy = timed(legacy_parse, content, args.repeat)
+        typed = timed(parse_stories, content, args.repeat)
+        print(f"{count:>8}  {legacy * 1e6:>8.0f}us  {typed * 1e6:>8.0f}us  "
+              f"{salvaged(legacy_parse, broken):>17}/{salvaged(parse_stories, broken)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Benchmark rule validation: the previous hand-written rules, the compiled
+rules one story at a time, and the batched validate_many pass.
+
+    python bench_rules.py --stories 10000 100000
+"""
+
+import argparse
+import gc
+import time
+
+from rule_fixtures import legacy_validate, make_stories
+from rules_engine import RulesEngine
+
+
+def timed(fn, repeat: int) -> float:
+    # Like timeit, collect first and keep the GC out of the measurement; with
+    # 100k live models its pauses otherwise dwarf the differences being measured
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = RulesEngine()
+    print(f"{'stories':>10}  {'legacy':>10}  {'compiled':>10}  {'batched':>10}")
+    for count in args.stories:
+        stories = make_stories(count)
+        legacy = timed(lambda: [legacy_validate(story) for story in stories], args.repeat)
+        compiled = timed(lambda: [engine.validate_user_story(story) for story in stories], args.repeat)
+        batched = timed(lambda: engine.validate_many(stories), args.repeat)
+        print(f"{count:>10,}  {legacy * 1000:>8.1f}ms  {compiled * 1000:>8.1f}ms  {batched * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
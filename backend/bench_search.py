@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark the full-text search index: build time, memory, query latency
+for rare, common, multi-word and prefix queries, and save/load time.
+
+    python bench_search.py --stories 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from itertools import accumulate
+
+from bench_dedup import make_vocabulary
+from bench_suite import percentile
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+from search_index import SearchIndex
+
+
+def make_story(rng: random.Random, vocabulary, cum_weights) -> UserStory:
+    """Zipf-distributed words, so a few terms are everywhere and most are rare, as in real text"""
+    words = lambda count: " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=count))
+    story = dict(SAMPLE_STORIES[0])
+    story.update(
+        title=f"As a {words(1)}, I want {words(6)} so that {words(5)}",
+        description=words(25),
+        definition_of_done=words(12),
+        acceptance_criteria=[
+            {"scenario_title": words(4), "steps": [
+                {"keyword": keyword, "text": words(8)} for keyword in ("Given", "When", "Then")
+            ]}
+            for _ in range(rng.randint(2, 3))
+        ]
+    )
+    return UserStory.model_validate(story)
+
+
+def timed_queries(index: SearchIndex, queries, limit: int):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    cum_weights = list(accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    stories = [make_story(rng, vocabulary, cum_weights) for _ in range(args.stories)]
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    index = SearchIndex()
+    started = time.perf_counter()
+    for story in stories:
+        index.put(story)
+    build_time = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    # Vocabulary ranks: 0-9 appear in most stories, 1000+ in a handful
+    pick = lambda low, high: vocabulary[rng.randrange(low, high)]
+    workloads = {
+        "rare word": [pick(1000, len(vocabulary)) for _ in range(args.queries)],
+        "mid-frequency word": [pick(50, 500) for _ in range(args.queries)],
+        "three words": [f"{pick(0, 50)} {pick(50, 500)} {pick(500, 5000)}" for _ in range(args.queries)],
+        "prefix (3 letters*)": [f"{pick(0, 5000)[:3]}*" for _ in range(args.queries)],
+        "most common word": [vocabulary[0]] * 20,
+    }
+
+    print(f"Stories:        {args.stories:,} ({args.vocabulary:,}-word Zipf vocabulary)")
+    print(f"Build:          {build_time:.1f} s ({build_time / args.stories * 1e6:.0f} us/story)")
+    print(f"Memory:         {memory / 2**20:.1f} MiB ({memory / args.stories:.0f} bytes/story)")
+    print(f"Query latency (top {args.limit}):")
+    for name, queries in workloads.items():
+        latencies = timed_queries(index, queries, args.limit)
+        print(f"  {name:22} p50 {statistics.median(latencies) * 1e3:7.2f} ms"
+              f"   p95 {percentile(latencies, 95) * 1e3:7.2f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "stories.db.search")
+        started = time.perf_counter()
+        index.save(path, stamp=1)
+        save_time = time.perf_counter() - started
+        started = time.perf_counter()
+        loaded = SearchIndex.load(path, stamp=1)
+        load_time = time.perf_counter() - started
+        size = os.path.getsize(path)
+    assert loaded.search(vocabulary[100], 5) == index.search(vocabulary[100], 5)
+
+    started = time.perf_counter()
+    for story in stories[:1000]:
+        index.put(story.model_copy(update={"description": story.description + " edited"}))
+    update_time = (time.perf_counter() - started) / 1000
+    print(f"Update:         {update_time * 1e6:.0f} us/story (text changed)")
+    print(f"Save / load:    {save_time:.2f} s / {load_time:.2f} s ({size / 2**20:.1f} MiB on disk)")
+
+
+if __name__ == "__main__":
+    main()
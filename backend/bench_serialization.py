@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark encoding story responses: FastAPI's response_model path (dump,
+revalidate, json.dumps) against pydantic-core's dump_json, then
+GET /user_stories without the body cache, with it, and as a 304.
+
+    python bench_serialization.py --stories 10000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import httpx
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from bench_suite import best_of
+from body_cache import BodyCache
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+from structured_output import STORY_LIST_ADAPTER
+from story_store import InMemoryStoryStore
+
+
+def make_stories(count: int) -> List[UserStory]:
+    return [UserStory.model_validate(SAMPLE_STORIES[i % len(SAMPLE_STORIES)]) for i in range(count)]
+
+
+def default_encode(field, stories: List[UserStory]) -> bytes:
+    """What FastAPI does for ``response_model=List[UserStory]``"""
+    content = asyncio.run(serialize_response(field=field, response_content=stories))
+    return JSONResponse(content).body
+
+
+def fast_encode(stories: List[UserStory]) -> bytes:
+    return STORY_LIST_ADAPTER.dump_json(stories)
+
+
+async def endpoint_latency(main, repeat: int, headers=None) -> float:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = await client.get("/user_stories", headers=headers)
+            assert response.status_code == (304 if headers else 200), response.status_code
+            latencies.append(time.perf_counter() - started)
+    return statistics.median(latencies)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    stories = make_stories(args.stories)
+    field = create_response_field(name="Response", type_=List[UserStory], mode="serialization")
+    assert default_encode(field, stories) == fast_encode(stories), "encoders disagree"
+
+    default_time = best_of(lambda: default_encode(field, stories), args.repeat)
+    fast_time = best_of(lambda: fast_encode(stories), args.repeat)
+    print(f"Encoding {args.stories:,} stories")
+    print(f"  response_model + json.dumps: {default_time * 1e3:8.1f} ms")
+    print(f"  TypeAdapter.dump_json:       {fast_time * 1e3:8.1f} ms  ({default_time / fast_time:.1f}x)")
+
+    import main
+    main.services.story_store = InMemoryStoryStore()
+    main.services.story_store.add_many(stories)
+    print(f"GET /user_stories with {args.stories:,} stories (median of {args.repeat})")
+    cache = main.services.story_store.bodies
+    main.services.story_store.bodies = BodyCache(max_bytes=0)
+    print(f"  query + encode every time:   {asyncio.run(endpoint_latency(main, args.repeat)) * 1e3:8.1f} ms")
+    main.services.story_store.bodies = cache
+    print(f"  cached body for the version: {asyncio.run(endpoint_latency(main, args.repeat)) * 1e3:8.1f} ms")
+    headers = {"If-None-Match": f'"{main.services.story_store.version()}"'}
+    print(f"  If-None-Match -> 304:        {asyncio.run(endpoint_latency(main, args.repeat, headers)) * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure the memory held per stored story: UserStory model trees against
+CompactStory records, and the cost of converting between them.
+
+    python bench_story_memory.py --stories 100000
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from compact_story import CompactStory
+from models import UserStory
+from story_store import InMemoryStoryStore
+
+
+WORDS = (
+    "customer order payment invoice refund report export dashboard cart account admin "
+    "checkout shipping address email notification search filter discount coupon team"
+).split()
+KEYWORD_SEQUENCE = ["Given", "And", "When", "Then", "And"]
+
+
+def make_story_json(rng: random.Random) -> str:
+    """A story shaped like real model output: 2-3 scenarios of 3-5 steps with unique text"""
+    text = lambda count: " ".join(rng.choice(WORDS) for _ in range(count))
+    scenarios = []
+    for _ in range(rng.randint(2, 3)):
+        keywords = ["Given", "When", "Then"] + KEYWORD_SEQUENCE[:rng.randint(0, 2)]
+        scenarios.append({
+            "scenario_title": text(4),
+            "steps": [{"keyword": keyword, "text": text(8)} for keyword in sorted(keywords, key=KEYWORD_SEQUENCE.index)]
+        })
+    return json.dumps({
+        "title": f"As a {text(1)}, I want {text(6)} so that {text(5)}",
+        "description": text(25),
+        "invest_criteria": {field: rng.random() < 0.8 for field in
+                            ("independent", "negotiable", "valuable", "estimable", "small", "testable")},
+        "definition_of_done": text(12),
+        "acceptance_criteria": scenarios
+    })
+
+
+def traced_bytes(build) -> tuple:
+    """Bytes still allocated by ``build()`` once it returns, and its result"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return allocated, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    documents = [make_story_json(rng) for _ in range(args.stories)]
+
+    # Each side parses its own copy, so the strings are counted on both
+    model_bytes, models = traced_bytes(lambda: [UserStory.model_validate_json(doc) for doc in documents])
+    compact_bytes, records = traced_bytes(
+        lambda: [CompactStory.from_story(UserStory.model_validate_json(doc)) for doc in documents]
+    )
+
+    started = time.perf_counter()
+    for story in models:
+        CompactStory.from_story(story)
+    to_compact = time.perf_counter() - started
+    started = time.perf_counter()
+    for record in records:
+        record.to_story()
+    to_model = time.perf_counter() - started
+    assert all(CompactStory.from_story(story).to_story() == story for story in models[:1000])
+    del models, records
+
+    store = InMemoryStoryStore()
+    store_bytes, _ = traced_bytes(lambda: store.add_many(UserStory.model_validate_json(doc) for doc in documents))
+
+    count = args.stories
+    print(f"Stories:                     {count:,}")
+    print(f"UserStory models:            {model_bytes / count:8,.0f} bytes/story")
+    print(f"CompactStory records:        {compact_bytes / count:8,.0f} bytes/story "
+          f"({model_bytes / compact_bytes:.1f}x smaller)")
+    print(f"InMemoryStoryStore total:    {store_bytes / count:8,.0f} bytes/story "
+          f"(records, sort indexes, stats, duplicate index)")
+    print(f"UserStory -> CompactStory:   {to_compact / count * 1e6:8.1f} us/story")
+    print(f"CompactStory -> UserStory:   {to_model / count * 1e6:8.1f} us/story")
+
+
+if __name__ == "__main__":
+    main()
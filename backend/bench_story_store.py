@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the story store backends.
+
+    python bench_story_store.py --stories 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from fake_llm import SAMPLE_STORIES
+from models import UserStory, StoryQuery, StorySortField
+from story_store import InMemoryStoryStore, SQLiteStoryStore
+
+
+def make_stories(count: int):
+    return [UserStory.model_validate(SAMPLE_STORIES[i % len(SAMPLE_STORIES)]) for i in range(count)]
+
+
+def bench(store, stories, batch_size: int, lookups: int):
+    started = time.perf_counter()
+    for i in range(0, len(stories), batch_size):
+        store.add_many(stories[i:i + batch_size])
+    insert_time = time.perf_counter() - started
+
+    ids = [story.id for story in random.sample(stories, min(lookups, len(stories)))]
+    started = time.perf_counter()
+    for story_id in ids:
+        store.get(story_id)
+    lookup_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    listed = store.list()
+    list_time = time.perf_counter() - started
+    assert len(listed) == len(stories)
+
+    # Fetch the first and a later page of 50 with a filter and a secondary sort
+    query = StoryQuery(limit=50, sort=StorySortField.INVEST_SCORE, descending=True, min_invest_score=4)
+    started = time.perf_counter()
+    _, cursor = store.query(query)
+    store.query(query.model_copy(update={"cursor": cursor}))
+    page_time = (time.perf_counter() - started) / 2
+
+    return {
+        "insert_per_sec": len(stories) / insert_time,
+        "lookup_per_sec": len(ids) / lookup_time,
+        "list_seconds": list_time,
+        "page_ms": page_time * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=5, help="Stories per insert (one transform)")
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+
+    stories = make_stories(args.stories)
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": InMemoryStoryStore(),
+            "sqlite": SQLiteStoryStore(os.path.join(tmp, "bench.db"))
+        }
+        for name, store in backends.items():
+            result = bench(store, stories, args.batch_size, args.lookups)
+            print(f"{name:>7}: insert {result['insert_per_sec']:>10,.0f}/s  "
+                  f"lookup {result['lookup_per_sec']:>10,.0f}/s  "
+                  f"list {result['list_seconds']:.2f}s  "
+                  f"page {result['page_ms']:.2f}ms")
+            if isinstance(store, SQLiteStoryStore):
+                store.close()
+
+
+if __name__ == "__main__":
+    main()
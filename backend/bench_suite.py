@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Reproducible performance benchmarks against an in-process fake LLM.
+
+Runs the API and the CPU-bound hot paths without network access and writes
+the results as JSON, so two commits can be compared:
+
+    python bench_suite.py --output before.json
+    git checkout other-branch
+    python bench_suite.py --output after.json --compare before.json
+
+Metric names end in their unit. Time metrics (``_ms``, ``_us``) are better
+lower and rates (``_per_s``) higher. ``--compare`` lists every metric that
+got worse by more than ``--tolerance`` and exits with status 1 if any did.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import httpx
+
+from bench_ambiguity import make_notes
+from bench_parsing import make_answer
+from fake_llm import SAMPLE_STORIES, create_fake_llm_service, create_fake_openai_app
+from models import UserStory
+from rule_fixtures import make_stories as make_rule_stories
+
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Dict[str, Any]]] = {}
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def benchmark(name: str):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of ``values``"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    """Fastest of ``repeat`` runs in seconds, with the GC kept out of the measurement"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return best
+
+
+def use_fake_llm(args: argparse.Namespace):
+    """Point the app at a fresh fake LLM and an empty in-memory store"""
+    import main
+    from story_store import InMemoryStoryStore
+
+    fake_app = create_fake_openai_app(latency=args.latency, token_rate=args.token_rate)
+    main.services.llm_service = create_fake_llm_service(fake_app)
+    main.services.story_store = InMemoryStoryStore()
+    return main
+
+
+@benchmark("transform")
+def bench_transform(args: argparse.Namespace) -> Dict[str, Any]:
+    """POST /transform_notes throughput and latency percentiles per concurrency level"""
+    results = {}
+    for concurrency in args.concurrency:
+        main = use_fake_llm(args)
+
+        async def scenario():
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies = []
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=None) as client:
+                async def transform(i: int):
+                    async with semaphore:
+                        started = time.perf_counter()
+                        response = await client.post("/transform_notes", json={
+                            "notes": {"content": f"Customers need guest checkout, request {i}."},
+                            "max_stories": 2
+                        })
+                        response.raise_for_status()
+                        latencies.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                await asyncio.gather(*(transform(i) for i in range(args.requests)))
+                elapsed = time.perf_counter() - started
+            await main.services.llm_service.aclose()
+            return latencies, elapsed
+
+        latencies, elapsed = asyncio.run(scenario())
+        usage = main.services.llm_service.usage.stats()
+        results[f"concurrency_{concurrency}"] = {
+            "requests_per_s": args.requests / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1e3,
+            "p95_ms": percentile(latencies, 95) * 1e3,
+            "p99_ms": percentile(latencies, 99) * 1e3,
+            "completion_tokens_per_s": usage["completion_tokens"] / elapsed
+        }
+    return results
+
+
+@benchmark("ambiguity")
+def bench_ambiguity(args: argparse.Namespace) -> Dict[str, Any]:
+    """detect_ambiguities on notes of increasing size"""
+    from ambiguity import default_detector
+
+    results = {}
+    for size in args.notes_chars:
+        notes = make_notes(size)
+        seconds = best_of(lambda: default_detector.detect(notes), args.repeat)
+        results[f"chars_{size}"] = {"detect_us": seconds * 1e6, "mb_per_s": size / seconds / 1e6}
+    return results
+
+
+@benchmark("rules")
+def bench_rules(args: argparse.Namespace) -> Dict[str, Any]:
+    """RulesEngine per-story and batched validation"""
+    from rules_engine import RulesEngine
+
+    engine = RulesEngine()
+    stories = make_rule_stories(args.rule_stories)
+    single = best_of(lambda: [engine.validate_user_story(story) for story in stories], args.repeat)
+    batched = best_of(lambda: engine.validate_many(stories), args.repeat)
+    return {
+        "validate_story_us": single / len(stories) * 1e6,
+        "validate_many_per_story_us": batched / len(stories) * 1e6
+    }
+
+
+@benchmark("store_reads")
+def bench_store_reads(args: argparse.Namespace) -> Dict[str, Any]:
+    """GET /stats and GET /user_stories with growing stores"""
+    results = {}
+    for size in args.store_sizes:
+        main = use_fake_llm(args)
+        stories = [UserStory.model_validate(SAMPLE_STORIES[i % len(SAMPLE_STORIES)]) for i in range(size)]
+        main.services.story_store.add_many(stories)
+        del stories
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+                async def timed_get(path: str, params: Dict[str, Any], repeat: int) -> float:
+                    latencies = []
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        response = await client.get(path, params=params)
+                        response.raise_for_status()
+                        latencies.append(time.perf_counter() - started)
+                    return percentile(latencies, 50) * 1e3
+
+                return {
+                    "stats_p50_ms": await timed_get("/stats", {}, args.http_repeat),
+                    "page_p50_ms": await timed_get("/user_stories", {"limit": 100}, args.http_repeat),
+                    "filtered_page_p50_ms": await timed_get(
+                        "/user_stories", {"limit": 100, "min_invest_score": 6, "sort": "invest_score"},
+                        args.http_repeat
+                    ),
+                    "list_all_ms": await timed_get("/user_stories", {}, 1)
+                }
+
+        results[f"stories_{size}"] = asyncio.run(scenario())
+    return results
+
+
+@benchmark("json_parse")
+def bench_json_parse(args: argparse.Namespace) -> Dict[str, Any]:
+    """Parsing LLM answers into validated stories"""
+    from structured_output import parse_stories
+
+    results = {}
+    for count in args.parse_stories:
+        answer = make_answer(count)
+        broken = make_answer(count, broken=True)
+        loops = max(1, 2000 // count)
+        results[f"stories_{count}"] = {
+            "parse_us": best_of(lambda: [parse_stories(answer) for _ in range(loops)], args.repeat) / loops * 1e6,
+            "salvage_us": best_of(lambda: [parse_stories(broken) for _ in range(loops)], args.repeat) / loops * 1e6
+        }
+    return results
+
+
+def worker_env(**overrides: str) -> Dict[str, str]:
+    """A fresh worker's environment, without credentials: nothing at startup should need them"""
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    env.update(overrides)
+    return env
+
+
+def time_to_healthy(env: Dict[str, str]) -> Tuple[float, float]:
+    """Seconds from launching uvicorn to the first 200 from GET /, then the first GET /user_stories"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while True:
+                try:
+                    if client.get("/").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError("uvicorn exited before becoming healthy")
+                    time.sleep(0.005)
+            healthy = time.perf_counter() - started
+            started = time.perf_counter()
+            client.get("/user_stories").raise_for_status()
+            first_read = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+    return healthy, first_read
+
+
+@benchmark("startup")
+def bench_startup(args: argparse.Namespace) -> Dict[str, Any]:
+    """Cold start of a worker: importing the app, and launching uvicorn until GET / answers"""
+    script = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+    imports = [
+        float(subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=worker_env(),
+                             capture_output=True, text=True, check=True).stdout)
+        for _ in range(args.startup_runs)
+    ]
+    results = {"import_ms": statistics.median(imports) * 1e3}
+    for name, env in (("lazy", worker_env()), ("preload", worker_env(PRELOAD_SERVICES="true", OPENAI_API_KEY="bench"))):
+        runs = [time_to_healthy(env) for _ in range(args.startup_runs)]
+        results[name] = {
+            "first_healthy_ms": statistics.median(healthy for healthy, _ in runs) * 1e3,
+            "first_store_read_ms": statistics.median(first_read for _, first_read in runs) * 1e3
+        }
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(names: List[str], args: argparse.Namespace) -> Dict[str, Any]:
+    results = {}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        # The app's own log lines would otherwise mix with JSON written to stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            results[name] = BENCHMARKS[name](args)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {key: value for key, value in vars(args).items()
+                           if key not in ("output", "compare", "only", "tolerance")}
+        },
+        "results": results
+    }
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe every metric present in both runs that regressed by more than ``tolerance``"""
+    before, after = flatten(baseline["results"]), flatten(current["results"])
+    regressions = []
+    for metric in sorted(before.keys() & after.keys()):
+        old, new = before[metric], after[metric]
+        if not old:
+            continue
+        higher_is_better = metric.endswith("_per_s")
+        change = (old - new) / old if higher_is_better else (new - old) / old
+        if change > tolerance:
+            regressions.append(f"{metric}: {old:.4g} -> {new:.4g} ({change:+.0%} worse)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run (default: all)")
+    parser.add_argument("--output", help="Write the results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a metric is flagged")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per microbenchmark; the fastest counts")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM latency per completion in seconds")
+    parser.add_argument("--token-rate", type=float, default=2000, help="Fake LLM completion tokens per second")
+    parser.add_argument("--requests", type=int, default=64, help="Transforms per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--notes-chars", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--rule-stories", type=int, default=10_000)
+    parser.add_argument("--store-sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--http-repeat", type=int, default=20, help="Requests per store read measurement")
+    parser.add_argument("--parse-stories", type=int, nargs="+", default=[5, 50])
+    parser.add_argument("--startup-runs", type=int, default=5, help="Fresh processes per startup measurement")
+    args = parser.parse_args()
+
+    report = run_suite(args.only or list(BENCHMARKS), args)
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
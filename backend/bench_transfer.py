@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark streaming export (NDJSON, feature text, zipped features) and
+NDJSON import: throughput, and the peak memory an export allocates while
+it runs, which should stay at about one page however large the store is.
+
+    python bench_transfer.py --stories 100000 --store sqlite
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+from rules_engine import RulesEngine
+from story_store import InMemoryStoryStore, SQLiteStoryStore
+from story_transfer import StoryImporter, export_ndjson, export_features, export_features_zip
+
+
+def make_store(kind: str, directory: str, name: str):
+    if kind == "sqlite":
+        return SQLiteStoryStore(os.path.join(directory, f"{name}.db"))
+    return InMemoryStoryStore()
+
+
+async def drain(chunks):
+    """Consume an export, keeping only its size"""
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+    return size
+
+
+async def body(data: bytes, chunk_size: int):
+    """An upload as the server receives it"""
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def measure(run):
+    started = time.perf_counter()
+    result = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    # Again under tracemalloc, which slows it down too much to time
+    tracemalloc.start()
+    asyncio.run(run())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=100_000)
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Stories per export page and import insert")
+    parser.add_argument("--upload-chunk", type=int, default=64 * 1024, help="Bytes per chunk of the upload body")
+    args = parser.parse_args()
+
+    stories = [UserStory.model_validate(SAMPLE_STORIES[i % len(SAMPLE_STORIES)]) for i in range(args.stories)]
+    with tempfile.TemporaryDirectory() as directory:
+        source = make_store(args.store, directory, "source")
+        for start in range(0, len(stories), 1000):
+            source.add_many(stories[start:start + 1000])
+        del stories
+
+        print(f"Stories:  {args.stories:,} ({args.store} store, pages of {args.chunk_size})")
+        exports = {
+            "NDJSON": export_ndjson,
+            "feature text": export_features,
+            "feature zip": export_features_zip,
+        }
+        for name, export in exports.items():
+            size, elapsed, peak = measure(lambda: drain(export(source, args.chunk_size)))
+            print(f"Export {name:13} {args.stories / elapsed:9,.0f} stories/s  {size / elapsed / 2**20:6.1f} MiB/s"
+                  f"  {size / 2**20:7.1f} MiB output, peak {peak / 2**20:5.1f} MiB")
+
+        async def collect():
+            return b"".join([chunk async for chunk in export_ndjson(source, args.chunk_size)])
+        data = asyncio.run(collect())
+        source.close()
+
+        target = make_store(args.store, directory, "target")
+        importer = StoryImporter(target, RulesEngine(), chunk_size=args.chunk_size)
+        started = time.perf_counter()
+        result = asyncio.run(importer.run(body(data, args.upload_chunk)))
+        elapsed = time.perf_counter() - started
+        assert result.imported == args.stories, result
+        print(f"Import NDJSON       {args.stories / elapsed:9,.0f} stories/s  {len(data) / elapsed / 2**20:6.1f} MiB/s"
+              f"  (parse, validate and store)")
+        target.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from batch_scheduler import expired_jobs
+from models import BatchJobStatus, BulkValidationJob, BulkValidationRequest, StoryQuery
+from rules_engine import RulesEngine
+from story_store import StoryStore
+
+
+class BulkValidator:
+    """Revalidates stored stories in the background, one page of stories at a time
+
+    Pages are read on the event loop (the in-memory store is not thread-safe)
+    and validated in a worker thread, so other requests keep being served
+    while a large backlog is audited.
+
+    Finished jobs and their failure lists are dropped like finished batch
+    jobs: after ``job_ttl`` seconds, or once more than ``max_finished_jobs``
+    have finished since.
+    """
+
+    def __init__(self, store: StoryStore, rules_engine: RulesEngine, chunk_size: Optional[int] = None,
+                 max_finished_jobs: Optional[int] = None, job_ttl: Optional[float] = None):
+        self.store = store
+        self.rules_engine = rules_engine
+        self.chunk_size = chunk_size or int(os.getenv("BULK_VALIDATION_CHUNK_SIZE", "500"))
+        self.max_finished_jobs = (max_finished_jobs if max_finished_jobs is not None
+                                  else int(os.getenv("BULK_VALIDATION_MAX_FINISHED_JOBS", "20")))
+        self.job_ttl = job_ttl if job_ttl is not None else float(os.getenv("BULK_VALIDATION_JOB_TTL", "3600"))
+
+        self.jobs: Dict[str, BulkValidationJob] = {}
+        # job id -> failing stories found so far, in page order
+        self._failures: Dict[str, List[Dict[str, Any]]] = {}
+        self._progress: Dict[str, asyncio.Condition] = {}
+        # Keep references so running jobs aren't garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, filters: Optional[BulkValidationRequest] = None) -> BulkValidationJob:
+        """Register a job and start validating in the background"""
+        job = BulkValidationJob(filters=filters or BulkValidationRequest())
+        # Build the query up front so bad filters fail the request, not the job
+        query = StoryQuery(**job.filters.model_dump(), limit=self.chunk_size)
+        for job_id in expired_jobs(self.jobs, self.max_finished_jobs, self.job_ttl):
+            del self.jobs[job_id], self._failures[job_id], self._progress[job_id]
+        self.jobs[job.id] = job
+        self._failures[job.id] = []
+        self._progress[job.id] = asyncio.Condition()
+        task = asyncio.create_task(self._run_job(job, query))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[BulkValidationJob]:
+        return self.jobs.get(job_id)
+
+    async def failures(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield failing stories as they are found, until the job finishes"""
+        job = self.jobs[job_id]
+        failures = self._failures[job_id]
+        progress = self._progress[job_id]
+        sent = 0
+        while True:
+            while sent < len(failures):
+                yield failures[sent]
+                sent += 1
+            if job.status in (BatchJobStatus.COMPLETED, BatchJobStatus.FAILED):
+                return
+            async with progress:
+                await progress.wait()
+
+    async def _run_job(self, job: BulkValidationJob, query: StoryQuery):
+        job.status = BatchJobStatus.RUNNING
+        try:
+            while True:
+                stories, cursor = self.store.query(query)
+                results = await asyncio.to_thread(self.rules_engine.validate_many, stories)
+                self._record(job, stories, results)
+                await self._notify(job.id)
+                if cursor is None:
+                    break
+                query = query.model_copy(update={"cursor": cursor})
+            job.status = BatchJobStatus.COMPLETED
+        except Exception as e:
+            print(f"Bulk validation {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = BatchJobStatus.FAILED
+        job.finished_at = datetime.now()
+        await self._notify(job.id)
+
+    def _record(self, job: BulkValidationJob, stories, results):
+        histogram = job.error_histogram
+        failures = self._failures[job.id]
+        for story, result in zip(stories, results):
+            job.processed += 1
+            if result["is_valid"]:
+                job.valid += 1
+                continue
+            job.invalid += 1
+            for error in result["errors"]:
+                # acceptance_criteria[2] counts towards acceptance_criteria
+                field = error["field"].split("[", 1)[0]
+                histogram[field] = histogram.get(field, 0) + 1
+            failures.append({"id": story.id, "errors": result["errors"]})
+
+    async def _notify(self, job_id: str):
+        progress = self._progress[job_id]
+        async with progress:
+            progress.notify_all()
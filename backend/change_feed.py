@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from models import UserStory
+from structured_output import STORY_LIST_ADAPTER
+
+
+def sse_frame(version: int, event_type: str, data: str) -> str:
+    return f"id: {version}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+class ChangeEvent:
+    """One store write as its encoded SSE frame, shared by every subscriber
+
+    Only the frame is kept, not the stories it was built from, so the
+    history costs what its JSON costs and does not keep models alive.
+    """
+
+    __slots__ = ("version", "type", "frame")
+
+    def __init__(self, version: int, type: str, frame: str):
+        self.version = version
+        self.type = type
+        self.frame = frame
+
+
+class ChangeFeed:
+    """Versioned log of story changes behind ``GET /events``
+
+    Every write to the store publishes one event with the next version
+    number and the updated stats. The last ``history`` events, up to
+    ``max_bytes`` of encoded frames, are kept so a client reconnecting with
+    its last version gets only what it missed; older clients are told to
+    reload. Versions start at the startup time in
+    milliseconds, so they keep increasing across restarts and a version
+    from a previous process is always too old to resume from.
+    """
+
+    def __init__(self, history: int = 1000, max_bytes: int = 16 * 2**20):
+        self.version = int(time.time() * 1000)
+        self.origin = self.version
+        self.history = history
+        self.max_bytes = max_bytes
+        self._events: deque = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # (loop, wakeup) of every connected subscriber; writes may come from worker threads
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @classmethod
+    def from_env(cls) -> "ChangeFeed":
+        return cls(history=int(os.getenv("CHANGE_FEED_HISTORY", "1000")),
+                   max_bytes=int(float(os.getenv("CHANGE_FEED_MB", "16")) * 2**20))
+
+    def publish(self, type: str, stories: Sequence[UserStory] = (), story_ids: Sequence[str] = (),
+                stats: Optional[Dict] = None) -> ChangeEvent:
+        # Encode outside the lock; only the version is filled in under it
+        fields = f'"type": {json.dumps(type)}, "stats": {json.dumps(stats or {})}'
+        if type == "deleted":
+            fields += f', "story_ids": {json.dumps(list(story_ids))}'
+        elif stories:
+            fields += f', "stories": {STORY_LIST_ADAPTER.dump_json(stories).decode()}'
+        with self._lock:
+            self.version += 1
+            event = ChangeEvent(self.version, type,
+                                sse_frame(self.version, type, f'{{"version": {self.version}, {fields}}}'))
+            self._events.append(event)
+            self._bytes += len(event.frame)
+            # The newest event is always kept so connected subscribers still get it
+            while len(self._events) > self.history or (self._bytes > self.max_bytes and len(self._events) > 1):
+                self._bytes -= len(self._events.popleft().frame)
+            waiters = list(self._waiters)
+        for loop, wakeup in waiters:
+            loop.call_soon_threadsafe(wakeup.set)
+        return event
+
+    def since(self, version: int) -> Tuple[Optional[List[ChangeEvent]], int]:
+        """Events after ``version`` (None if some are no longer retained) and the current version"""
+        with self._lock:
+            if version == self.version:
+                return [], self.version
+            if version > self.version or not self._events or self._events[0].version > version + 1:
+                return None, self.version
+            return list(islice(self._events, version + 1 - self._events[0].version, None)), self.version
+
+    async def stream(self, since: Optional[int], snapshot: Callable[[], Dict],
+                     heartbeat: float = 15.0) -> AsyncIterator[str]:
+        """SSE frames for one subscriber, starting after ``since`` or at the current version
+
+        A new subscriber first gets a ``ready`` event with the current
+        version and stats, one that cannot resume gets ``reset``; after
+        either it should load the backlog once and apply the deltas that
+        follow. Comment lines are sent every ``heartbeat`` seconds of quiet.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            if since is None:
+                version = self.version
+                yield sse_frame(version, "ready", json.dumps({"version": version, "stats": snapshot()}))
+            else:
+                version = since
+            while True:
+                waiter[1].clear()
+                events, current = self.since(version)
+                if events is None:
+                    version = current
+                    yield sse_frame(version, "reset", json.dumps({"version": version, "stats": snapshot()}))
+                    continue
+                for event in events:
+                    version = event.version
+                    yield event.frame
+                if not events:
+                    try:
+                        await asyncio.wait_for(waiter[1].wait(), heartbeat)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
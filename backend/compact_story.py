@@ -0,0 +1,130 @@
+import gc
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+from models import (
+    UserStory, InvestCriteria, GherkinScenario, GherkinStep, GherkinKeyword, TestStatus
+)
+from story_stats import INVEST_FIELDS, invest_mask
+
+
+KEYWORDS = tuple(GherkinKeyword)
+_KEYWORD_CODES = {keyword: code for code, keyword in enumerate(KEYWORDS)}
+
+
+def _construct(model, values: dict):
+    """``model.model_construct(**values)`` without its per-field default handling
+
+    Every field is always passed here, so the instance state can be set
+    directly; this halves the cost of rebuilding a story's ~20 sub-models.
+    """
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(values))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
+def _counts(values: Sequence[int]) -> Union[bytes, Tuple[int, ...]]:
+    """Step counts as one byte each, unless a scenario has more than 255 steps"""
+    return bytes(values) if all(value < 256 for value in values) else tuple(values)
+
+
+class CompactStory:
+    """Slotted record of a stored story, several times smaller than the UserStory tree
+
+    The six INVEST flags are one bitmask (in ``invest_mask`` order), step
+    keywords are one byte each, and the steps of all scenarios are flattened
+    into a single tuple of texts with a per-scenario step count. ``id``,
+    ``test_status`` and ``created_at`` are kept as attributes so the store
+    can index and filter records without converting them back.
+    """
+
+    __slots__ = (
+        "id", "title", "description", "definition_of_done", "invest", "test_status",
+        "created_at", "updated_at", "duplicate_of",
+        "scenario_titles", "step_counts", "step_keywords", "step_texts"
+    )
+
+    def __init__(self, id: str, title: str, description: str, definition_of_done: str, invest: int,
+                 test_status: TestStatus, created_at: datetime, updated_at: Optional[datetime],
+                 duplicate_of: Optional[str], scenario_titles: Tuple[str, ...],
+                 step_counts: Union[bytes, Tuple[int, ...]], step_keywords: bytes, step_texts: Tuple[str, ...]):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.definition_of_done = definition_of_done
+        self.invest = invest
+        self.test_status = test_status
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.duplicate_of = duplicate_of
+        self.scenario_titles = scenario_titles
+        self.step_counts = step_counts
+        self.step_keywords = step_keywords
+        self.step_texts = step_texts
+
+    @classmethod
+    def from_story(cls, story: UserStory) -> "CompactStory":
+        scenarios = story.acceptance_criteria
+        steps = [step for scenario in scenarios for step in scenario.steps]
+        return cls(
+            id=story.id,
+            title=story.title,
+            description=story.description,
+            definition_of_done=story.definition_of_done,
+            invest=invest_mask(story),
+            test_status=story.test_status,
+            created_at=story.created_at,
+            updated_at=story.updated_at,
+            duplicate_of=story.duplicate_of,
+            scenario_titles=tuple(scenario.scenario_title for scenario in scenarios),
+            step_counts=_counts([len(scenario.steps) for scenario in scenarios]),
+            step_keywords=bytes(_KEYWORD_CODES[step.keyword] for step in steps),
+            step_texts=tuple(step.text for step in steps)
+        )
+
+    def to_story(self) -> UserStory:
+        """Rebuild the public model; the data was validated when it was stored, so it isn't again"""
+        invest = self.invest
+        scenarios = []
+        position = 0
+        for title, count in zip(self.scenario_titles, self.step_counts):
+            end = position + count
+            steps = [
+                _construct(GherkinStep, {"keyword": KEYWORDS[code], "text": text})
+                for code, text in zip(self.step_keywords[position:end], self.step_texts[position:end])
+            ]
+            scenarios.append(_construct(GherkinScenario, {"scenario_title": title, "steps": steps}))
+            position = end
+        return _construct(UserStory, {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "invest_criteria": _construct(
+                InvestCriteria, {field: bool(invest >> bit & 1) for bit, field in enumerate(INVEST_FIELDS)}
+            ),
+            "definition_of_done": self.definition_of_done,
+            "acceptance_criteria": scenarios,
+            "test_status": self.test_status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "duplicate_of": self.duplicate_of
+        })
+
+
+def to_stories(records: Iterable[CompactStory]) -> List[UserStory]:
+    """Rebuild many records with the cyclic garbage collector paused
+
+    A page of stories allocates tens of thousands of models, which would
+    otherwise trigger repeated collections over the whole heap. The models
+    form no reference cycles, so those collections can't free anything.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return [record.to_story() for record in records]
+    finally:
+        if enabled:
+            gc.enable()
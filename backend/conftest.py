@@ -0,0 +1,42 @@
+import asyncio
+from contextlib import ExitStack
+
+import pytest
+
+from fake_llm import create_fake_llm_service, create_fake_openai_app
+from story_store import InMemoryStoryStore
+
+
+@pytest.fixture
+def make_service():
+    """Build LLM services answered by a fake LLM app (see ``create_fake_llm_service``), closed after the test"""
+    services = []
+
+    def make(fake_app, **kwargs):
+        service = create_fake_llm_service(fake_app, **kwargs)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        asyncio.run(service.aclose())
+
+
+@pytest.fixture
+def override_services():
+    """Replace the app's services for the test (see ``Services.override``)"""
+    import main
+
+    with ExitStack() as stack:
+        yield lambda **replacements: stack.enter_context(main.services.override(**replacements))
+
+
+@pytest.fixture
+def use_fake_llm(override_services, make_service):
+    """Point the app at a fake LLM and an empty in-memory store, returning the fake LLM app"""
+    def use(latency: float = 0, stories=None, **kwargs):
+        fake_app = create_fake_openai_app(latency=latency, stories=stories)
+        override_services(llm_service=make_service(fake_app, **kwargs), story_store=InMemoryStoryStore())
+        return fake_app
+
+    return use
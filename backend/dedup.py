@@ -0,0 +1,198 @@
+import os
+import re
+import hashlib
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from models import UserStory
+
+
+# Words every "As a ..., I want ... so that ..." story shares; they'd make unrelated stories look alike
+STOP_WORDS = frozenset(
+    "a an the as i want so that to can be my our we in on of for and or with is are it this".split()
+)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+DEDUP_MODES = ("flag", "merge", "off")
+
+
+@lru_cache(maxsize=65536)
+def _token_hash(token: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def story_shingles(story: UserStory) -> Set[int]:
+    """Hashed word unigrams and bigrams of the title and description"""
+    words = [
+        word for word in TOKEN_PATTERN.findall(f"{story.title} {story.description}".lower())
+        if word not in STOP_WORDS
+    ]
+    tokens = set(words)
+    tokens.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+    return {_token_hash(token) for token in tokens}
+
+
+class DuplicateIndex:
+    """MinHash/LSH index of stored stories for near-duplicate lookups
+
+    Signatures use one-permutation MinHash: each shingle hash is hashed once
+    into one of ``num_bins`` bins and every bin keeps its minimum, with empty
+    bins filled from their neighbours. That is one pass over the shingles
+    instead of one per hash function. The first ``bands * rows`` bins are
+    banded into a single bucket dict for candidate lookup, and the full
+    signature estimates the Jaccard similarity of each candidate.
+
+    Stories flagged as duplicates are not indexed themselves, so repeated
+    copies of one story don't pile up in its buckets.
+    """
+
+    def __init__(self, mode: str = "flag", threshold: float = 0.8,
+                 num_bins: int = 64, bands: int = 8, rows: int = 4):
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown DEDUP_MODE: {mode}")
+        if num_bins & (num_bins - 1) or bands * rows > num_bins:
+            raise ValueError("num_bins must be a power of two holding bands * rows bins")
+        self.mode = mode
+        self.threshold = threshold
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = rows
+        self._bin_bits = num_bins.bit_length() - 1
+        self._signatures: Dict[str, array] = {}
+        # band key -> story id, or a list of ids once several stories share the bucket
+        self._buckets: Dict[int, Union[str, List[str]]] = {}
+
+    @classmethod
+    def from_env(cls) -> "DuplicateIndex":
+        return cls(
+            mode=os.getenv("DEDUP_MODE", "flag").lower(),
+            threshold=float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def signature(self, story: UserStory) -> Optional[array]:
+        """One-permutation MinHash signature, or None for a story without words to compare"""
+        shingles = story_shingles(story)
+        if not shingles:
+            return None
+        mask, bits = self.num_bins - 1, self._bin_bits
+        bins: List[Optional[int]] = [None] * self.num_bins
+        for value in shingles:
+            slot = value & mask
+            minimum = (value >> bits) & 0xFFFFFFFF
+            current = bins[slot]
+            if current is None or minimum < current:
+                bins[slot] = minimum
+
+        # Densify: an empty bin borrows the next non-empty bin, offset by the distance
+        original = list(bins)
+        for i, value in enumerate(original):
+            if value is None:
+                distance = 1
+                while original[(i + distance) & mask] is None:
+                    distance += 1
+                bins[i] = (original[(i + distance) & mask] + distance * 0x9E3779B1) & 0xFFFFFFFF
+        return array("I", bins)
+
+    def _band_keys(self, signature: array) -> List[int]:
+        rows = self.rows
+        return [hash((band, *signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    @staticmethod
+    def similarity(first: array, second: array) -> float:
+        """Estimated Jaccard similarity: the fraction of bins holding the same minimum"""
+        return sum(a == b for a, b in zip(first, second)) / len(first)
+
+    def _insert(self, story_id: str, signature: array):
+        self._signatures[story_id] = signature
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = story_id
+            elif isinstance(bucket, str):
+                self._buckets[key] = [bucket, story_id]
+            else:
+                bucket.append(story_id)
+
+    def put(self, story: UserStory):
+        """Index a new or updated story"""
+        if not self.enabled:
+            return
+        self.remove(story.id)
+        if story.duplicate_of is not None:
+            return
+        signature = self.signature(story)
+        if signature is not None:
+            self._insert(story.id, signature)
+
+    def remove(self, story_id: str):
+        signature = self._signatures.pop(story_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self._buckets[key]
+            if isinstance(bucket, str):
+                del self._buckets[key]
+            else:
+                bucket.remove(story_id)
+                if len(bucket) == 1:
+                    self._buckets[key] = bucket[0]
+
+    def clear(self):
+        self._signatures.clear()
+        self._buckets.clear()
+
+    def _best_match(self, story_id: str, signature: array) -> Optional[Tuple[str, float]]:
+        candidates = set()
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if isinstance(bucket, str):
+                candidates.add(bucket)
+            elif bucket is not None:
+                candidates.update(bucket)
+        candidates.discard(story_id)
+
+        best = None
+        for candidate in candidates:
+            score = self.similarity(signature, self._signatures[candidate])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (candidate, score)
+        return best
+
+    def find(self, story: UserStory) -> Optional[Tuple[str, float]]:
+        """Return (id, similarity) of the most similar indexed story above the threshold"""
+        if not self.enabled:
+            return None
+        signature = self.signature(story)
+        return self._best_match(story.id, signature) if signature is not None else None
+
+    def find_many(self, stories: Iterable[UserStory]) -> List[Optional[Tuple[str, float]]]:
+        """Like find, but each story is also compared with the earlier stories of the batch"""
+        if not self.enabled:
+            return [None for _ in stories]
+        matches = []
+        added = []
+        try:
+            for story in stories:
+                signature = self.signature(story)
+                if signature is None:
+                    matches.append(None)
+                    continue
+                match = self._best_match(story.id, signature)
+                matches.append(match)
+                if match is None and story.id not in self._signatures:
+                    self._insert(story.id, signature)
+                    added.append(story.id)
+        finally:
+            # The batch is only indexed for real once the store writes it
+            for story_id in added:
+                self.remove(story_id)
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._signatures)
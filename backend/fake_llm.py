@@ -0,0 +1,212 @@
+"""
+Fake OpenAI-compatible server for load tests, benchmarks and offline development.
+
+Run it with ``uvicorn fake_llm:app --port 9000`` and point the backend at it
+with ``OPENAI_API_BASE=http://localhost:9000/v1``. Answers are canned and
+deterministic; each completion takes ``FAKE_LLM_LATENCY`` seconds plus its
+completion tokens at ``FAKE_LLM_TOKEN_RATE`` tokens per second (0 = instant).
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+if TYPE_CHECKING:
+    from llm_service_simple import LLMService
+
+
+# Characters per streamed delta (roughly a handful of tokens)
+STREAM_CHUNK_SIZE = 16
+
+# Rough characters per token for the reported usage
+CHARS_PER_TOKEN = 4
+
+SAMPLE_STORIES: List[Dict[str, Any]] = [
+    {
+        "title": "As a customer, I want to check out as a guest so that I can buy without creating an account",
+        "description": "Allow customers to complete a purchase without registering.",
+        "invest_criteria": {
+            "independent": True,
+            "negotiable": True,
+            "valuable": True,
+            "estimable": True,
+            "small": True,
+            "testable": True
+        },
+        "definition_of_done": "Guest checkout is available, tested and deployed to production",
+        "acceptance_criteria": [
+            {
+                "scenario_title": "Guest completes checkout",
+                "steps": [
+                    {"keyword": "Given", "text": "I have items in my cart"},
+                    {"keyword": "When", "text": "I choose to check out as a guest"},
+                    {"keyword": "Then", "text": "I can place my order without an account"}
+                ]
+            }
+        ]
+    },
+    {
+        "title": "As a customer, I want clear payment error messages so that I know how to fix a failed payment",
+        "description": "Show actionable messages when a payment is declined.",
+        "invest_criteria": {
+            "independent": True,
+            "negotiable": True,
+            "valuable": True,
+            "estimable": True,
+            "small": True,
+            "testable": True
+        },
+        "definition_of_done": "Every payment failure code maps to a user-facing message",
+        "acceptance_criteria": [
+            {
+                "scenario_title": "Card is declined",
+                "steps": [
+                    {"keyword": "Given", "text": "I am on the payment step"},
+                    {"keyword": "When", "text": "my card is declined"},
+                    {"keyword": "Then", "text": "I see why it failed and what to do next"}
+                ]
+            }
+        ]
+    }
+]
+
+
+def create_fake_openai_app(latency: Optional[float] = None,
+                           stories: Optional[List[Dict[str, Any]]] = None,
+                           token_rate: Optional[float] = None) -> FastAPI:
+    """Build a FastAPI app that answers ``/v1/chat/completions`` with canned stories"""
+    fake_app = FastAPI(title="Fake OpenAI API")
+    fake_app.state.latency = float(os.getenv("FAKE_LLM_LATENCY", "1.0")) if latency is None else latency
+    fake_app.state.token_rate = (float(os.getenv("FAKE_LLM_TOKEN_RATE", "0")) if token_rate is None
+                                 else token_rate)
+    fake_app.state.stories = stories if stories is not None else SAMPLE_STORIES
+    fake_app.state.stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+    fake_app.state.last_request = None
+    # Answer to repair requests (a single story object)
+    fake_app.state.repaired_story = SAMPLE_STORIES[0]
+    # System prompts seen so far; a repeated one is reported as a prompt cache hit
+    fake_app.state.prompt_prefixes = set()
+
+    def usage_for(body: Dict[str, Any], content: str) -> Dict[str, Any]:
+        messages = body.get("messages") or []
+        prompt_tokens = sum(len(message.get("content") or "") for message in messages) // CHARS_PER_TOKEN
+        prefix = messages[0].get("content", "") if messages else ""
+        cached_tokens = len(prefix) // CHARS_PER_TOKEN if prefix in fake_app.state.prompt_prefixes else 0
+        fake_app.state.prompt_prefixes.add(prefix)
+        completion_tokens = len(content) // CHARS_PER_TOKEN
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+
+    def generation_time(usage: Dict[str, Any]) -> float:
+        """Fixed latency plus the time to generate the completion at the configured token rate"""
+        token_rate = fake_app.state.token_rate
+        return fake_app.state.latency + (usage["completion_tokens"] / token_rate if token_rate else 0.0)
+
+    @fake_app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats = fake_app.state.stats
+        stats["requests"] += 1
+        fake_app.state.last_request = body
+        stories = fake_app.state.stories
+        # Structured output answers with the object the requested schema describes
+        response_format = body.get("response_format") or {}
+        if response_format.get("json_schema", {}).get("name") == "user_story":
+            content = json.dumps(fake_app.state.repaired_story, indent=2)
+        elif response_format.get("type") == "json_schema":
+            content = json.dumps({"user_stories": stories}, indent=2)
+        else:
+            content = json.dumps(stories, indent=2)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "fake-model")
+        usage = usage_for(body, content)
+
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return StreamingResponse(
+                _stream_chunks(completion_id, model, content, generation_time(usage),
+                               usage if include_usage else None),
+                media_type="text/event-stream"
+            )
+
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(generation_time(usage))
+        finally:
+            stats["in_flight"] -= 1
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }
+            ],
+            "usage": usage
+        }
+
+    async def _stream_chunks(completion_id: str, model: str, content: str, duration: float,
+                             usage: Optional[Dict[str, Any]] = None):
+        """Emit ``content`` as OpenAI-style SSE chunks spread over ``duration`` seconds"""
+        stats = fake_app.state.stats
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        pieces = [content[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(content), STREAM_CHUNK_SIZE)]
+        delay = duration / max(len(pieces), 1)
+        try:
+            for piece in pieces:
+                await asyncio.sleep(delay)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            if usage is not None:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [],
+                    "usage": usage
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        finally:
+            stats["in_flight"] -= 1
+
+    return fake_app
+
+
+def create_fake_llm_service(fake_app: FastAPI, **kwargs) -> "LLMService":
+    """An ``LLMService`` answered in-process by ``fake_app``, with an empty response cache unless given one"""
+    # Deferred so the fake server itself doesn't need the OpenAI SDK
+    import httpx
+    from llm_service_simple import LLMService
+    from response_cache import ResponseCache
+
+    kwargs.setdefault("cache", ResponseCache())
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_app))
+    return LLMService(api_key="test-key", base_url="http://fake-llm/v1", http_client=http_client, **kwargs)
+
+
+app = create_fake_openai_app()
@@ -0,0 +1,64 @@
+import os
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from models import UserStory
+from structured_output import STORY_LIST_ADAPTER
+from body_cache import BodyCache
+
+
+def fast_json_enabled() -> bool:
+    """Whether transform responses skip FastAPI's response_model pass (FAST_JSON_RESPONSES, off by default)"""
+    return os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+class PreEncodedJSONResponse(Response):
+    """A response whose body is already JSON bytes"""
+    media_type = "application/json"
+
+
+def model_response(model: BaseModel, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Encode a response model in one pass with pydantic-core
+
+    FastAPI would dump the model to a dict, validate the dict against the
+    response model again and hand it to ``json.dumps``. Our models are
+    built and validated by us, so the JSON can be written directly.
+    """
+    return PreEncodedJSONResponse(content=model.model_dump_json(), headers=headers)
+
+
+def encode_stories(stories: List[UserStory], include: Optional[Set[str]] = None) -> bytes:
+    """JSON for a list of stories, optionally only the ``include`` fields of each"""
+    return STORY_LIST_ADAPTER.dump_json(stories, include={"__all__": include} if include is not None else None)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check; it uses weak comparison, so ``W/`` prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def conditional_response(cache: BodyCache, key: Hashable, version: str, if_none_match: Optional[str],
+                         encode: Callable[[], Tuple[bytes, Dict[str, str]]]) -> Response:
+    """Serve a GET whose body only changes with ``version``
+
+    The strong ETag is the version itself. A matching ``If-None-Match``
+    gets ``304 Not Modified`` before anything is read or encoded; otherwise
+    the body comes from ``cache``, calling ``encode`` on a miss.
+    """
+    etag = f'"{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    cached = cache.get(key, version)
+    if cached is None:
+        cached = encode()
+        cache.put(key, version, *cached)
+    body, extra_headers = cached
+    return PreEncodedJSONResponse(content=body, headers={**extra_headers, **headers})
@@ -1,266 +1,453 @@
 import os
 import json
-import re
-from typing import List, Dict, Any
-from openai import OpenAI
-from models import UserStory, RawNotes, InvestCriteria, GherkinScenario, GherkinStep, GherkinKeyword
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+import httpx
+from openai import AsyncOpenAI
+from pydantic import ValidationError
+from models import UserStory, RawNotes, AmbiguityMatch
+from ambiguity import default_detector
+from dedup import DuplicateIndex
+from metrics import metrics
+from note_chunking import CHUNK_CONTEXT, split_notes, chunk_story_budget, merge_chunk_stories
+from response_cache import ResponseCache, make_cache_key
+from single_flight import SingleFlight
+from stream_parser import JSONArrayStreamParser
+from token_usage import UsageTracker
+from structured_output import (
+    SERVER_FIELDS, STORIES_RESPONSE_FORMAT, STORY_RESPONSE_FORMAT, STORY_ADAPTER, parse_stories, parse_story
+)
 
 
-class LLMService:
-    def __init__(self):
-        # Initialize the OpenAI client
-        self.client = OpenAI()
-    
-    async def transform_notes_to_stories(self, notes: RawNotes, max_stories: int = 5) -> List[UserStory]:
-        """Transform raw notes into structured user stories"""
-        
-        system_prompt = """
-        You are an expert Business Analyst and Requirements Engineer. Your task is to transform raw customer notes into well-structured user stories that follow the INVEST principles.
+# Static instructions shared by every transform. Providers cache prompts by exact prefix,
+# so this text (and the response schema) must stay byte-identical across calls and
+# everything request-specific goes in the user message after it.
+SYSTEM_PROMPT = """\
+You are an expert Business Analyst and Requirements Engineer. Your task is to transform raw customer notes into well-structured user stories that follow the INVEST principles.
 
-        INVEST Principles:
-        - Independent: Stories should be independent of each other
-        - Negotiable: Details can be discussed and refined
-        - Valuable: Must provide clear value to users or business
-        - Estimable: Development effort can be estimated
-        - Small: Can be completed in one iteration/sprint
-        - Testable: Has clear acceptance criteria
+INVEST Principles:
+- Independent: Stories should be independent of each other
+- Negotiable: Details can be discussed and refined
+- Valuable: Must provide clear value to users or business
+- Estimable: Development effort can be estimated
+- Small: Can be completed in one iteration/sprint
+- Testable: Has clear acceptance criteria
 
-        For each user story you create:
-        1. Write a clear title in the format: "As a [type of user], I want [some goal] so that [some reason]"
-        2. Provide a detailed description
-        3. Evaluate against INVEST criteria (mark true/false for each)
-        4. Write a clear Definition of Done
-        5. Create Gherkin acceptance criteria with Given/When/Then scenarios
+For each user story you create:
+1. Write a clear title in the format: "As a [type of user], I want [some goal] so that [some reason]"
+2. Provide a detailed description
+3. Evaluate against INVEST criteria (mark true/false for each)
+4. Write a clear Definition of Done
+5. Create Gherkin acceptance criteria with Given/When/Then scenarios
 
-        Guidelines:
-        - Break down complex requirements into multiple smaller stories
-        - Ensure each story is testable with clear acceptance criteria
-        - Use business language, not technical jargon
-        - Focus on user value and outcomes
-        - Make scenarios specific and measurable
+Guidelines:
+- Break down complex requirements into multiple smaller stories
+- Ensure each story is testable with clear acceptance criteria
+- Ensure stories are independent and can be developed separately
+- Use business language, not technical jargon
+- Focus on user value and business outcomes
+- Make acceptance criteria specific, measurable and testable
 
-        Return your response as a JSON array of user stories with this exact structure:
-        [
-          {
-            "title": "As a [user], I want [goal] so that [reason]",
-            "description": "Detailed description of the user story",
-            "invest_criteria": {
-              "independent": true/false,
-              "negotiable": true/false,
-              "valuable": true/false,
-              "estimable": true/false,
-              "small": true/false,
-              "testable": true/false
-            },
-            "definition_of_done": "Clear definition of done",
-            "acceptance_criteria": [
-              {
-                "scenario_title": "Scenario title",
-                "steps": [
-                  {"keyword": "Given", "text": "step description"},
-                  {"keyword": "When", "text": "step description"},
-                  {"keyword": "Then", "text": "step description"}
-                ]
-              }
-            ]
-          }
+Return your response as a JSON object with this exact structure:
+{"user_stories": [
+  {
+    "title": "As a [user], I want [goal] so that [reason]",
+    "description": "Detailed description of the user story",
+    "invest_criteria": {
+      "independent": true/false,
+      "negotiable": true/false,
+      "valuable": true/false,
+      "estimable": true/false,
+      "small": true/false,
+      "testable": true/false
+    },
+    "definition_of_done": "Clear definition of done",
+    "acceptance_criteria": [
+      {
+        "scenario_title": "Scenario title",
+        "steps": [
+          {"keyword": "Given", "text": "step description"},
+          {"keyword": "When", "text": "step description"},
+          {"keyword": "Then", "text": "step description"}
         ]
-        """
-        
-        user_prompt = f"""
-        Transform the following raw customer notes into {max_stories} or fewer well-structured user stories:
+      }
+    ]
+  }
+]}
+"""
 
-        Raw Notes:
-        {notes.content}
+REPAIR_PROMPT = """\
+You fix user stories that failed validation. You receive one user story as JSON \
+together with the validation errors it failed. Return the corrected story as a \
+JSON object with exactly the same structure. Change only what is needed to \
+resolve the listed errors and keep the story's intent, wording and scope.
+"""
 
-        Additional Context:
-        {notes.context or "No additional context provided"}
 
-        Requirements:
-        1. Create user stories that follow INVEST principles
-        2. Each story must have clear acceptance criteria in Gherkin format
-        3. Ensure stories are independent and can be developed separately
-        4. Focus on user value and business outcomes
-        5. Make acceptance criteria specific and testable
-        """
+class LLMService:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[ResponseCache] = None
+    ):
+        # Model parameters (also part of the response cache key)
+        self.model = os.getenv("LLM_MODEL", "gpt-4.1-mini")
+        self.temperature = 0.7
+        self.max_tokens = 4000
+        # JSON-schema constrained output; disable for OpenAI-compatible servers without response_format
+        self.structured_output = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() in ("1", "true", "yes")
+        # Repairs resend a single story, so they need a fraction of the completion budget
+        self.repair_temperature = 0.2
+        self.repair_max_tokens = int(os.getenv("LLM_REPAIR_MAX_TOKENS", "1500"))
+        self._system_prompt_hash = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()
+        self._repair_prompt_hash = hashlib.sha256(REPAIR_PROMPT.encode("utf-8")).hexdigest()
+        # Optional routing hint so requests sharing the static prefix land on the same prompt cache
+        self.prompt_cache_key = os.getenv("LLM_PROMPT_CACHE_KEY") or None
         
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=4000
-            )
-            
-            content = response.choices[0].message.content
-            
-            # Extract JSON from the response
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                stories_data = json.loads(json_str)
-                
-                # Convert to UserStory objects
-                user_stories = []
-                for story_data in stories_data:
-                    # Convert acceptance criteria
-                    acceptance_criteria = []
-                    for scenario_data in story_data.get('acceptance_criteria', []):
-                        steps = []
-                        for step_data in scenario_data.get('steps', []):
-                            step = GherkinStep(
-                                keyword=GherkinKeyword(step_data['keyword']),
-                                text=step_data['text']
-                            )
-                            steps.append(step)
-                        
-                        scenario = GherkinScenario(
-                            scenario_title=scenario_data['scenario_title'],
-                            steps=steps
-                        )
-                        acceptance_criteria.append(scenario)
-                    
-                    # Create InvestCriteria
-                    invest_data = story_data.get('invest_criteria', {})
-                    invest_criteria = InvestCriteria(
-                        independent=invest_data.get('independent', False),
-                        negotiable=invest_data.get('negotiable', False),
-                        valuable=invest_data.get('valuable', False),
-                        estimable=invest_data.get('estimable', False),
-                        small=invest_data.get('small', False),
-                        testable=invest_data.get('testable', False)
-                    )
-                    
-                    # Create UserStory
-                    user_story = UserStory(
-                        title=story_data['title'],
-                        description=story_data['description'],
-                        invest_criteria=invest_criteria,
-                        definition_of_done=story_data['definition_of_done'],
-                        acceptance_criteria=acceptance_criteria
-                    )
-                    user_stories.append(user_story)
-                
-                return user_stories
-            else:
-                print("No valid JSON found in response")
-                return []
-                
-        except Exception as e:
-            print(f"Error in LLM transformation: {e}")
-            return []
-    
-    def detect_ambiguities(self, notes: RawNotes) -> List[str]:
-        """Detect ambiguous requirements in raw notes"""
-        ambiguities = []
-        content = notes.content.lower()
+        # Notes longer than one chunk are transformed chunk by chunk, then merged (0 disables chunking)
+        self.chunk_chars = int(os.getenv("NOTES_CHUNK_CHARS", "12000"))
+        self.chunk_overlap = int(os.getenv("NOTES_CHUNK_OVERLAP", "400"))
+        self.chunk_concurrency = int(os.getenv("NOTES_CHUNK_CONCURRENCY", "4"))
+        self.dedup_threshold = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
         
-        # Common ambiguity patterns
-        ambiguous_phrases = [
-            "user-friendly", "easy to use", "fast", "secure", "reliable",
-            "good performance", "nice to have", "should be", "might need",
-            "probably", "maybe", "some", "few", "many", "several",
-            "as needed", "when possible", "if required"
-        ]
+        # Transport limits (overridable through environment variables)
+        self.max_connections = max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", "60"))
         
-        vague_quantifiers = [
-            "a lot", "some", "many", "few", "several", "most", "often",
-            "rarely", "sometimes", "usually", "generally"
-        ]
+        # Shared, pooled HTTP client so connections are reused across requests
+        self.http_client = http_client or httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=10.0)
+        )
         
-        missing_details = [
-            "etc", "and so on", "among others", "for example", "such as"
-        ]
+        # Initialize the async OpenAI client on top of the pool
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url or os.getenv("OPENAI_API_BASE") or None,
+            http_client=self.http_client,
+            timeout=self.timeout,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2"))
+        )
         
-        # Check for ambiguous phrases
-        for phrase in ambiguous_phrases:
-            if phrase in content:
-                ambiguities.append(f"Ambiguous term detected: '{phrase}' - needs specific definition")
+        # Caps the number of completions in flight at once
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
         
-        # Check for vague quantifiers
-        for quantifier in vague_quantifiers:
-            if quantifier in content:
-                ambiguities.append(f"Vague quantifier detected: '{quantifier}' - needs specific numbers")
+        # Response cache in front of the LLM
+        self.cache = cache or ResponseCache.from_env()
         
-        # Check for incomplete lists
-        for detail in missing_details:
-            if detail in content:
-                ambiguities.append(f"Incomplete specification detected: '{detail}' - needs complete list")
+        # Identical requests in flight at the same time share one LLM call
+        self.single_flight = SingleFlight()
         
-        # Check for missing actors
-        if not re.search(r'\b(user|customer|admin|manager|employee|client)\b', content):
-            ambiguities.append("No clear user roles identified - specify who will use the system")
+        # Token counters from each completion's usage
+        self.usage = UsageTracker()
+    
+    async def aclose(self):
+        """Release pooled connections"""
+        await self.client.close()
+    
+    async def _create_completion(self, **kwargs):
+        """Run a chat completion, waiting for a free concurrency slot first"""
+        with metrics.stage("llm_wait"):
+            await self._semaphore.acquire()
+        try:
+            with metrics.stage("llm_call"):
+                response = await self.client.chat.completions.create(**kwargs)
+        finally:
+            self._semaphore.release()
+        self.usage.record(response.usage)
+        return response
+    
+    @asynccontextmanager
+    async def _stream_completion(self, **kwargs):
+        """Open a streamed chat completion, holding a concurrency slot until it is closed
         
-        # Check for missing success criteria
-        if not re.search(r'\b(success|complete|done|finish|achieve)\b', content):
-            ambiguities.append("No clear success criteria defined - specify what constitutes completion")
+        A streamed call lasts until its last chunk is read, so ``llm_call``
+        covers the whole stream. The response is closed on exit even if the
+        reader stops early. Usage arrives in the chunks and is recorded there.
+        """
+        with metrics.stage("llm_wait"):
+            await self._semaphore.acquire()
+        try:
+            with metrics.stage("llm_call"):
+                stream = await self.client.chat.completions.create(**kwargs, stream=True)
+                async with stream:
+                    yield stream
+        finally:
+            self._semaphore.release()
+    
+    def cache_key(self, notes: RawNotes, max_stories: int) -> str:
+        """Content-addressed key for a transform request"""
+        return make_cache_key(
+            notes.content,
+            notes.context,
+            max_stories,
+            model=self.model,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            system_prompt=self._system_prompt_hash,
+            structured_output=self.structured_output
+        )
+    
+    def split_notes(self, notes: RawNotes) -> List[RawNotes]:
+        """Split long notes into chunks that are transformed separately"""
+        chunks = split_notes(notes.content, self.chunk_chars, self.chunk_overlap)
+        if len(chunks) == 1:
+            return [notes]
+        context = f"{notes.context}\n\n{CHUNK_CONTEXT}" if notes.context else CHUNK_CONTEXT
+        return [RawNotes(content=chunk, context=context) for chunk in chunks]
+    
+    def _map_chunks(self, chunks: List[RawNotes], max_stories: int, use_cache: bool) -> List[asyncio.Task]:
+        """Start one transform task per chunk, at most ``chunk_concurrency`` running at once"""
+        budget = chunk_story_budget(max_stories, len(chunks))
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
         
-        return ambiguities
-
-
-class RulesEngine:
-    """Validates user stories against business rules"""
+        async def transform_chunk(chunk: RawNotes) -> List[UserStory]:
+            async with semaphore:
+                return await self._transform_single(chunk, budget, use_cache)
+        
+        return [asyncio.create_task(transform_chunk(chunk)) for chunk in chunks]
     
-    @staticmethod
-    def validate_user_story(story: UserStory) -> Dict[str, Any]:
-        """Validate a user story against defined rules"""
-        errors = []
+    async def transform_notes_to_stories(self, notes: RawNotes, max_stories: int = 5,
+                                         use_cache: bool = True) -> List[UserStory]:
+        """Transform raw notes into structured user stories
         
-        # Rule 1: Must have Definition of Done
-        if not story.definition_of_done or len(story.definition_of_done.strip()) < 10:
-            errors.append({
-                "field": "definition_of_done",
-                "message": "Definition of Done must be at least 10 characters long"
-            })
+        Long notes are split into chunks that are transformed concurrently and
+        merged, so the wall-clock time follows the slowest chunk rather than
+        the size of the whole document. Every chunk is cached on its own.
+        """
+        chunks = self.split_notes(notes)
+        if len(chunks) == 1:
+            return await self._transform_single(notes, max_stories, use_cache)
         
-        # Rule 2: Must have at least one acceptance criteria
-        if not story.acceptance_criteria or len(story.acceptance_criteria) == 0:
-            errors.append({
-                "field": "acceptance_criteria",
-                "message": "User story must have at least one acceptance criteria scenario"
-            })
+        tasks = self._map_chunks(chunks, max_stories, use_cache)
+        try:
+            chunk_stories = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return merge_chunk_stories(chunk_stories, max_stories, self.dedup_threshold)
+    
+    async def _transform_single(self, notes: RawNotes, max_stories: int, use_cache: bool) -> List[UserStory]:
+        """Transform notes with a single completion, going through the cache
         
-        # Rule 3: Title must follow user story format
-        title_pattern = r"^As a .+, I want .+so that .+"
-        if not re.match(title_pattern, story.title, re.IGNORECASE):
-            errors.append({
-                "field": "title",
-                "message": "Title must follow format: 'As a [user], I want [goal] so that [reason]'"
-            })
+        Concurrent cache misses for the same key share one completion. A
+        request bypassing the cache gets a completion of its own rather than
+        joining one that is already in flight.
+        """
+        key = self.cache_key(notes, max_stories)
+        if not use_cache:
+            payload = await self._generate_payload(key, notes, max_stories)
+        else:
+            with metrics.stage("cache_lookup"):
+                payload = self.cache.get(key)
+            if payload is None:
+                payload = await self.single_flight.do(key, lambda: self._generate_payload(key, notes, max_stories))
         
-        # Rule 4: Each Gherkin scenario must have at least Given, When, Then
-        for i, scenario in enumerate(story.acceptance_criteria):
-            keywords = [step.keyword for step in scenario.steps]
-            required_keywords = [GherkinKeyword.GIVEN, GherkinKeyword.WHEN, GherkinKeyword.THEN]
+        # Rebuild from the shared payload so every caller gets its own stories and IDs
+        return [UserStory.model_validate(story_data) for story_data in payload]
+    
+    async def _generate_payload(self, key: str, notes: RawNotes, max_stories: int) -> List[Dict[str, Any]]:
+        """Generate stories and store them in the response cache"""
+        user_stories = await self._generate_stories(notes, max_stories)
+        payload = [
+            story.model_dump(mode="json", exclude=SERVER_FIELDS)
+            for story in user_stories
+        ]
+        if payload:
+            self.cache.set(key, payload)
+        return payload
+    
+    def _build_messages(self, notes: RawNotes, max_stories: int) -> List[Dict[str, str]]:
+        """Assemble the chat messages: the static system prompt, then the request-specific part"""
+        user_prompt = (
+            f"Raw Notes:\n{notes.content}\n\n"
+            f"Additional Context:\n{notes.context or 'No additional context provided'}\n\n"
+            f"Transform these notes into {max_stories} or fewer user stories."
+        )
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _completion_params(self, notes: RawNotes, max_stories: int) -> Dict[str, Any]:
+        """Keyword arguments shared by regular and streaming completions"""
+        params = {
+            "model": self.model,
+            "messages": self._build_messages(notes, max_stories),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+        if self.structured_output:
+            params["response_format"] = STORIES_RESPONSE_FORMAT
+        if self.prompt_cache_key:
+            params["prompt_cache_key"] = self.prompt_cache_key
+        return params
+    
+    async def _generate_stories(self, notes: RawNotes, max_stories: int) -> List[UserStory]:
+        """Call the LLM and parse its answer into user stories"""
+        try:
+            response = await self._create_completion(**self._completion_params(notes, max_stories))
             
-            for keyword in required_keywords:
-                if keyword not in keywords:
-                    errors.append({
-                        "field": f"acceptance_criteria[{i}]",
-                        "message": f"Scenario '{scenario.scenario_title}' missing {keyword.value} step"
-                    })
+            content = response.choices[0].message.content
+            
+            # Validate the JSON answer directly; a malformed story is dropped on its own
+            with metrics.stage("parse"):
+                user_stories, dropped = parse_stories(content or "")
+            if not user_stories and not dropped:
+                print("No valid JSON found in response")
+            self.usage.record_stories(len(user_stories))
+            return user_stories
+                
+        except Exception as e:
+            print(f"Error in LLM transformation: {e}")
+            return []
+    
+    async def stream_stories(self, notes: RawNotes, max_stories: int = 5,
+                             use_cache: bool = True) -> AsyncIterator[UserStory]:
+        """Yield user stories one by one as the model streams them
         
-        # Rule 5: INVEST criteria should have at least 4 true values
-        invest_values = [
-            story.invest_criteria.independent,
-            story.invest_criteria.negotiable,
-            story.invest_criteria.valuable,
-            story.invest_criteria.estimable,
-            story.invest_criteria.small,
-            story.invest_criteria.testable
-        ]
+        Long notes are chunked as in ``transform_notes_to_stories``; their
+        stories are yielded chunk by chunk as each chunk finishes.
         
-        if sum(invest_values) < 4:
-            errors.append({
-                "field": "invest_criteria",
-                "message": "User story should meet at least 4 out of 6 INVEST criteria"
-            })
+        Streams aren't coalesced with ``single_flight``: a caller joining a
+        stream midway would need the chunks already read replayed to it, so
+        each stream that misses the cache opens its own completion.
+        """
+        chunks = self.split_notes(notes)
+        if len(chunks) > 1:
+            async for story in self._stream_chunks(chunks, max_stories, use_cache):
+                yield story
+            return
         
-        return {
-            "is_valid": len(errors) == 0,
-            "errors": errors
+        key = self.cache_key(notes, max_stories)
+        payload = self.cache.get(key) if use_cache else None
+        if payload is not None:
+            for story_data in payload:
+                yield UserStory.model_validate(story_data)
+            return
+        
+        payload = []
+        parser = JSONArrayStreamParser()
+        async with self._stream_completion(**self._completion_params(notes, max_stories),
+                                           stream_options={"include_usage": True}) as stream:
+            async for chunk in stream:
+                # The final chunk carries the usage and no choices
+                if chunk.usage is not None:
+                    self.usage.record(chunk.usage)
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                with metrics.stage("parse"):
+                    stories_data = parser.feed(chunk.choices[0].delta.content)
+                for story_data in stories_data:
+                    # Server-assigned fields are ours to set, as when rebuilding from the cache
+                    if isinstance(story_data, dict):
+                        for field in SERVER_FIELDS:
+                            story_data.pop(field, None)
+                    try:
+                        with metrics.stage("parse"):
+                            story = STORY_ADAPTER.validate_python(story_data)
+                    except ValidationError as e:
+                        print(f"Skipping malformed story in stream: {e.error_count()} validation error(s)")
+                        continue
+                    payload.append(story.model_dump(mode="json", exclude=SERVER_FIELDS))
+                    yield story
+        
+        self.usage.record_stories(len(payload))
+        if payload:
+            self.cache.set(key, payload)
+    
+    async def _stream_chunks(self, chunks: List[RawNotes], max_stories: int,
+                             use_cache: bool) -> AsyncIterator[UserStory]:
+        """Yield deduplicated stories from each chunk in completion order, up to ``max_stories``"""
+        tasks = self._map_chunks(chunks, max_stories, use_cache)
+        seen = DuplicateIndex(threshold=self.dedup_threshold)
+        count = 0
+        try:
+            for next_chunk in asyncio.as_completed(tasks):
+                for story in await next_chunk:
+                    if seen.find(story) is not None:
+                        continue
+                    seen.put(story)
+                    yield story
+                    count += 1
+                    if count >= max_stories:
+                        return
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _repair_cache_key(self, story_data: Dict[str, Any], errors: List[Dict[str, str]]) -> str:
+        return make_cache_key(
+            json.dumps(story_data, sort_keys=True),
+            "\n".join(f"{error['field']}: {error['message']}" for error in errors),
+            1,
+            task="repair",
+            model=self.model,
+            temperature=self.repair_temperature,
+            max_tokens=self.repair_max_tokens,
+            system_prompt=self._repair_prompt_hash,
+            structured_output=self.structured_output
+        )
+    
+    async def repair_story(self, story: UserStory, errors: List[Dict[str, str]],
+                           use_cache: bool = True) -> Optional[UserStory]:
+        """Ask the LLM to fix one story given its validation errors
+        
+        Only the failing story and its errors are sent, so a repair costs far
+        fewer tokens than regenerating every story. The fixed story keeps the
+        original ID and creation time; None means the answer was unusable.
+        """
+        story_data = story.model_dump(mode="json", exclude=SERVER_FIELDS)
+        key = self._repair_cache_key(story_data, errors)
+        payload = self.cache.get(key) if use_cache else None
+        if payload is None:
+            payload = await self.single_flight.do(key, lambda: self._generate_repair(key, story_data, errors))
+        if not payload:
+            return None
+        return UserStory.model_validate({**payload[0], "id": story.id, "created_at": story.created_at})
+    
+    async def _generate_repair(self, key: str, story_data: Dict[str, Any],
+                               errors: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        error_lines = "\n".join(f"- {error['field']}: {error['message']}" for error in errors)
+        params = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": REPAIR_PROMPT},
+                {"role": "user", "content": f"Validation errors:\n{error_lines}\n\nUser story:\n{json.dumps(story_data)}"}
+            ],
+            "temperature": self.repair_temperature,
+            "max_tokens": self.repair_max_tokens
         }
-
+        if self.structured_output:
+            params["response_format"] = STORY_RESPONSE_FORMAT
+        try:
+            response = await self._create_completion(**params)
+            repaired = parse_story(response.choices[0].message.content or "")
+        except Exception as e:
+            print(f"Error repairing story: {e}")
+            return []
+        if repaired is None:
+            return []
+        payload = [repaired.model_dump(mode="json", exclude=SERVER_FIELDS)]
+        self.cache.set(key, payload)
+        return payload
+    
+    def detect_ambiguities(self, notes: RawNotes) -> List[str]:
+        """Detect ambiguous requirements in raw notes"""
+        return default_detector.detect(notes.content)
+    
+    def analyze_ambiguities(self, notes: RawNotes) -> Tuple[List[str], List[AmbiguityMatch]]:
+        """Detect ambiguous requirements and where the ambiguous phrases occur"""
+        with metrics.stage("ambiguity_detection"):
+            return default_detector.analyze(notes.content)
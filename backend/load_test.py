@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Load test for /transform_notes against a local fake OpenAI-compatible server.
+
+Starts ``fake_llm`` on a local port, points the backend at it and fires
+concurrent transforms while probing ``/stats`` to check that the event loop
+keeps serving other requests.
+
+    python load_test.py --requests 50 --latency 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_server(latency: float) -> str:
+    """Run the fake LLM server in a background thread and return its base URL"""
+    from fake_llm import create_fake_openai_app
+
+    port = _free_port()
+    config = uvicorn.Config(create_fake_openai_app(latency=latency), host="127.0.0.1",
+                            port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+async def run_load_test(total_requests: int, latency: float):
+    payload = {
+        "notes": {"content": "Customers need guest checkout and clearer payment errors."},
+        "max_stories": 2
+    }
+
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=None) as client:
+        probe_latencies = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/stats")
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        async def transform():
+            response = await client.post("/transform_notes", json=payload)
+            response.raise_for_status()
+            return len(response.json()["user_stories"])
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        results = await asyncio.gather(*(transform() for _ in range(total_requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    await main.services.llm_service.aclose()
+
+    print(f"Requests:            {total_requests}")
+    print(f"Upstream latency:    {latency:.2f}s")
+    print(f"Max concurrency:     {main.services.llm_service.max_concurrency}")
+    print(f"Stories returned:    {sum(results)}")
+    print(f"Wall time:           {elapsed:.2f}s")
+    print(f"Throughput:          {total_requests / elapsed:.1f} req/s")
+    print(f"Max /stats latency:  {max(probe_latencies) * 1000:.1f}ms")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Number of concurrent transforms")
+    parser.add_argument("--latency", type=float, default=1.0, help="Fake upstream latency in seconds")
+    args = parser.parse_args()
+
+    os.environ["OPENAI_API_BASE"] = start_fake_server(args.latency)
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+    asyncio.run(run_load_test(args.requests, args.latency))
+
+
+if __name__ == "__main__":
+    main_cli()
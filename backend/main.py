@@ -1,22 +1,43 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Response, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager, aclosing
 import time
+import json
 import asyncio
 from datetime import datetime
 
 from models import (
     UserStory, TransformRequest, TransformResponse, TestUpdateRequest,
-    ValidationResult, RawNotes, TestStatus
+    ValidationResult, RawNotes, TestStatus, BatchTransformRequest, BatchJob,
+    StoryQuery, StorySortField, BulkValidationRequest, BulkValidationJob,
+    SearchHit, SearchResponse, ExportFormat, ImportResult
 )
-from llm_service_simple import LLMService, RulesEngine
+from services import Services, preload_enabled
+from story_repair import repair_stories
+from story_transfer import (
+    StoryImporter, export_ndjson, export_features, export_features_zip, transfer_chunk_size
+)
+from metrics import metrics, MetricsMiddleware
+from json_responses import fast_json_enabled, model_response, encode_stories, conditional_response
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Optionally build the services before serving; close the ones that were built on shutdown"""
+    if preload_enabled():
+        services.preload()
+    yield
+    await services.aclose()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="User Stories Assistant API",
     description="Transform raw customer notes into INVEST user stories with Gherkin acceptance criteria",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -26,14 +47,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-# Initialize services
-llm_service = LLMService()
-rules_engine = RulesEngine()
+# Request latency histograms for /metrics
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+# Opt-in: encode transform responses straight to JSON bytes instead of revalidating them against response_model
+fast_json = fast_json_enabled()
+
 
-# In-memory storage (in production, use a database)
-user_stories_db: Dict[str, UserStory] = {}
+def collect_service_metrics():
+    """Counters from the LLM service and the story store, read when /metrics is scraped
+    
+    Scrapes don't build services; those not used yet are left out.
+    """
+    if services.is_built("llm_service"):
+        usage = services.llm_service.usage.totals
+        cache = services.llm_service.cache.stats()
+        yield ("llm_calls_total", "Completions sent to the LLM", "counter", [((), usage.llm_calls)])
+        yield ("llm_tokens_total", "LLM tokens by kind", "counter", [
+            ((("kind", "prompt"),), usage.prompt_tokens),
+            ((("kind", "completion"),), usage.completion_tokens),
+            ((("kind", "cached"),), usage.cached_tokens)
+        ])
+        yield ("llm_cache_requests_total", "Response cache lookups by result", "counter", [
+            ((("result", "hit"),), cache["hits"]),
+            ((("result", "miss"),), cache["misses"])
+        ])
+    if services.is_built("story_store"):
+        yield ("stories_stored", "Stories currently in the store", "gauge", [((), services.story_store.count())])
+
+
+metrics.collectors.append(collect_service_metrics)
 
 
 @app.get("/")
@@ -46,69 +92,348 @@ async def root():
     }
 
 
-@app.post("/transform_notes", response_model=TransformResponse)
-async def transform_notes(request: TransformRequest):
-    """Transform raw customer notes into user stories"""
+async def process_transform(request: TransformRequest) -> TransformResponse:
+    """Transform, validate and store stories for a single request"""
     start_time = time.time()
+    llm_service, rules_engine, story_store = services.llm_service, services.rules_engine, services.story_store
     
-    try:
+    # Count the tokens and time spent on this request, including repairs
+    with llm_service.usage.track() as token_usage, metrics.track() as timings:
         # Transform notes using LLM
         user_stories = await llm_service.transform_notes_to_stories(
             request.notes, 
-            request.max_stories
+            request.max_stories,
+            use_cache=not request.bypass_cache
         )
         
-        # Validate each user story
+        # Validate the stories in one batch
         validated_stories = []
-        for story in user_stories:
-            validation_result = rules_engine.validate_user_story(story)
+        failures = []
+        positions = []
+        for story, validation_result in zip(user_stories, rules_engine.validate_many(user_stories)):
             if validation_result["is_valid"]:
-                # Store in database
-                user_stories_db[story.id] = story
                 validated_stories.append(story)
             else:
-                # Log validation errors (in production, you might want to handle this differently)
                 print(f"Validation failed for story {story.id}: {validation_result['errors']}")
+                failures.append((story, validation_result["errors"]))
+                positions.append(len(validated_stories))
+        
+        # Send failing stories back with their errors instead of regenerating everything
+        with metrics.stage("repair"):
+            repaired = await repair_stories(llm_service, rules_engine, failures,
+                                            use_cache=not request.bypass_cache)
+        repaired_count = 0
+        for position, story in reversed(list(zip(positions, repaired))):
+            if story is not None:
+                # Fixed stories go back where the originals were
+                validated_stories.insert(position, story)
+                repaired_count += 1
+        
+        # Store all valid stories in one write, flagging or merging near-duplicates
+        with metrics.stage("store"):
+            validated_stories, duplicate_count = story_store.add_deduplicated(validated_stories)
         
         # Detect ambiguities
-        ambiguity_flags = llm_service.detect_ambiguities(request.notes)
+        ambiguity_flags, ambiguity_details = llm_service.analyze_ambiguities(request.notes)
+    
+    processing_time = time.time() - start_time
+    
+    return TransformResponse(
+        user_stories=validated_stories,
+        ambiguity_flags=ambiguity_flags,
+        ambiguity_details=ambiguity_details,
+        repaired_count=repaired_count,
+        rejected_count=len(failures) - repaired_count,
+        duplicate_count=duplicate_count,
+        token_usage=token_usage,
+        timings=timings if request.include_timings else None,
+        processing_time=processing_time
+    )
+
+
+# Services are built on first use
+services = Services(process_transform)
+
+
+@app.post("/transform_notes", response_model=TransformResponse)
+async def transform_notes(request: TransformRequest):
+    """Transform raw customer notes into user stories"""
+    try:
+        result = await process_transform(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error transforming notes: {str(e)}")
+    
+    return model_response(result) if fast_json else result
+
+
+@app.post("/transform_notes/batch", response_model=BatchJob, status_code=202)
+async def submit_batch_transform(request: BatchTransformRequest):
+    """Submit many transform requests as one background job"""
+    try:
+        return services.batch_scheduler.submit(request.requests)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+@app.get("/transform_notes/batch/{job_id}", response_model=BatchJob)
+async def get_batch_transform(job_id: str):
+    """Get progress and per-item results of a batch transform job"""
+    job = services.batch_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    
+    return job
+
+
+@app.post("/transform_notes/stream")
+async def transform_notes_stream(request: TransformRequest):
+    """Transform raw notes, streaming validated user stories as NDJSON as soon as each one is complete"""
+    start_time = time.time()
+    llm_service, rules_engine, story_store = services.llm_service, services.rules_engine, services.story_store
+    
+    async def event_stream():
+        timings = {}
+        # Ambiguity detection doesn't need the LLM, so send it first
+        with metrics.track(timings):
+            ambiguity_flags, ambiguity_details = llm_service.analyze_ambiguities(request.notes)
+        yield json.dumps({
+            "type": "ambiguity_flags",
+            "ambiguity_flags": ambiguity_flags,
+            "ambiguity_details": [match.model_dump() for match in ambiguity_details]
+        }) + "\n"
         
-        processing_time = time.time() - start_time
+        story_count = 0
+        failures = []
+        repaired_count = 0
+        duplicate_count = 0
+        sent = set()
         
-        return TransformResponse(
-            user_stories=validated_stories,
-            ambiguity_flags=ambiguity_flags,
-            processing_time=processing_time
-        )
+        def store_story(story: UserStory, **extra) -> List[str]:
+            """Store a story after the near-duplicate check and encode the events to send for it"""
+            nonlocal story_count, duplicate_count
+            stored, duplicates = story_store.add_deduplicated([story])
+            duplicate_count += duplicates
+            lines = []
+            for stored_story in stored:
+                # A merged duplicate may point at a story already sent in this stream
+                if stored_story.id in sent:
+                    continue
+                sent.add(stored_story.id)
+                story_count += 1
+                lines.append(json.dumps({
+                    "type": "user_story", "user_story": stored_story.model_dump(mode="json"), **extra
+                }) + "\n")
+            return lines
         
+        with llm_service.usage.track() as token_usage, metrics.track(timings):
+            try:
+                # Closed right away if the client disconnects, which ends the LLM stream
+                stories = llm_service.stream_stories(request.notes, request.max_stories,
+                                                     use_cache=not request.bypass_cache)
+                async with aclosing(stories):
+                    async for story in stories:
+                        with metrics.stage("validation"):
+                            validation_result = rules_engine.validate_user_story(story)
+                        if not validation_result["is_valid"]:
+                            print(f"Validation failed for story {story.id}: {validation_result['errors']}")
+                            failures.append((story, validation_result["errors"]))
+                            continue
+                    
+                        for line in store_story(story):
+                            yield line
+            
+                # Repaired stories follow once the main answer is complete
+                with metrics.stage("repair"):
+                    repaired = await repair_stories(llm_service, rules_engine, failures,
+                                                    use_cache=not request.bypass_cache)
+                for story in repaired:
+                    if story is None:
+                        continue
+                    repaired_count += 1
+                    for line in store_story(story, repaired=True):
+                        yield line
+            except Exception as e:
+                yield json.dumps({"type": "error", "detail": f"Error transforming notes: {str(e)}"}) + "\n"
+        
+        yield json.dumps({
+            "type": "done",
+            "story_count": story_count,
+            "repaired_count": repaired_count,
+            "rejected_count": len(failures) - repaired_count,
+            "duplicate_count": duplicate_count,
+            "token_usage": token_usage.model_dump(),
+            **({"timings": timings} if request.include_timings else {}),
+            "processing_time": time.time() - start_time
+        }) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+def available_llm_service():
+    """The LLM service, or a 503 if it can't be created (e.g. OPENAI_API_KEY is not set)"""
+    try:
+        return services.llm_service
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error transforming notes: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"LLM service unavailable: {str(e)}")
+
+
+@app.get("/cache_stats")
+async def get_cache_stats():
+    """Get hit/miss counters for the LLM response cache and request coalescing"""
+    llm_service = available_llm_service()
+    return {
+        **llm_service.cache.stats(),
+        "coalescing": llm_service.single_flight.stats(),
+        "response_bodies": services.story_store.bodies.stats()
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Stage and request latency histograms plus service counters, in the Prometheus text format"""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/token_usage")
+async def get_token_usage():
+    """Get cumulative LLM token counts, prompt cache efficiency and tokens per generated story"""
+    return available_llm_service().usage.stats()
 
 
 @app.get("/user_stories", response_model=List[UserStory])
-async def get_user_stories():
-    """Get all user stories from the backlog"""
-    return list(user_stories_db.values())
+async def get_user_stories(
+    test_status: Optional[TestStatus] = None,
+    min_invest_score: Optional[int] = Query(None, ge=0, le=6),
+    max_invest_score: Optional[int] = Query(None, ge=0, le=6),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    sort: StorySortField = StorySortField.CREATED_AT,
+    descending: bool = False,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get user stories from the backlog, optionally filtered, sorted and paginated
+    
+    The cursor for the next page is returned in the ``X-Next-Cursor`` header.
+    The ETag is the store version, so unchanged pages are answered with 304.
+    """
+    query = StoryQuery(
+        test_status=test_status,
+        min_invest_score=min_invest_score,
+        max_invest_score=max_invest_score,
+        created_after=created_after,
+        created_before=created_before,
+        sort=sort,
+        descending=descending,
+        cursor=cursor,
+        limit=limit
+    )
+    
+    # Projected responses bypass the full UserStory response model
+    selected = None
+    if fields is not None:
+        selected = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected - set(UserStory.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    
+    store = services.story_store
+    
+    def encode():
+        try:
+            stories, next_cursor = store.query(query)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return encode_stories(stories, selected), ({"X-Next-Cursor": next_cursor} if next_cursor else {})
+    
+    key = ("user_stories", query.model_dump_json(), frozenset(selected) if selected is not None else None)
+    return conditional_response(store.bodies, key, store.version(), if_none_match, encode)
 
 
 @app.get("/user_stories/{story_id}", response_model=UserStory)
-async def get_user_story(story_id: str):
-    """Get a specific user story by ID"""
-    if story_id not in user_stories_db:
+async def get_user_story(story_id: str, if_none_match: Optional[str] = Header(None)):
+    """Get a specific user story by ID (the ETag changes only when this story does)"""
+    store = services.story_store
+    version = store.story_version(story_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="User story not found")
     
-    return user_stories_db[story_id]
+    def encode():
+        story = store.get(story_id)
+        if story is None:
+            raise HTTPException(status_code=404, detail="User story not found")
+        return story.model_dump_json().encode("utf-8"), {}
+    
+    return conditional_response(store.bodies, ("user_story", story_id), version, if_none_match, encode)
+
+
+@app.get("/search", response_model=SearchResponse)
+async def search_stories(
+    q: str = Query(..., min_length=1, description="Words to find; end a word with * to match it as a prefix"),
+    limit: int = Query(20, ge=1, le=100),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Full-text search over story titles, descriptions, definitions of done and Gherkin steps, ranked by BM25"""
+    store = services.story_store
+    
+    def encode():
+        with metrics.stage("search"):
+            try:
+                hits = store.search.search(q, limit)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        results = []
+        for story_id, score in hits:
+            story = store.get(story_id)
+            if story is not None:
+                results.append(SearchHit(score=round(score, 4), user_story=story))
+        return SearchResponse(query=q, results=results).model_dump_json().encode("utf-8"), {}
+    
+    return conditional_response(store.bodies, ("search", q, limit), store.version(), if_none_match, encode)
+
+
+@app.get("/export")
+async def export_stories(format: ExportFormat = ExportFormat.NDJSON, zip: bool = False):
+    """Stream every stored story as NDJSON or Gherkin feature files, a page at a time
+    
+    With ``format=feature&zip=true`` the features come as a zip archive
+    with one ``<id>.feature`` file per story.
+    """
+    store = services.story_store
+    chunk_size = transfer_chunk_size()
+    if format == ExportFormat.NDJSON:
+        if zip:
+            raise HTTPException(status_code=400, detail="zip is only supported for the feature format")
+        return StreamingResponse(export_ndjson(store, chunk_size), media_type="application/x-ndjson")
+    if zip:
+        return StreamingResponse(
+            export_features_zip(store, chunk_size),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="user_stories.zip"'}
+        )
+    return StreamingResponse(export_features(store, chunk_size), media_type="text/plain; charset=utf-8")
+
+
+@app.post("/import", response_model=ImportResult)
+async def import_stories(request: Request):
+    """Stream-parse an NDJSON body of stories, validate them and store the valid ones in chunks"""
+    importer = StoryImporter(services.story_store, services.rules_engine)
+    with metrics.stage("import"):
+        return await importer.run(request.stream())
 
 
 @app.put("/user_stories/{story_id}/acceptance_test")
 async def update_acceptance_test(story_id: str, request: TestUpdateRequest):
     """Update the acceptance test status for a user story"""
-    if story_id not in user_stories_db:
+    story = services.story_store.get(story_id)
+    if story is None:
         raise HTTPException(status_code=404, detail="User story not found")
     
-    story = user_stories_db[story_id]
     story.test_status = request.test_status
     story.updated_at = datetime.now()
+    services.story_store.update(story)
     
     return {"message": "Test status updated successfully", "story_id": story_id}
 
@@ -116,11 +441,11 @@ async def update_acceptance_test(story_id: str, request: TestUpdateRequest):
 @app.post("/validate_story/{story_id}", response_model=ValidationResult)
 async def validate_story(story_id: str):
     """Validate a specific user story against business rules"""
-    if story_id not in user_stories_db:
+    story = services.story_store.get(story_id)
+    if story is None:
         raise HTTPException(status_code=404, detail="User story not found")
     
-    story = user_stories_db[story_id]
-    validation_result = rules_engine.validate_user_story(story)
+    validation_result = services.rules_engine.validate_user_story(story)
     
     return ValidationResult(
         is_valid=validation_result["is_valid"],
@@ -128,67 +453,87 @@ async def validate_story(story_id: str):
     )
 
 
+@app.post("/validate_stories", response_model=BulkValidationJob, status_code=202)
+async def submit_bulk_validation(request: Optional[BulkValidationRequest] = None):
+    """Revalidate all stored stories, or those matching the filters, as a background job"""
+    return services.bulk_validator.submit(request)
+
+
+@app.get("/validate_stories/{job_id}", response_model=BulkValidationJob)
+async def get_bulk_validation(job_id: str):
+    """Get progress and error histogram of a bulk validation job"""
+    job = services.bulk_validator.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Validation job not found")
+    
+    return job
+
+
+@app.get("/validate_stories/{job_id}/failures")
+async def get_bulk_validation_failures(job_id: str):
+    """Stream failing stories as NDJSON, following the job until it finishes"""
+    if services.bulk_validator.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Validation job not found")
+
+    async def events():
+        async for failure in services.bulk_validator.failures(job_id):
+            yield json.dumps(failure) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.delete("/user_stories/{story_id}")
 async def delete_user_story(story_id: str):
     """Delete a user story from the backlog"""
-    if story_id not in user_stories_db:
+    if not services.story_store.delete(story_id):
         raise HTTPException(status_code=404, detail="User story not found")
     
-    del user_stories_db[story_id]
     return {"message": "User story deleted successfully"}
 
 
+@app.get("/events")
+async def story_events(since: Optional[int] = None, last_event_id: Optional[str] = Header(None)):
+    """Stream story changes and updated stats as server-sent events
+    
+    Each created, updated, deleted or cleared event carries the next version
+    number. Reconnecting clients resume after ``since`` or their
+    ``Last-Event-ID`` header and get only the changes they missed.
+    """
+    if since is None and last_event_id:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID must be a version number")
+
+    store = services.story_store
+    return StreamingResponse(
+        store.changes.stream(since, store.stats.snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/stats")
-async def get_stats():
-    """Get statistics about the user stories"""
-    total_stories = len(user_stories_db)
-    
-    if total_stories == 0:
-        return {
-            "total_stories": 0,
-            "test_status_breakdown": {},
-            "invest_compliance": {}
-        }
-    
-    # Test status breakdown
-    test_status_counts = {}
-    invest_compliance = {
-        "independent": 0,
-        "negotiable": 0,
-        "valuable": 0,
-        "estimable": 0,
-        "small": 0,
-        "testable": 0
-    }
+async def get_stats(verify: bool = False, if_none_match: Optional[str] = Header(None)):
+    """Get statistics about the user stories
     
-    for story in user_stories_db.values():
-        # Count test statuses
-        status = story.test_status.value
-        test_status_counts[status] = test_status_counts.get(status, 0) + 1
-        
-        # Count INVEST compliance
-        if story.invest_criteria.independent:
-            invest_compliance["independent"] += 1
-        if story.invest_criteria.negotiable:
-            invest_compliance["negotiable"] += 1
-        if story.invest_criteria.valuable:
-            invest_compliance["valuable"] += 1
-        if story.invest_criteria.estimable:
-            invest_compliance["estimable"] += 1
-        if story.invest_criteria.small:
-            invest_compliance["small"] += 1
-        if story.invest_criteria.testable:
-            invest_compliance["testable"] += 1
-    
-    # Convert to percentages
-    for key in invest_compliance:
-        invest_compliance[key] = round((invest_compliance[key] / total_stories) * 100, 1)
+    Served from running aggregates kept up to date by the story store. With
+    ``verify=true`` they are also recomputed from scratch and compared.
+    """
+    store = services.story_store
+    if verify:
+        stats = store.stats.snapshot()
+        errors = store.stats.consistency_errors(store.list())
+        if errors:
+            raise HTTPException(status_code=500, detail=f"Stats out of sync: {'; '.join(errors)}")
+        return stats
     
-    return {
-        "total_stories": total_stories,
-        "test_status_breakdown": test_status_counts,
-        "invest_compliance": invest_compliance
-    }
+    def encode():
+        # Same separators as JSONResponse
+        body = json.dumps(store.stats.snapshot(), ensure_ascii=False, separators=(",", ":"))
+        return body.encode("utf-8"), {}
+    
+    return conditional_response(store.bodies, "stats", store.version(), if_none_match, encode)
 
 
 if __name__ == "__main__":
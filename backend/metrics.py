@@ -0,0 +1,178 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Upper bounds in seconds; wide enough for both microsecond stages and minute-long LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stage timings of the request currently being processed (seconds summed per stage)
+_current_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("current_timings", default=None)
+
+_DISABLED_STAGE = nullcontext()
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        # Bulk validation observes from worker threads
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def render(self, name: str, labels: Labels) -> List[str]:
+        label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+        prefix = f"{label_text}," if label_text else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f"{{{label_text}}}" if label_text else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record_stage(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """Per-stage timings and request histograms, rendered for Prometheus
+
+    ``stage(name)`` times a block. The duration goes into the
+    ``stage_duration_seconds`` histogram and, inside ``track()``, into that
+    request's timings breakdown. When disabled (``METRICS_ENABLED=false``)
+    ``stage`` returns a shared no-op context manager and nothing is recorded.
+    """
+
+    STAGE_METRIC = "stage_duration_seconds"
+    REQUEST_METRIC = "http_request_duration_seconds"
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.help: Dict[str, str] = {
+            self.STAGE_METRIC: "Time spent in each processing stage",
+            self.REQUEST_METRIC: "HTTP request latency by route"
+        }
+        # Callables returning extra (name, help, type, [(labels, value)]) samples at render time
+        self.collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Labels, float]]]]]] = []
+
+    @classmethod
+    def from_env(cls) -> "Metrics":
+        return cls(enabled=os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes"))
+
+    def histogram(self, name: str, labels: Labels) -> Histogram:
+        series = self.histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series.setdefault(labels, Histogram())
+        return histogram
+
+    def stage(self, name: str):
+        """Context manager timing one stage of the current request"""
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return _Stage(self, name)
+
+    def record_stage(self, name: str, seconds: float):
+        self.histogram(self.STAGE_METRIC, (("stage", name),)).observe(seconds)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        labels = (("method", method), ("route", route), ("status", str(status)))
+        self.histogram(self.REQUEST_METRIC, labels).observe(seconds)
+
+    @contextmanager
+    def track(self, timings: Optional[Dict[str, float]] = None) -> Iterator[Dict[str, float]]:
+        """Collect the stage timings of one request into the yielded dict (or add to ``timings``)"""
+        timings = {} if timings is None else timings
+        previous = _current_timings.get()
+        _current_timings.set(timings)
+        try:
+            yield timings
+        finally:
+            _current_timings.set(previous)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, series in self.histograms.items():
+            lines.append(f"# HELP {name} {self.help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in list(series.items()):
+                lines.extend(histogram.render(name, labels))
+        for collect in self.collectors:
+            for name, help_text, metric_type, samples in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                    lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing every HTTP request's latency under its route template"""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The matched route's template keeps IDs out of the labels
+            route = scope.get("route")
+            self.metrics.observe_request(scope["method"], getattr(route, "path", "unmatched"), status,
+                                         time.perf_counter() - started)
+
+
+# Shared by the API, the LLM service and the rules engine
+metrics = Metrics.from_env()
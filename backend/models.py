@@ -1,10 +1,17 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Dict, Optional
 from enum import Enum
 import uuid
 from datetime import datetime
 
 
+def naive_local(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert an aware datetime to the naive local time stories are stored in"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
 class GherkinKeyword(str, Enum):
     GIVEN = "Given"
     WHEN = "When"
@@ -48,6 +55,9 @@ class UserStory(BaseModel):
     test_status: TestStatus = Field(default=TestStatus.NOT_TESTED)
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: Optional[datetime] = None
+    duplicate_of: Optional[str] = Field(None, description="ID of the stored story this one nearly duplicates")
+
+    _naive_timestamps = field_validator("created_at", "updated_at")(naive_local)
 
 
 class RawNotes(BaseModel):
@@ -58,14 +68,145 @@ class RawNotes(BaseModel):
 class TransformRequest(BaseModel):
     notes: RawNotes
     max_stories: int = Field(default=5, description="Maximum number of user stories to generate")
+    bypass_cache: bool = Field(default=False, description="Skip the response cache and call the LLM")
+    include_timings: bool = Field(default=False, description="Return the time spent in each processing stage")
+
+
+class AmbiguityMatch(BaseModel):
+    phrase: str
+    category: str
+    message: str
+    positions: List[int] = Field(default_factory=list, description="Start offsets of each occurrence in the notes")
+
+
+class TokenUsage(BaseModel):
+    llm_calls: int = Field(default=0, description="Completions sent to the LLM (cache hits cost nothing)")
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = Field(default=0, description="Prompt tokens served from the provider's prompt cache")
+    total_tokens: int = 0
 
 
 class TransformResponse(BaseModel):
     user_stories: List[UserStory]
     ambiguity_flags: List[str] = Field(default_factory=list, description="Detected ambiguous requirements")
+    ambiguity_details: List[AmbiguityMatch] = Field(default_factory=list, description="Where each ambiguous phrase occurs")
+    repaired_count: int = Field(default=0, description="Stories that failed validation and were fixed by a repair call")
+    rejected_count: int = Field(default=0, description="Stories dropped because they failed validation")
+    duplicate_count: int = Field(default=0, description="Stories flagged or merged as near-duplicates of stored ones")
+    token_usage: TokenUsage = Field(default_factory=TokenUsage, description="LLM tokens spent on this request")
+    timings: Optional[Dict[str, float]] = Field(None, description="Seconds spent per stage, when requested")
     processing_time: float
 
 
+class BatchTransformRequest(BaseModel):
+    requests: List[TransformRequest] = Field(..., min_length=1, description="Transform requests to run as one job")
+
+
+class BatchJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class BatchItemStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: BatchItemStatus = Field(default=BatchItemStatus.PENDING)
+    attempts: int = 0
+    result: Optional[TransformResponse] = None
+    error: Optional[str] = None
+
+
+class BatchJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    status: BatchJobStatus = Field(default=BatchJobStatus.PENDING)
+    total: int
+    completed: int = 0
+    failed: int = 0
+    items: List[BatchItemResult] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
+
+class StorySortField(str, Enum):
+    CREATED_AT = "created_at"
+    INVEST_SCORE = "invest_score"
+
+
+class StoryQuery(BaseModel):
+    test_status: Optional[TestStatus] = None
+    min_invest_score: Optional[int] = Field(None, ge=0, le=6, description="Minimum number of INVEST criteria met")
+    max_invest_score: Optional[int] = Field(None, ge=0, le=6, description="Maximum number of INVEST criteria met")
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    sort: StorySortField = Field(default=StorySortField.CREATED_AT)
+    descending: bool = False
+    cursor: Optional[str] = Field(None, description="Opaque cursor returned by the previous page")
+    limit: Optional[int] = Field(None, ge=1, le=1000, description="Page size (all matching stories if omitted)")
+
+    # Stored timestamps are naive local time; comparing them with aware bounds would fail
+    _naive_bounds = field_validator("created_after", "created_before")(naive_local)
+
+
+class SearchHit(BaseModel):
+    score: float = Field(..., description="BM25 relevance score")
+    user_story: UserStory
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    FEATURE = "feature"
+
+
+class ImportFailure(BaseModel):
+    line: int = Field(..., description="1-based line number in the uploaded NDJSON")
+    id: Optional[str] = Field(None, description="Story ID, if the line parsed")
+    errors: List[Dict[str, str]]
+
+
+class ImportResult(BaseModel):
+    imported: int = 0
+    invalid: int = Field(default=0, description="Lines that are not a valid UserStory")
+    rejected: int = Field(default=0, description="Stories that failed the business rules")
+    failures: List[ImportFailure] = Field(default_factory=list, description="The first 100 invalid or rejected lines")
+
+
+class BulkValidationRequest(BaseModel):
+    test_status: Optional[TestStatus] = None
+    min_invest_score: Optional[int] = Field(None, ge=0, le=6, description="Minimum number of INVEST criteria met")
+    max_invest_score: Optional[int] = Field(None, ge=0, le=6, description="Maximum number of INVEST criteria met")
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+    _naive_bounds = field_validator("created_after", "created_before")(naive_local)
+
+
+class BulkValidationJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    status: BatchJobStatus = Field(default=BatchJobStatus.PENDING)
+    filters: BulkValidationRequest = Field(default_factory=BulkValidationRequest)
+    processed: int = 0
+    valid: int = 0
+    invalid: int = 0
+    error_histogram: Dict[str, int] = Field(default_factory=dict, description="Validation errors per story field")
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
+
 class TestUpdateRequest(BaseModel):
     test_status: TestStatus
     scenario_index: Optional[int] = Field(None, description="Index of specific scenario to update")
@@ -0,0 +1,83 @@
+import re
+import math
+from itertools import chain, zip_longest
+from typing import List
+
+from dedup import DuplicateIndex
+from models import UserStory
+
+
+# Paragraph breaks, and the start of a markdown heading line
+BLOCK_BOUNDARY = re.compile(r"\n[ \t]*\n\s*|\n(?=#{1,6}\s)")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+CHUNK_CONTEXT = "This is an excerpt of a longer document. Only write stories for requirements stated in this excerpt."
+
+
+def _split_oversized(block: str, chunk_chars: int) -> List[str]:
+    """Break a block longer than a chunk into sentences, cutting sentences that are still too long"""
+    pieces = []
+    for sentence in SENTENCE_BOUNDARY.split(block):
+        pieces.extend(sentence[i:i + chunk_chars] for i in range(0, len(sentence), chunk_chars))
+    return pieces
+
+
+def split_notes(content: str, chunk_chars: int, overlap_chars: int = 0) -> List[str]:
+    """Split notes into chunks of at most ``chunk_chars`` on section and paragraph boundaries
+
+    Each chunk after the first starts with the trailing paragraphs of the
+    previous one, up to ``overlap_chars``, so requirements spanning a boundary
+    are seen whole at least once. Notes that fit in one chunk are returned
+    unchanged; ``chunk_chars <= 0`` disables splitting.
+    """
+    if chunk_chars <= 0 or len(content) <= chunk_chars:
+        return [content]
+
+    blocks = []
+    for block in BLOCK_BOUNDARY.split(content):
+        block = block.strip()
+        if block:
+            blocks.extend([block] if len(block) <= chunk_chars else _split_oversized(block, chunk_chars))
+
+    chunks = []
+    current: List[str] = []
+    size = 0
+    for block in blocks:
+        if current and size + 2 + len(block) > chunk_chars:
+            chunks.append("\n\n".join(current))
+            # Carry whole trailing paragraphs into the next chunk as overlap
+            overlap: List[str] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                if overlap_size + len(previous) > overlap_chars:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += len(previous) + 2
+            while overlap and overlap_size + len(block) > chunk_chars:
+                overlap_size -= len(overlap.pop(0)) + 2
+            current, size = overlap, max(overlap_size - 2, 0)
+        current.append(block)
+        size += len(block) + (2 if len(current) > 1 else 0)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def chunk_story_budget(max_stories: int, chunk_count: int) -> int:
+    """Stories to ask for per chunk: a fair share of ``max_stories`` plus one spare for duplicates"""
+    return min(max_stories, math.ceil(max_stories / chunk_count) + 1)
+
+
+def merge_chunk_stories(chunk_stories: List[List[UserStory]], max_stories: int,
+                        threshold: float = 0.8) -> List[UserStory]:
+    """Merge per-chunk stories, dropping near-duplicates and keeping at most ``max_stories``
+
+    Chunks are interleaved round-robin so a story cap keeps stories from
+    every part of the document instead of only the first chunks. Overlapping
+    chunks tend to produce the same story twice; the first copy is kept.
+    """
+    interleaved = [
+        story for story in chain.from_iterable(zip_longest(*chunk_stories)) if story is not None
+    ]
+    matches = DuplicateIndex(threshold=threshold).find_many(interleaved)
+    return [story for story, match in zip(interleaved, matches) if match is None][:max_stories]
@@ -0,0 +1,60 @@
+"""
+Stories for the rule validation tests and benchmarks.
+
+``make_stories`` builds sample stories with randomly broken fields, and
+``legacy_validate`` is the original hand-written validation, kept as the
+reference the declarative rules engine must agree with.
+"""
+
+import random
+import re
+
+from models import UserStory, GherkinKeyword
+from fake_llm import SAMPLE_STORIES
+
+
+def legacy_validate(story: UserStory):
+    """The original implementation: rules hard-coded and re-evaluated per call"""
+    errors = []
+    if not story.definition_of_done or len(story.definition_of_done.strip()) < 10:
+        errors.append({"field": "definition_of_done",
+                       "message": "Definition of Done must be at least 10 characters long"})
+    if not story.acceptance_criteria or len(story.acceptance_criteria) == 0:
+        errors.append({"field": "acceptance_criteria",
+                       "message": "User story must have at least one acceptance criteria scenario"})
+    if not re.match(r"^As a .+, I want .+so that .+", story.title, re.IGNORECASE):
+        errors.append({"field": "title",
+                       "message": "Title must follow format: 'As a [user], I want [goal] so that [reason]'"})
+    for i, scenario in enumerate(story.acceptance_criteria):
+        keywords = [step.keyword for step in scenario.steps]
+        for keyword in [GherkinKeyword.GIVEN, GherkinKeyword.WHEN, GherkinKeyword.THEN]:
+            if keyword not in keywords:
+                errors.append({"field": f"acceptance_criteria[{i}]",
+                               "message": f"Scenario '{scenario.scenario_title}' missing {keyword.value} step"})
+    invest = story.invest_criteria
+    if sum([invest.independent, invest.negotiable, invest.valuable,
+            invest.estimable, invest.small, invest.testable]) < 4:
+        errors.append({"field": "invest_criteria",
+                       "message": "User story should meet at least 4 out of 6 INVEST criteria"})
+    return {"is_valid": len(errors) == 0, "errors": errors}
+
+
+def make_stories(count: int, seed: int = 0):
+    """Sample stories with randomly broken fields so every rule fires sometimes"""
+    rng = random.Random(seed)
+    stories = []
+    for i in range(count):
+        data = UserStory.model_validate(SAMPLE_STORIES[i % len(SAMPLE_STORIES)]).model_dump()
+        if rng.random() < 0.2:
+            data["title"] = "Export a report"
+        if rng.random() < 0.1:
+            data["definition_of_done"] = "Done"
+        for field in data["invest_criteria"]:
+            data["invest_criteria"][field] = rng.random() < 0.75
+        for scenario in data["acceptance_criteria"]:
+            if rng.random() < 0.1:
+                scenario["steps"] = scenario["steps"][1:]
+        if rng.random() < 0.05:
+            data["acceptance_criteria"] = []
+        stories.append(UserStory.model_validate(data))
+    return stories
@@ -0,0 +1,232 @@
+import os
+import re
+import json
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from models import UserStory, GherkinKeyword
+from metrics import metrics
+from story_stats import invest_mask
+
+
+# Business rules as data: each entry names a registered rule type plus its parameters
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {
+        "type": "min_length",
+        "field": "definition_of_done",
+        "min_length": 10,
+        "message": "Definition of Done must be at least 10 characters long"
+    },
+    {
+        "type": "min_items",
+        "field": "acceptance_criteria",
+        "min_items": 1,
+        "message": "User story must have at least one acceptance criteria scenario"
+    },
+    {
+        "type": "pattern",
+        "field": "title",
+        "pattern": r"^As a .+, I want .+so that .+",
+        "ignore_case": True,
+        "message": "Title must follow format: 'As a [user], I want [goal] so that [reason]'"
+    },
+    {
+        "type": "gherkin_keywords",
+        "field": "acceptance_criteria",
+        "required": ["Given", "When", "Then"],
+        "message": "Scenario '{scenario}' missing {keyword} step"
+    },
+    {
+        "type": "invest_minimum",
+        "field": "invest_criteria",
+        "minimum": 4,
+        "message": "User story should meet at least 4 out of 6 INVEST criteria"
+    },
+]
+
+RULE_TYPES: Dict[str, Type["Rule"]] = {}
+
+
+def register_rule(name: str) -> Callable[[Type["Rule"]], Type["Rule"]]:
+    """Class decorator that makes a rule type available to rule definitions"""
+    def decorator(cls: Type["Rule"]) -> Type["Rule"]:
+        cls.type_name = name
+        RULE_TYPES[name] = cls
+        return cls
+    return decorator
+
+
+class Rule:
+    """A compiled business rule; subclasses precompute everything they can in __init__"""
+
+    type_name = ""
+
+    def __init__(self, field: str, message: str):
+        self.field = field
+        self.message = message
+        self.get = attrgetter(field)
+
+    def error(self, message: Optional[str] = None, field: Optional[str] = None) -> Dict[str, str]:
+        return {"field": field or self.field, "message": message or self.message}
+
+    def check(self, story: UserStory) -> List[Dict[str, str]]:
+        raise NotImplementedError
+
+    def check_many(self, stories: Sequence[UserStory]) -> List[Tuple[int, List[Dict[str, str]]]]:
+        """Return (index, errors) for the failing stories of a batch
+
+        Only failures are returned so a mostly valid batch allocates almost
+        nothing; override when a rule can do better than one call per story.
+        """
+        check = self.check
+        return [(i, errors) for i, story in enumerate(stories) if (errors := check(story))]
+
+
+@register_rule("min_length")
+class MinLengthRule(Rule):
+    def __init__(self, field: str, message: str, min_length: int):
+        super().__init__(field, message)
+        self.min_length = min_length
+
+    def check(self, story: UserStory) -> List[Dict[str, str]]:
+        value = self.get(story)
+        if not value or len(value.strip()) < self.min_length:
+            return [self.error()]
+        return []
+
+    def check_many(self, stories: Sequence[UserStory]) -> List[Tuple[int, List[Dict[str, str]]]]:
+        get, min_length = self.get, self.min_length
+        return [
+            (i, [self.error()]) for i, value in enumerate(map(get, stories))
+            if not value or len(value.strip()) < min_length
+        ]
+
+
+@register_rule("min_items")
+class MinItemsRule(Rule):
+    def __init__(self, field: str, message: str, min_items: int):
+        super().__init__(field, message)
+        self.min_items = min_items
+
+    def check(self, story: UserStory) -> List[Dict[str, str]]:
+        if len(self.get(story) or []) < self.min_items:
+            return [self.error()]
+        return []
+
+
+@register_rule("pattern")
+class PatternRule(Rule):
+    def __init__(self, field: str, message: str, pattern: str, ignore_case: bool = False):
+        super().__init__(field, message)
+        self.pattern = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+    def check(self, story: UserStory) -> List[Dict[str, str]]:
+        if not self.pattern.match(self.get(story)):
+            return [self.error()]
+        return []
+
+    def check_many(self, stories: Sequence[UserStory]) -> List[Tuple[int, List[Dict[str, str]]]]:
+        match = self.pattern.match
+        return [(i, [self.error()]) for i, value in enumerate(map(self.get, stories)) if not match(value)]
+
+
+@register_rule("gherkin_keywords")
+class GherkinKeywordsRule(Rule):
+    """Every scenario must contain each required keyword at least once"""
+
+    def __init__(self, field: str, message: str, required: List[str]):
+        super().__init__(field, message)
+        self.required = [GherkinKeyword(keyword) for keyword in required]
+        self.required_set = frozenset(self.required)
+
+    def check(self, story: UserStory) -> List[Dict[str, str]]:
+        errors = []
+        required_set = self.required_set
+        for i, scenario in enumerate(self.get(story)):
+            keywords = {step.keyword for step in scenario.steps}
+            if required_set <= keywords:
+                continue
+            for keyword in self.required:
+                if keyword not in keywords:
+                    errors.append(self.error(
+                        self.message.format(scenario=scenario.scenario_title, keyword=keyword.value),
+                        f"{self.field}[{i}]"
+                    ))
+        return errors
+
+
+@register_rule("invest_minimum")
+class InvestMinimumRule(Rule):
+    def __init__(self, field: str, message: str, minimum: int):
+        super().__init__(field, message)
+        self.minimum = minimum
+
+    def check(self, story: UserStory) -> List[Dict[str, str]]:
+        if invest_mask(story).bit_count() < self.minimum:
+            return [self.error()]
+        return []
+
+    def check_many(self, stories: Sequence[UserStory]) -> List[Tuple[int, List[Dict[str, str]]]]:
+        # INVEST booleans are packed into one int per story and checked with a popcount
+        minimum = self.minimum
+        return [
+            (i, [self.error()]) for i, mask in enumerate(map(invest_mask, stories))
+            if mask.bit_count() < minimum
+        ]
+
+
+def compile_rules(definitions: List[Dict[str, Any]]) -> List[Rule]:
+    """Turn rule definitions into compiled rule objects"""
+    rules = []
+    for definition in definitions:
+        params = dict(definition)
+        rule_type = params.pop("type")
+        if rule_type not in RULE_TYPES:
+            raise ValueError(f"Unknown rule type: {rule_type}")
+        rules.append(RULE_TYPES[rule_type](**params))
+    return rules
+
+
+class RulesEngine:
+    """Validates user stories against business rules"""
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None):
+        self.definitions = rules if rules is not None else DEFAULT_RULES
+        self.rules = compile_rules(self.definitions)
+
+    @classmethod
+    def from_env(cls) -> "RulesEngine":
+        """Load rule definitions from the JSON file in RULES_PATH, falling back to the defaults"""
+        path = os.getenv("RULES_PATH")
+        if not path:
+            return cls()
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def validate_user_story(self, story: UserStory) -> Dict[str, Any]:
+        """Validate a user story against defined rules"""
+        errors = []
+        for rule in self.rules:
+            errors.extend(rule.check(story))
+
+        return {
+            "is_valid": len(errors) == 0,
+            "errors": errors
+        }
+
+    def validate_many(self, stories: Sequence[UserStory]) -> List[Dict[str, Any]]:
+        """Validate a batch of stories, one pass over the batch per rule"""
+        stories = list(stories)
+        failures: Dict[int, List[Dict[str, str]]] = {}
+        with metrics.stage("validation"):
+            for rule in self.rules:
+                for i, rule_errors in rule.check_many(stories):
+                    if i in failures:
+                        failures[i].extend(rule_errors)
+                    else:
+                        failures[i] = rule_errors
+
+        return [
+            {"is_valid": i not in failures, "errors": failures.get(i) or []}
+            for i in range(len(stories))
+        ]
@@ -0,0 +1,304 @@
+import re
+import math
+import heapq
+import hashlib
+import sqlite3
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from models import UserStory
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# A trailing * makes a query term a prefix
+QUERY_PATTERN = re.compile(r"(\w+)(\*?)")
+
+# Title words count double: a match there says more about the story than one in a step
+TITLE_WEIGHT = 2
+MAX_TERM_FREQUENCY = 0xFFFF
+
+
+# Where ``SearchIndex.save`` keeps the index inside a SQLite story database
+SNAPSHOT_TABLES = (
+    "CREATE TABLE IF NOT EXISTS search_meta (key TEXT PRIMARY KEY, value NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS search_terms (term_id INTEGER PRIMARY KEY, term TEXT NOT NULL, "
+    "docs BLOB NOT NULL, frequencies BLOB NOT NULL, max_tf INTEGER NOT NULL, min_length INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS search_documents (number INTEGER PRIMARY KEY, story_id TEXT NOT NULL, "
+    "length INTEGER NOT NULL, terms BLOB NOT NULL, fingerprint BLOB NOT NULL)",
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.casefold())
+
+
+class SearchIndex:
+    """In-process BM25 inverted index over story text
+
+    Indexes the title, description, definition of done and every Gherkin
+    step of each story. Each term has a postings list of document numbers
+    and term frequencies in two typed arrays, appended in document order,
+    so 100k stories take tens of megabytes rather than a dict per posting.
+
+    Removing a story tombstones its document number; the postings are
+    compacted once tombstones outnumber live documents. Updates whose text
+    didn't change (e.g. a new test status) leave the index alone.
+
+    Queries are OR queries ranked by BM25. ``term*`` matches every indexed
+    term with that prefix, up to ``max_expansions`` of the most frequent.
+    Terms are scored rarest first, and once no document outside the
+    current candidates could still reach the top ``limit``, the remaining
+    (common) terms only update those candidates.
+    """
+
+    FORMAT = 2
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_expansions: int = 50):
+        self.k1 = k1
+        self.b = b
+        self.max_expansions = max_expansions
+        self._term_ids: Dict[str, int] = {}
+        self._sorted_terms: List[str] = []
+        # term id -> (document numbers, term frequencies)
+        self._postings: List[Tuple[array, array]] = []
+        self._df = array("I")
+        # Per term, the highest frequency and the shortest document seen: they bound its score
+        self._max_tf = array("H")
+        self._min_length = array("I")
+        # document number -> story id (None once removed), length, term ids and text fingerprint
+        self._story_ids: List[Optional[str]] = []
+        self._lengths = array("I")
+        self._doc_terms: List[Optional[array]] = []
+        self._fingerprints: List[Optional[bytes]] = []
+        self._doc_numbers: Dict[str, int] = {}
+        self._total_length = 0
+        self._removed = 0
+
+    @staticmethod
+    def _fields(story: UserStory) -> Tuple[str, str]:
+        """The title, and the rest of the searchable text"""
+        steps = "\n".join(step.text for scenario in story.acceptance_criteria for step in scenario.steps)
+        return story.title, f"{story.description}\n{story.definition_of_done}\n{steps}"
+
+    def put(self, story: UserStory):
+        """Index a new or updated story"""
+        title, body = self._fields(story)
+        fingerprint = hashlib.blake2b(f"{title}\x1f{body}".encode("utf-8"), digest_size=8).digest()
+        number = self._doc_numbers.get(story.id)
+        if number is not None:
+            if self._fingerprints[number] == fingerprint:
+                return
+            self._remove_number(number)
+
+        counts = Counter(tokenize(body))
+        for token in tokenize(title):
+            counts[token] += TITLE_WEIGHT
+
+        number = len(self._story_ids)
+        length = sum(counts.values())
+        term_ids = array("I")
+        for term, count in counts.items():
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                term_id = self._add_term(term)
+            docs, frequencies = self._postings[term_id]
+            count = min(count, MAX_TERM_FREQUENCY)
+            docs.append(number)
+            frequencies.append(count)
+            self._df[term_id] += 1
+            if count > self._max_tf[term_id]:
+                self._max_tf[term_id] = count
+            if length < self._min_length[term_id]:
+                self._min_length[term_id] = length
+            term_ids.append(term_id)
+
+        self._story_ids.append(story.id)
+        self._lengths.append(length)
+        self._doc_terms.append(term_ids)
+        self._fingerprints.append(fingerprint)
+        self._doc_numbers[story.id] = number
+        self._total_length += length
+
+    def _add_term(self, term: str) -> int:
+        term_id = len(self._postings)
+        self._term_ids[term] = term_id
+        insort(self._sorted_terms, term)
+        self._postings.append((array("I"), array("H")))
+        self._df.append(0)
+        self._max_tf.append(0)
+        self._min_length.append(0xFFFFFFFF)
+        return term_id
+
+    def remove(self, story_id: str):
+        number = self._doc_numbers.pop(story_id, None)
+        if number is not None:
+            self._remove_number(number)
+
+    def _remove_number(self, number: int):
+        for term_id in self._doc_terms[number]:
+            self._df[term_id] -= 1
+        self._total_length -= self._lengths[number]
+        self._story_ids[number] = None
+        self._doc_terms[number] = None
+        self._fingerprints[number] = None
+        self._lengths[number] = 0
+        self._removed += 1
+        if self._removed > max(1000, len(self._doc_numbers)):
+            self._compact()
+
+    def _compact(self):
+        """Drop removed documents from the postings and renumber the rest, keeping their order"""
+        live = [number for number, story_id in enumerate(self._story_ids) if story_id is not None]
+        renumbered = {old: new for new, old in enumerate(live)}
+        for term_id, (docs, frequencies) in enumerate(self._postings):
+            kept = [(renumbered[doc], frequency) for doc, frequency in zip(docs, frequencies) if doc in renumbered]
+            self._postings[term_id] = (array("I", [doc for doc, _ in kept]), array("H", [f for _, f in kept]))
+            # Removals only ever loosened the bounds; make them tight again
+            self._max_tf[term_id] = max((frequency for _, frequency in kept), default=0)
+            self._min_length[term_id] = min((self._lengths[doc] for doc, _ in zip(docs, frequencies)
+                                             if doc in renumbered), default=0xFFFFFFFF)
+        self._story_ids = [self._story_ids[number] for number in live]
+        self._lengths = array("I", [self._lengths[number] for number in live])
+        self._doc_terms = [self._doc_terms[number] for number in live]
+        self._fingerprints = [self._fingerprints[number] for number in live]
+        self._doc_numbers = {story_id: number for number, story_id in enumerate(self._story_ids)}
+        self._removed = 0
+
+    def clear(self):
+        self.__init__(self.k1, self.b, self.max_expansions)
+
+    def _expand(self, word: str, prefix: bool) -> List[int]:
+        if not prefix:
+            term_id = self._term_ids.get(word)
+            return [term_id] if term_id is not None and self._df[term_id] else []
+        start = bisect_left(self._sorted_terms, word)
+        end = bisect_left(self._sorted_terms, word + "\U0010ffff", start)
+        term_ids = [self._term_ids[term] for term in self._sorted_terms[start:end]]
+        return heapq.nlargest(self.max_expansions, (term_id for term_id in term_ids if self._df[term_id]),
+                              key=self._df.__getitem__)
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """Return (story id, BM25 score) of the best ``limit`` matches, best first
+
+        Raises ValueError if the query has no searchable terms.
+        """
+        words = QUERY_PATTERN.findall(query.casefold())
+        if not words:
+            raise ValueError("Query has no searchable terms")
+        term_ids = set()
+        for word, star in words:
+            term_ids.update(self._expand(word, bool(star)))
+        documents = len(self._doc_numbers)
+        if not term_ids or not documents:
+            return []
+
+        k1 = self.k1
+        norm_base = k1 * (1 - self.b)
+        norm_scale = k1 * self.b * documents / self._total_length
+        df = self._df
+        terms = sorted(term_ids, key=df.__getitem__)
+        gains = [math.log(1 + (documents - df[term_id] + 0.5) / (df[term_id] + 0.5)) * (k1 + 1)
+                 for term_id in terms]
+        # No document gets more from a term than its top frequency in its shortest document would
+        bounds = [
+            gain * self._max_tf[term_id] / (self._max_tf[term_id] + norm_base
+                                            + norm_scale * self._min_length[term_id])
+            for term_id, gain in zip(terms, gains)
+        ]
+        remaining = [sum(bounds[i:]) for i in range(len(bounds))]
+
+        lengths = self._lengths
+        story_ids = self._story_ids
+        scores: Dict[int, float] = {}
+        for term_id, gain, bound in zip(terms, gains, remaining):
+            docs, frequencies = self._postings[term_id]
+            if len(scores) >= limit and heapq.nlargest(limit, scores.values())[-1] >= bound:
+                # Documents not scored yet can't make the top results any more: update the candidates only
+                if len(scores) * 16 < len(docs):
+                    for doc in scores:
+                        position = bisect_left(docs, doc)
+                        if position < len(docs) and docs[position] == doc:
+                            tf = frequencies[position]
+                            scores[doc] += gain * tf / (tf + norm_base + norm_scale * lengths[doc])
+                else:
+                    for doc, tf in zip(docs, frequencies):
+                        if doc in scores:
+                            scores[doc] += gain * tf / (tf + norm_base + norm_scale * lengths[doc])
+                continue
+            if not scores:
+                scores = {doc: gain * tf / (tf + norm_base + norm_scale * lengths[doc])
+                          for doc, tf in zip(docs, frequencies) if story_ids[doc] is not None}
+                continue
+            for doc, tf in zip(docs, frequencies):
+                if story_ids[doc] is not None:
+                    scores[doc] = scores.get(doc, 0.0) + gain * tf / (tf + norm_base + norm_scale * lengths[doc])
+
+        best = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        return [(story_ids[doc], score) for doc, score in best]
+
+    def save(self, db: sqlite3.Connection, writes: int):
+        """Write the index into ``db``'s search tables, tagged with the store ``writes`` it reflects
+
+        Part of the caller's transaction, so the tag and the tables always agree.
+        """
+        if self._removed:
+            self._compact()
+        for statement in SNAPSHOT_TABLES:
+            db.execute(statement)
+        for table in ("search_meta", "search_terms", "search_documents"):
+            db.execute(f"DELETE FROM {table}")
+        db.executemany("INSERT INTO search_meta (key, value) VALUES (?, ?)", [
+            ("format", self.FORMAT), ("writes", writes), ("stories", len(self)), ("k1", self.k1), ("b", self.b)
+        ])
+        db.executemany(
+            "INSERT INTO search_terms (term_id, term, docs, frequencies, max_tf, min_length) VALUES (?, ?, ?, ?, ?, ?)",
+            ((term_id, term, docs.tobytes(), frequencies.tobytes(), self._max_tf[term_id], self._min_length[term_id])
+             for term_id, (term, (docs, frequencies)) in enumerate(zip(self._term_ids, self._postings)))
+        )
+        db.executemany(
+            "INSERT INTO search_documents (number, story_id, length, terms, fingerprint) VALUES (?, ?, ?, ?, ?)",
+            ((number, story_id, length, terms.tobytes(), fingerprint) for number, (story_id, length, terms, fingerprint)
+             in enumerate(zip(self._story_ids, self._lengths, self._doc_terms, self._fingerprints)))
+        )
+
+    @classmethod
+    def load(cls, db: sqlite3.Connection, writes: int, stories: int) -> Optional["SearchIndex"]:
+        """Read the index saved in ``db``; None if there is none or it doesn't reflect ``writes`` and ``stories``"""
+        try:
+            meta = dict(db.execute("SELECT key, value FROM search_meta"))
+        except sqlite3.OperationalError:
+            return None  # never saved
+        if (meta.get("format"), meta.get("writes"), meta.get("stories")) != (cls.FORMAT, writes, stories):
+            return None
+        index = cls(k1=meta["k1"], b=meta["b"])
+        for term_id, term, docs, frequencies, max_tf, min_length in db.execute(
+                "SELECT term_id, term, docs, frequencies, max_tf, min_length FROM search_terms ORDER BY term_id"):
+            index._term_ids[term] = term_id
+            postings = (array("I"), array("H"))
+            postings[0].frombytes(docs)
+            postings[1].frombytes(frequencies)
+            index._postings.append(postings)
+            # Saved compacted, so every posting is a live document
+            index._df.append(len(postings[0]))
+            index._max_tf.append(max_tf)
+            index._min_length.append(min_length)
+        for number, story_id, length, terms, fingerprint in db.execute(
+                "SELECT number, story_id, length, terms, fingerprint FROM search_documents ORDER BY number"):
+            doc_terms = array("I")
+            doc_terms.frombytes(terms)
+            index._story_ids.append(story_id)
+            index._lengths.append(length)
+            index._doc_terms.append(doc_terms)
+            index._fingerprints.append(fingerprint)
+            index._doc_numbers[story_id] = number
+        if len(index) != stories:
+            return None
+        index._sorted_terms = sorted(index._term_ids)
+        index._total_length = sum(index._lengths)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._doc_numbers)
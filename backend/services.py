@@ -0,0 +1,97 @@
+import os
+from contextlib import contextmanager
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterator
+
+from models import TransformRequest, TransformResponse
+from rules_engine import RulesEngine
+from story_store import StoryStore, create_story_store
+from batch_scheduler import BatchScheduler
+from bulk_validation import BulkValidator
+
+if TYPE_CHECKING:
+    from llm_service_simple import LLMService
+
+
+class Services:
+    """The API's long-lived services, each built on first use
+
+    Importing the app and answering health checks builds nothing. The LLM
+    service, and with it the OpenAI client and its HTTP pool, is only
+    imported and created for the first request that needs it. The story
+    store is opened (and a SQLite store's indexes loaded) on first use.
+    ``override`` swaps services for fakes in tests without building the
+    ones they replace.
+
+    Set ``PRELOAD_SERVICES=true`` to build everything at startup instead,
+    so the first request doesn't pay for it.
+    """
+
+    NAMES = ("llm_service", "rules_engine", "story_store", "batch_scheduler", "bulk_validator")
+
+    def __init__(self, process_transform: Callable[[TransformRequest], Awaitable[TransformResponse]]):
+        self._process_transform = process_transform
+
+    @cached_property
+    def llm_service(self) -> "LLMService":
+        # Deferred: importing the OpenAI SDK is most of the app's import time
+        from llm_service_simple import LLMService
+        return LLMService()
+
+    @cached_property
+    def rules_engine(self) -> RulesEngine:
+        return RulesEngine.from_env()
+
+    @cached_property
+    def story_store(self) -> StoryStore:
+        """In-memory by default, SQLite with STORY_STORE=sqlite"""
+        return create_story_store()
+
+    @cached_property
+    def batch_scheduler(self) -> BatchScheduler:
+        """Background scheduler for batch transform jobs"""
+        return BatchScheduler(self._process_transform)
+
+    @cached_property
+    def bulk_validator(self) -> BulkValidator:
+        """Background revalidation of stored stories"""
+        return BulkValidator(self.story_store, self.rules_engine)
+
+    def is_built(self, name: str) -> bool:
+        return name in self.__dict__
+
+    @contextmanager
+    def override(self, **replacements: Any) -> Iterator["Services"]:
+        """Use ``replacements`` (by service name) until exit, then restore what was there
+
+        Services that weren't built before aren't built by this either.
+        """
+        unknown = set(replacements) - set(self.NAMES)
+        if unknown:
+            raise ValueError(f"Unknown services: {', '.join(sorted(unknown))}")
+        previous = {name: self.__dict__[name] for name in replacements if name in self.__dict__}
+        self.__dict__.update(replacements)
+        try:
+            yield self
+        finally:
+            for name in replacements:
+                if name in previous:
+                    self.__dict__[name] = previous[name]
+                else:
+                    self.__dict__.pop(name, None)
+
+    def preload(self):
+        for name in self.NAMES:
+            getattr(self, name)
+
+    async def aclose(self):
+        """Close pooled LLM connections and the story store (saving its search index), if they were built"""
+        if self.is_built("llm_service"):
+            await self.llm_service.aclose()
+        if self.is_built("story_store"):
+            self.story_store.close()
+
+
+def preload_enabled() -> bool:
+    """Whether services are built at startup rather than on first use (PRELOAD_SERVICES, off by default)"""
+    return os.getenv("PRELOAD_SERVICES", "false").lower() in ("1", "true", "yes")
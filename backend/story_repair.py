@@ -0,0 +1,52 @@
+import os
+import asyncio
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from models import UserStory
+from rules_engine import RulesEngine
+
+if TYPE_CHECKING:
+    from llm_service_simple import LLMService
+
+
+def repair_attempts() -> int:
+    """Repair calls allowed per failing story (STORY_REPAIR_ATTEMPTS, 0 disables repairs)"""
+    return int(os.getenv("STORY_REPAIR_ATTEMPTS", "2"))
+
+
+async def repair_story(
+    llm_service: "LLMService",
+    rules_engine: RulesEngine,
+    story: UserStory,
+    errors: List[Dict[str, str]],
+    max_attempts: int,
+    use_cache: bool = True
+) -> Optional[UserStory]:
+    """Send a failing story back for targeted fixes until it validates or the attempts run out"""
+    for _ in range(max_attempts):
+        repaired = await llm_service.repair_story(story, errors, use_cache=use_cache)
+        if repaired is None:
+            return None
+        validation_result = rules_engine.validate_user_story(repaired)
+        if validation_result["is_valid"]:
+            return repaired
+        # Try again from the improved story with whatever errors remain
+        story, errors = repaired, validation_result["errors"]
+    return None
+
+
+async def repair_stories(
+    llm_service: "LLMService",
+    rules_engine: RulesEngine,
+    failures: List[Tuple[UserStory, List[Dict[str, str]]]],
+    max_attempts: Optional[int] = None,
+    use_cache: bool = True
+) -> List[Optional[UserStory]]:
+    """Repair failing stories concurrently; each result is the fixed story or None"""
+    max_attempts = repair_attempts() if max_attempts is None else max_attempts
+    if max_attempts <= 0 or not failures:
+        return [None] * len(failures)
+    return await asyncio.gather(*(
+        repair_story(llm_service, rules_engine, story, errors, max_attempts, use_cache)
+        for story, errors in failures
+    ))
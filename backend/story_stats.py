@@ -0,0 +1,99 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+from models import UserStory
+
+
+INVEST_FIELDS = ("independent", "negotiable", "valuable", "estimable", "small", "testable")
+
+
+def invest_mask(story: UserStory) -> int:
+    """Pack the six INVEST booleans into a bitmask (bit i = INVEST_FIELDS[i])"""
+    c = story.invest_criteria
+    return (c.independent | c.negotiable << 1 | c.valuable << 2
+            | c.estimable << 3 | c.small << 4 | c.testable << 5)
+
+
+class StoryStats:
+    """Running /stats aggregates, updated on every store write instead of recomputed per request"""
+
+    def __init__(self):
+        # story id -> (test status, INVEST mask, flagged as duplicate) currently counted for it
+        self._contributions: Dict[str, Tuple[str, int, bool]] = {}
+        self._status_counts: Dict[str, int] = {}
+        self._invest_counts = [0] * len(INVEST_FIELDS)
+        self._duplicate_count = 0
+
+    def _apply(self, status: str, mask: int, duplicate: bool, delta: int):
+        count = self._status_counts.get(status, 0) + delta
+        if count:
+            self._status_counts[status] = count
+        else:
+            del self._status_counts[status]
+        for bit in range(len(INVEST_FIELDS)):
+            if mask >> bit & 1:
+                self._invest_counts[bit] += delta
+        if duplicate:
+            self._duplicate_count += delta
+
+    def put(self, story: UserStory):
+        """Count a new story, or replace the contribution of an updated one"""
+        self.remove(story.id)
+        contribution = (story.test_status.value, invest_mask(story), story.duplicate_of is not None)
+        self._contributions[story.id] = contribution
+        self._apply(*contribution, 1)
+
+    def remove(self, story_id: str):
+        contribution = self._contributions.pop(story_id, None)
+        if contribution is not None:
+            self._apply(*contribution, -1)
+
+    def __contains__(self, story_id: str) -> bool:
+        return story_id in self._contributions
+
+    def clear(self):
+        self._contributions.clear()
+        self._status_counts.clear()
+        self._invest_counts = [0] * len(INVEST_FIELDS)
+        self._duplicate_count = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the /stats payload in O(1)"""
+        total_stories = len(self._contributions)
+        if total_stories == 0:
+            return {
+                "total_stories": 0,
+                "test_status_breakdown": {},
+                "invest_compliance": {},
+                "duplicate_stories": 0
+            }
+
+        return {
+            "total_stories": total_stories,
+            "test_status_breakdown": dict(self._status_counts),
+            "invest_compliance": {
+                field: round((count / total_stories) * 100, 1)
+                for field, count in zip(INVEST_FIELDS, self._invest_counts)
+            },
+            "duplicate_stories": self._duplicate_count
+        }
+
+    @classmethod
+    def from_stories(cls, stories: Iterable[UserStory]) -> "StoryStats":
+        stats = cls()
+        for story in stories:
+            stats.put(story)
+        return stats
+
+    def consistency_errors(self, stories: Iterable[UserStory]) -> List[str]:
+        """Recompute from scratch and describe any difference from the running counters"""
+        expected = StoryStats.from_stories(stories)
+        errors = []
+        if expected._contributions != self._contributions:
+            errors.append("tracked stories differ from the store")
+        if expected._status_counts != self._status_counts:
+            errors.append(f"test_status_breakdown {self._status_counts} != {expected._status_counts}")
+        if expected._invest_counts != self._invest_counts:
+            errors.append(f"invest counts {self._invest_counts} != {expected._invest_counts}")
+        if expected._duplicate_count != self._duplicate_count:
+            errors.append(f"duplicate_stories {self._duplicate_count} != {expected._duplicate_count}")
+        return errors
@@ -0,0 +1,626 @@
+import os
+import json
+import base64
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from models import UserStory, StoryQuery, StorySortField
+from story_stats import StoryStats, invest_mask
+from dedup import DuplicateIndex
+from compact_story import CompactStory, to_stories
+from change_feed import ChangeFeed
+from body_cache import BodyCache
+from search_index import SearchIndex
+
+
+def invest_score(story: Union[UserStory, CompactStory]) -> int:
+    """Number of INVEST criteria the story meets"""
+    if isinstance(story, CompactStory):
+        return story.invest.bit_count()
+    return invest_mask(story).bit_count()
+
+
+def sort_key(story: Union[UserStory, CompactStory], sort: StorySortField) -> tuple:
+    """Total ordering used for sorting and keyset pagination"""
+    if sort == StorySortField.INVEST_SCORE:
+        return (invest_score(story), story.created_at, story.id)
+    return (story.created_at, story.id)
+
+
+def encode_cursor(sort: StorySortField, key: tuple) -> str:
+    parts = [part.isoformat(timespec="microseconds") if isinstance(part, datetime) else part for part in key]
+    raw = json.dumps({"sort": sort.value, "key": parts}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: StorySortField) -> tuple:
+    """Decode a cursor, raising ValueError if it is malformed or for another sort order"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if data["sort"] != sort.value:
+            raise ValueError("Cursor was issued for a different sort order")
+        key = data["key"]
+        if sort == StorySortField.INVEST_SCORE:
+            return (int(key[0]), datetime.fromisoformat(key[1]), str(key[2]))
+        return (datetime.fromisoformat(key[0]), str(key[1]))
+    except (KeyError, IndexError, TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def matches(story: Union[UserStory, CompactStory], query: StoryQuery) -> bool:
+    """Check a story against the query filters"""
+    if query.test_status is not None and story.test_status != query.test_status:
+        return False
+    if query.min_invest_score is not None or query.max_invest_score is not None:
+        score = invest_score(story)
+        if query.min_invest_score is not None and score < query.min_invest_score:
+            return False
+        if query.max_invest_score is not None and score > query.max_invest_score:
+            return False
+    if query.created_after is not None and story.created_at < query.created_after:
+        return False
+    if query.created_before is not None and story.created_at >= query.created_before:
+        return False
+    return True
+
+
+class StoryStore:
+    """Storage interface behind the user story CRUD routes
+
+    Every write also updates ``stats``, the running /stats aggregates,
+    ``duplicates``, the near-duplicate index, and ``search``, the full-text
+    index behind /search, and is published on
+    ``changes``, the versioned feed behind /events. The feed's version
+    numbers double as the store and per-story versions behind ETags, and
+    ``bodies`` caches encoded GET responses per version.
+    """
+
+    def __init__(self):
+        self.stats = StoryStats()
+        self.duplicates = DuplicateIndex.from_env()
+        self.search = SearchIndex()
+        self.changes = ChangeFeed.from_env()
+        self.bodies = BodyCache.from_env()
+        # story id -> version of the last write to it
+        self._versions: Dict[str, int] = {}
+
+    def _publish(self, type: str, stories: Iterable[UserStory] = (), story_ids: Iterable[str] = ()):
+        stories, story_ids = list(stories), list(story_ids)
+        event = self.changes.publish(type, stories, story_ids, self.stats.snapshot())
+        if type == "cleared":
+            self._versions.clear()
+        for story in stories:
+            self._versions[story.id] = event.version
+        for story_id in story_ids:
+            self._versions.pop(story_id, None)
+
+    def _publish_added(self, stories: List[UserStory], replaced: Set[str]):
+        """Publish an ``add_many``: stories whose id was ``replaced`` as updated, the rest as created"""
+        created = [story for story in stories if story.id not in replaced]
+        updated = [story for story in stories if story.id in replaced]
+        if created:
+            self._publish("created", created)
+        if updated:
+            self._publish("updated", updated)
+
+    def version(self) -> str:
+        """Opaque token that changes with every write to the store"""
+        return str(self.changes.version)
+
+    def story_version(self, story_id: str) -> Optional[str]:
+        """Opaque token that changes with every write to the story, None if it doesn't exist"""
+        version = self._versions.get(story_id)
+        if version is not None:
+            return str(version)
+        # Stories already on disk at startup haven't been written since
+        return str(self.changes.origin) if story_id in self else None
+
+    def get(self, story_id: str) -> Optional[UserStory]:
+        raise NotImplementedError
+
+    def add(self, story: UserStory):
+        self.add_many([story])
+
+    def add_many(self, stories: Iterable[UserStory]):
+        raise NotImplementedError
+
+    def add_deduplicated(self, stories: Iterable[UserStory]) -> Tuple[List[UserStory], int]:
+        """Add new stories after checking them against the near-duplicate index
+
+        In ``flag`` mode duplicates are stored with ``duplicate_of`` set; in
+        ``merge`` mode they are not stored and the story they duplicate is
+        returned in their place. Returns the stories to report and how many
+        duplicates were found.
+        """
+        stories = list(stories)
+        matches = self.duplicates.find_many(stories)
+        reported: List[UserStory] = []
+        new: Dict[str, UserStory] = {}
+        duplicates = 0
+        for story, match in zip(stories, matches):
+            if match is not None:
+                duplicates += 1
+                duplicate_id = match[0]
+                if self.duplicates.mode == "merge":
+                    existing = new.get(duplicate_id) or self.get(duplicate_id)
+                    if existing is not None:
+                        if all(existing.id != other.id for other in reported):
+                            reported.append(existing)
+                        continue
+                story.duplicate_of = duplicate_id
+            new[story.id] = story
+            reported.append(story)
+        self.add_many(new.values())
+        return reported, duplicates
+
+    def update(self, story: UserStory):
+        raise NotImplementedError
+
+    def delete(self, story_id: str) -> bool:
+        raise NotImplementedError
+
+    def list(self) -> List[UserStory]:
+        raise NotImplementedError
+
+    def query(self, query: StoryQuery) -> Tuple[List[UserStory], Optional[str]]:
+        """Return one page of matching stories and the cursor of the next page (None on the last page)"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __contains__(self, story_id: str) -> bool:
+        return self.get(story_id) is not None
+
+    def __len__(self) -> int:
+        return self.count()
+
+
+class InMemoryStoryStore(StoryStore):
+    """Process-local dict storage (lost on restart)
+
+    Stories are kept as ``CompactStory`` records and rebuilt as ``UserStory``
+    models only when they are read, so ``get`` returns a copy and changes
+    must be saved with ``update``. Sorted secondary indexes (overall and per
+    test status, for each sort field) let paginated queries seek straight to
+    the requested page, filtering on the compact records.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._stories: Dict[str, CompactStory] = {}
+        self._indexes: Dict[Tuple[Optional[str], StorySortField], List[tuple]] = defaultdict(list)
+        # story id -> (indexed test status, sort keys) so stale entries can be found on update
+        self._index_keys: Dict[str, Tuple[str, Dict[StorySortField, tuple]]] = {}
+
+    def _index(self, story: CompactStory):
+        self._unindex(story.id)
+        status = story.test_status.value
+        keys = {sort: sort_key(story, sort) for sort in StorySortField}
+        for sort, key in keys.items():
+            insort(self._indexes[(None, sort)], key)
+            insort(self._indexes[(status, sort)], key)
+        self._index_keys[story.id] = (status, keys)
+
+    def _unindex(self, story_id: str):
+        entry = self._index_keys.pop(story_id, None)
+        if entry is None:
+            return
+        status, keys = entry
+        for sort, key in keys.items():
+            for index in (self._indexes[(None, sort)], self._indexes[(status, sort)]):
+                del index[bisect_left(index, key)]
+
+    def get(self, story_id: str) -> Optional[UserStory]:
+        record = self._stories.get(story_id)
+        return record.to_story() if record is not None else None
+
+    def _put(self, story: UserStory):
+        record = CompactStory.from_story(story)
+        self._index(record)
+        self._stories[story.id] = record
+        self.stats.put(story)
+        self.duplicates.put(story)
+        self.search.put(story)
+
+    def add_many(self, stories: Iterable[UserStory]):
+        stories = list(stories)
+        replaced = {story.id for story in stories if story.id in self._stories}
+        for story in stories:
+            self._put(story)
+        self._publish_added(stories, replaced)
+
+    def update(self, story: UserStory):
+        self._put(story)
+        self._publish("updated", [story])
+
+    def delete(self, story_id: str) -> bool:
+        self.stats.remove(story_id)
+        self.duplicates.remove(story_id)
+        self.search.remove(story_id)
+        self._unindex(story_id)
+        if self._stories.pop(story_id, None) is None:
+            return False
+        self._publish("deleted", story_ids=[story_id])
+        return True
+
+    def list(self) -> List[UserStory]:
+        return to_stories(self._stories.values())
+
+    def query(self, query: StoryQuery) -> Tuple[List[UserStory], Optional[str]]:
+        status = query.test_status.value if query.test_status is not None else None
+        index = self._indexes[(status, query.sort)]
+
+        # Narrow the scan range with the leading sort column
+        lo, hi = 0, len(index)
+        if query.sort == StorySortField.CREATED_AT:
+            if query.created_after is not None:
+                lo = bisect_left(index, (query.created_after,))
+            if query.created_before is not None:
+                hi = bisect_left(index, (query.created_before,))
+        else:
+            if query.min_invest_score is not None:
+                lo = bisect_left(index, (query.min_invest_score,))
+            if query.max_invest_score is not None:
+                hi = bisect_left(index, (query.max_invest_score + 1,))
+        if query.cursor is not None:
+            key = decode_cursor(query.cursor, query.sort)
+            if query.descending:
+                hi = min(hi, bisect_left(index, key))
+            else:
+                lo = max(lo, bisect_right(index, key))
+
+        positions = range(hi - 1, lo - 1, -1) if query.descending else range(lo, hi)
+        page = []
+        for position in positions:
+            record = self._stories[index[position][-1]]
+            if not matches(record, query):
+                continue
+            page.append(record)
+            if query.limit is not None and len(page) > query.limit:
+                break
+
+        next_cursor = None
+        if query.limit is not None and len(page) > query.limit:
+            page = page[:query.limit]
+            next_cursor = encode_cursor(query.sort, sort_key(page[-1], query.sort))
+        return to_stories(page), next_cursor
+
+    def count(self) -> int:
+        return len(self._stories)
+
+    def clear(self):
+        self._stories.clear()
+        self._indexes.clear()
+        self._index_keys.clear()
+        self.stats.clear()
+        self.duplicates.clear()
+        self.search.clear()
+        self._publish("cleared")
+
+    def __contains__(self, story_id: str) -> bool:
+        return story_id in self._stories
+
+
+class SQLiteStoryStore(StoryStore):
+    """Embedded SQLite storage shared by every worker pointing at the same file
+
+    Running stats, the near-duplicate index and the search index are seeded
+    from the file and then kept up to date with this process's writes. When
+    another connection (another worker, or any other writer) commits to the
+    file, ``PRAGMA data_version`` changes and they are reseeded from the
+    file on next use. That costs a full read, so they suit files written
+    mostly by one process. The change feed only carries this process's
+    writes.
+
+    The search index is saved into the database's own ``search_*`` tables
+    on close and after a rebuild, tagged with a write counter that every
+    write transaction bumps and with the story count. At startup it is
+    loaded if both still match the file and rebuilt from the stories
+    otherwise.
+    """
+
+    # Statements are kept constant so sqlite3's statement cache reuses the compiled form
+    INSERT_SQL = (
+        "INSERT OR REPLACE INTO user_stories (id, test_status, invest_score, created_at, updated_at, data) "
+        "VALUES (?, ?, ?, ?, ?, ?)"
+    )
+    SELECT_SQL = "SELECT data FROM user_stories WHERE id = ?"
+    EXISTS_SQL = "SELECT 1 FROM user_stories WHERE id = ?"
+    DELETE_SQL = "DELETE FROM user_stories WHERE id = ?"
+    LIST_SQL = "SELECT data FROM user_stories ORDER BY created_at, rowid"
+    COUNT_SQL = "SELECT COUNT(*) FROM user_stories"
+    BUMP_WRITES_SQL = "UPDATE store_meta SET value = value + 1 WHERE key = 'writes'"
+    WRITES_SQL = "SELECT value FROM store_meta WHERE key = 'writes'"
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        # Reentrant: reading stats while publishing a write may reseed them
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS user_stories (
+                id TEXT PRIMARY KEY,
+                test_status TEXT NOT NULL,
+                invest_score INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_user_stories_test_status ON user_stories (test_status);
+            CREATE INDEX IF NOT EXISTS idx_user_stories_created_at ON user_stories (created_at);
+            """
+        )
+        self._migrate()
+        self._db.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_stories_created_id ON user_stories (created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_user_stories_status_created
+                ON user_stories (test_status, created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_user_stories_score
+                ON user_stories (invest_score, created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_user_stories_status_score
+                ON user_stories (test_status, invest_score, created_at, id);
+            CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO store_meta (key, value) VALUES ('writes', 0);
+            """
+        )
+        self._db.commit()
+        self._seed(load_search=True)
+
+    def _seed(self, load_search: bool = False):
+        """Rebuild the running aggregates and the indexes from what is on disk"""
+        with self._lock:
+            self._data_version_seen = self._data_version()
+            # One read transaction, so the stories and the write counter agree (a write
+            # already in progress is one, and sees its own rows)
+            begin = not self._db.in_transaction
+            if begin:
+                self._db.execute("BEGIN")
+            try:
+                # Writes to the file this process knows about, so a saved search index can be matched to it
+                self._writes = self._db.execute(self.WRITES_SQL).fetchone()[0]
+                stories = self.list()
+            finally:
+                if begin:
+                    self._db.commit()
+            self._stats = StoryStats.from_stories(stories)
+            self._duplicates = DuplicateIndex.from_env()
+            saved = SearchIndex.load(self._db, self._writes, len(stories)) if load_search else None
+            self._search = saved or SearchIndex()
+            for story in stories:
+                self._duplicates.put(story)
+                if saved is None:
+                    self._search.put(story)
+            if load_search and saved is None and stories:
+                # So the next start loads it even if this process never closes cleanly
+                self._save_search()
+
+    def _refresh(self):
+        """Reseed if another connection has committed to the file since the last seed"""
+        if self._data_version() != self._data_version_seen:
+            self._seed()
+
+    # Read through these so they never serve a state older than the file
+    @property
+    def stats(self) -> StoryStats:
+        self._refresh()
+        return self._stats
+
+    @stats.setter
+    def stats(self, stats: StoryStats):
+        self._stats = stats
+
+    @property
+    def duplicates(self) -> DuplicateIndex:
+        self._refresh()
+        return self._duplicates
+
+    @duplicates.setter
+    def duplicates(self, duplicates: DuplicateIndex):
+        self._duplicates = duplicates
+
+    @property
+    def search(self) -> SearchIndex:
+        self._refresh()
+        return self._search
+
+    @search.setter
+    def search(self, search: SearchIndex):
+        self._search = search
+
+    def _migrate(self):
+        """Add and backfill the invest_score column on databases created before it existed"""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(user_stories)")}
+        if "invest_score" in columns:
+            return
+        with self._db:
+            self._db.execute("ALTER TABLE user_stories ADD COLUMN invest_score INTEGER NOT NULL DEFAULT 0")
+            self._db.executemany(
+                "UPDATE user_stories SET invest_score = ?, created_at = ? WHERE id = ?",
+                [
+                    (invest_score(story), story.created_at.isoformat(timespec="microseconds"), story.id)
+                    for story in self.list()
+                ]
+            )
+
+    @staticmethod
+    def _row(story: UserStory) -> tuple:
+        # Fixed-width timestamps so text comparison matches chronological order
+        return (
+            story.id,
+            story.test_status.value,
+            invest_score(story),
+            story.created_at.isoformat(timespec="microseconds"),
+            story.updated_at.isoformat(timespec="microseconds") if story.updated_at else None,
+            story.model_dump_json()
+        )
+
+    def get(self, story_id: str) -> Optional[UserStory]:
+        row = self._db.execute(self.SELECT_SQL, (story_id,)).fetchone()
+        return UserStory.model_validate_json(row[0]) if row else None
+
+    def add_many(self, stories: Iterable[UserStory]):
+        stories = list(stories)
+        rows = [self._row(story) for story in stories]
+        if not rows:
+            return
+        # One transaction for the whole batch
+        with self._lock, self._db:
+            self._refresh()
+            # The running stats count every story in the file
+            replaced = {story.id for story in stories if story.id in self._stats}
+            self._db.executemany(self.INSERT_SQL, rows)
+            self._bump_writes()
+            for story in stories:
+                self._stats.put(story)
+                self._duplicates.put(story)
+                self._search.put(story)
+            self._publish_added(stories, replaced)
+
+    def update(self, story: UserStory):
+        with self._lock, self._db:
+            self._refresh()
+            self._db.execute(self.INSERT_SQL, self._row(story))
+            self._bump_writes()
+            self._stats.put(story)
+            self._duplicates.put(story)
+            self._search.put(story)
+            self._publish("updated", [story])
+
+    def delete(self, story_id: str) -> bool:
+        with self._lock, self._db:
+            self._refresh()
+            self._stats.remove(story_id)
+            self._duplicates.remove(story_id)
+            self._search.remove(story_id)
+            if self._db.execute(self.DELETE_SQL, (story_id,)).rowcount == 0:
+                return False
+            self._bump_writes()
+            self._publish("deleted", story_ids=[story_id])
+            return True
+
+    def _bump_writes(self):
+        # Part of the caller's write transaction
+        self._db.execute(self.BUMP_WRITES_SQL)
+        self._writes += 1
+
+    def list(self) -> List[UserStory]:
+        return [UserStory.model_validate_json(row[0]) for row in self._db.execute(self.LIST_SQL)]
+
+    def query(self, query: StoryQuery) -> Tuple[List[UserStory], Optional[str]]:
+        # Only fixed SQL fragments are concatenated; all values are bound parameters
+        clauses, params = [], []
+        if query.test_status is not None:
+            clauses.append("test_status = ?")
+            params.append(query.test_status.value)
+        if query.min_invest_score is not None:
+            clauses.append("invest_score >= ?")
+            params.append(query.min_invest_score)
+        if query.max_invest_score is not None:
+            clauses.append("invest_score <= ?")
+            params.append(query.max_invest_score)
+        if query.created_after is not None:
+            clauses.append("created_at >= ?")
+            params.append(query.created_after.isoformat(timespec="microseconds"))
+        if query.created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(query.created_before.isoformat(timespec="microseconds"))
+
+        if query.sort == StorySortField.INVEST_SCORE:
+            columns = ["invest_score", "created_at", "id"]
+        else:
+            columns = ["created_at", "id"]
+        if query.cursor is not None:
+            key = decode_cursor(query.cursor, query.sort)
+            placeholders = ", ".join("?" for _ in columns)
+            operator = "<" if query.descending else ">"
+            clauses.append(f"({', '.join(columns)}) {operator} ({placeholders})")
+            params.extend(part.isoformat(timespec="microseconds") if isinstance(part, datetime) else part
+                          for part in key)
+
+        direction = "DESC" if query.descending else "ASC"
+        sql = "SELECT data FROM user_stories"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY " + ", ".join(f"{column} {direction}" for column in columns)
+        if query.limit is not None:
+            sql += " LIMIT ?"
+            params.append(query.limit + 1)
+
+        page = [UserStory.model_validate_json(row[0]) for row in self._db.execute(sql, params)]
+        next_cursor = None
+        if query.limit is not None and len(page) > query.limit:
+            page = page[:query.limit]
+            next_cursor = encode_cursor(query.sort, sort_key(page[-1], query.sort))
+        return page, next_cursor
+
+    def count(self) -> int:
+        return self._db.execute(self.COUNT_SQL).fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM user_stories")
+            self._bump_writes()
+            self._stats.clear()
+            self._duplicates.clear()
+            self._search.clear()
+            self._publish("cleared")
+
+    def __contains__(self, story_id: str) -> bool:
+        return self._db.execute(self.EXISTS_SQL, (story_id,)).fetchone() is not None
+
+    def _data_version(self) -> int:
+        # Changes whenever another connection, e.g. another worker, commits to the file
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def version(self) -> str:
+        return f"{super().version()}.{self._data_version()}"
+
+    def story_version(self, story_id: str) -> Optional[str]:
+        version = super().story_version(story_id)
+        return f"{version}.{self._data_version()}" if version is not None else None
+
+    def _save_search(self):
+        """Save the search index into the file, if it reflects every write to the file"""
+        if self.path == ":memory:":
+            return
+        with self._lock:
+            try:
+                # Take the write lock first, so no other writer commits between the check and the save
+                self._db.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                print(f"Not saving the search index: {e}")
+                return
+            with self._db:
+                # Another worker writing to the file since means this process's index is incomplete
+                if self._db.execute(self.WRITES_SQL).fetchone()[0] == self._writes:
+                    self._search.save(self._db, self._writes)
+
+    def close(self):
+        self._save_search()
+        self._db.close()
+
+
+def create_story_store() -> StoryStore:
+    """Build the story store selected by STORY_STORE (``memory`` or ``sqlite``)"""
+    backend = os.getenv("STORY_STORE", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteStoryStore(os.getenv("STORY_DB_PATH", "user_stories.db"))
+    if backend == "memory":
+        return InMemoryStoryStore()
+    raise ValueError(f"Unknown STORY_STORE backend: {backend}")
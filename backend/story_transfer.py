@@ -0,0 +1,291 @@
+import os
+import re
+import zlib
+import hashlib
+import struct
+import asyncio
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from models import UserStory, StoryQuery, ImportFailure, ImportResult
+from rules_engine import RulesEngine
+from story_store import StoryStore
+
+
+# Failures listed in an import result; the counts cover all of them
+MAX_REPORTED_FAILURES = 100
+
+# Ids usable as a file name as-is: no path separators, no leading dot
+SAFE_ID = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9._-]{0,127}")
+INVALID_ID_ERROR = {"field": "id", "message": "Id must be up to 128 letters, digits, '.', '_' or '-', "
+                                              "not starting with '.'"}
+
+
+def transfer_chunk_size() -> int:
+    """Stories per page read on export and per bulk insert on import (TRANSFER_CHUNK_SIZE)"""
+    return int(os.getenv("TRANSFER_CHUNK_SIZE", "500"))
+
+
+def transfer_max_line_bytes() -> int:
+    """Longest NDJSON line accepted on import (TRANSFER_MAX_LINE_BYTES)"""
+    return int(os.getenv("TRANSFER_MAX_LINE_BYTES", str(1 << 20)))
+
+
+async def story_pages(store: StoryStore, chunk_size: int) -> AsyncIterator[List[UserStory]]:
+    """Every stored story, oldest first, one page at a time
+
+    Pages are read with the same cursors as ``GET /user_stories``, so only
+    one page is held at a time and writes between pages don't shift it.
+    Control returns to the event loop between pages.
+    """
+    query = StoryQuery(limit=chunk_size)
+    while True:
+        stories, cursor = store.query(query)
+        if stories:
+            yield stories
+        if cursor is None:
+            return
+        query = query.model_copy(update={"cursor": cursor})
+        await asyncio.sleep(0)
+
+
+async def export_ndjson(store: StoryStore, chunk_size: int) -> AsyncIterator[bytes]:
+    """One story JSON object per line, a page per chunk"""
+    async for stories in story_pages(store, chunk_size):
+        yield b"".join(story.model_dump_json().encode("utf-8") + b"\n" for story in stories)
+
+
+def feature_filename(story: UserStory) -> str:
+    """Archive member name for a story, derived from its id
+
+    Ids that could escape the archive's directory or aren't portable file
+    names get a name hashed from the id instead.
+    """
+    if SAFE_ID.fullmatch(story.id):
+        return f"{story.id}.feature"
+    return f"story-{hashlib.sha256(story.id.encode('utf-8')).hexdigest()[:32]}.feature"
+
+
+def _indent(text: str, prefix: str) -> List[str]:
+    return [f"{prefix}{line.strip()}" for line in text.splitlines() if line.strip()]
+
+
+def _single_line(text: str) -> str:
+    # A newline in a one-line field would start a new Gherkin statement
+    return " ".join(text.split())
+
+
+def to_feature(story: UserStory) -> str:
+    """Render a story as a Gherkin feature file
+
+    The test status becomes a tag, the description and definition of done
+    the feature's free-text description, and each acceptance criterion a
+    scenario. The story id is kept in a leading comment.
+    """
+    lines = [f"# id: {_single_line(story.id)}", f"@{story.test_status.value}",
+             f"Feature: {_single_line(story.title)}"]
+    lines += _indent(story.description, "  ")
+    dod = _indent(story.definition_of_done, "    ")
+    if dod:
+        lines += ["", "  Definition of Done:"] + dod
+    for scenario in story.acceptance_criteria:
+        lines += ["", f"  Scenario: {_single_line(scenario.scenario_title)}"]
+        lines += [f"    {step.keyword.value} {_single_line(step.text)}" for step in scenario.steps]
+    return "\n".join(lines) + "\n"
+
+
+async def export_features(store: StoryStore, chunk_size: int) -> AsyncIterator[bytes]:
+    """Every story's feature file, separated by blank lines"""
+    async for stories in story_pages(store, chunk_size):
+        yield "".join(to_feature(story) + "\n" for story in stories).encode("utf-8")
+
+
+class StreamingZipWriter:
+    """Writes a zip archive member by member, without seeking
+
+    Each member is deflated in memory (feature files are small), so its
+    local header can carry the real sizes and CRC. Only the central
+    directory records are kept until ``finish``, packed as bytes: about
+    90 bytes per member instead of a ``zipfile.ZipInfo`` object. Archives
+    with more than 65,535 members or past 4 GiB get ZIP64 end records.
+    """
+
+    LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+    CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+    ZIP64_END = struct.Struct("<IQHHIIQQQQ")
+    ZIP64_LOCATOR = struct.Struct("<IIQI")
+    END = struct.Struct("<IHHHHIIH")
+    # General purpose flag: names are UTF-8
+    UTF8 = 0x800
+
+    def __init__(self, compresslevel: int = 6):
+        self.compresslevel = compresslevel
+        self._directory = bytearray()
+        self._entries = 0
+        self._offset = 0
+
+    @staticmethod
+    def _dos_time(modified: datetime) -> Tuple[int, int]:
+        if modified.year < 1980:
+            return 0, (1 << 5) | 1
+        return (
+            (modified.hour << 11) | (modified.minute << 5) | (modified.second // 2),
+            ((modified.year - 1980) << 9) | (modified.month << 5) | modified.day
+        )
+
+    def add(self, name: str, data: bytes, modified: datetime) -> bytes:
+        """Local header and compressed data of one member"""
+        encoded_name = name.encode("utf-8")
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        crc = zlib.crc32(data)
+        dos_time, dos_date = self._dos_time(modified)
+        header = self.LOCAL_HEADER.pack(0x04034B50, 20, self.UTF8, zipfile.ZIP_DEFLATED, dos_time, dos_date,
+                                        crc, len(compressed), len(data), len(encoded_name), 0)
+
+        # Offsets past 4 GiB go in a ZIP64 extra field
+        extra = b""
+        offset = self._offset
+        if offset >= 0xFFFFFFFF:
+            extra = struct.pack("<HHQ", 0x0001, 8, offset)
+            offset = 0xFFFFFFFF
+        self._directory += self.CENTRAL_HEADER.pack(
+            0x02014B50, 45 if extra else 20, 45 if extra else 20, self.UTF8, zipfile.ZIP_DEFLATED,
+            dos_time, dos_date, crc, len(compressed), len(data), len(encoded_name), len(extra), 0, 0, 0,
+            0o100644 << 16, offset
+        ) + encoded_name + extra
+        self._entries += 1
+        member = header + encoded_name + compressed
+        self._offset += len(member)
+        return member
+
+    def finish(self) -> bytes:
+        """The central directory and end records"""
+        directory_offset, directory_size, entries = self._offset, len(self._directory), self._entries
+        end, self._directory = self._directory, bytearray()
+        if entries >= 0xFFFF or directory_offset >= 0xFFFFFFFF or directory_size >= 0xFFFFFFFF:
+            zip64_end_offset = directory_offset + directory_size
+            end += self.ZIP64_END.pack(0x06064B50, self.ZIP64_END.size - 12, 45, 45, 0, 0,
+                                       entries, entries, directory_size, directory_offset)
+            end += self.ZIP64_LOCATOR.pack(0x07064B50, 0, zip64_end_offset, 1)
+            entries = min(entries, 0xFFFF)
+            directory_offset = min(directory_offset, 0xFFFFFFFF)
+            directory_size = min(directory_size, 0xFFFFFFFF)
+        end += self.END.pack(0x06054B50, 0, 0, entries, entries, directory_size, directory_offset, 0)
+        return bytes(end)
+
+
+async def export_features_zip(store: StoryStore, chunk_size: int) -> AsyncIterator[bytes]:
+    """A zip archive with one ``<id>.feature`` file per story, yielded a page at a time"""
+    archive = StreamingZipWriter()
+    async for stories in story_pages(store, chunk_size):
+        yield b"".join(
+            archive.add(feature_filename(story), to_feature(story).encode("utf-8"),
+                        story.updated_at or story.created_at)
+            for story in stories
+        )
+    yield archive.finish()
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """(line number, line) for each non-blank line of a streamed body
+
+    Lines longer than ``max_line_bytes`` are given as None; the part read
+    so far is dropped as soon as it goes over, so one is never held whole.
+    """
+    pending = b""
+    # The current line already went over the limit
+    overlong = False
+    number = 0
+    async for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            number += 1
+            if overlong or len(line) > max_line_bytes:
+                overlong = False
+                yield number, None
+            elif line.strip():
+                yield number, line
+        if len(pending) > max_line_bytes:
+            overlong = True
+            pending = b""
+    if overlong:
+        yield number + 1, None
+    elif pending.strip():
+        yield number + 1, pending
+
+
+def _parse_errors(error: ValidationError) -> List[Dict[str, str]]:
+    return [
+        {"field": ".".join(str(part) for part in detail["loc"]) or "line", "message": detail["msg"]}
+        for detail in error.errors()
+    ]
+
+
+class StoryImporter:
+    """Streams NDJSON stories into the store in chunks
+
+    Each line is parsed as a ``UserStory``, whose id must match ``SAFE_ID``
+    since it becomes a file name on export; a chunk of parsed stories is
+    validated with the rules engine in a worker thread and the valid ones
+    are written with one ``add_many``. Stories keep their ids, so importing
+    an id that already exists replaces that story. Lines longer than
+    ``max_line_bytes`` are counted as invalid without being parsed.
+    """
+
+    def __init__(self, store: StoryStore, rules_engine: RulesEngine, chunk_size: Optional[int] = None,
+                 max_line_bytes: Optional[int] = None):
+        self.store = store
+        self.rules_engine = rules_engine
+        self.chunk_size = chunk_size or transfer_chunk_size()
+        self.max_line_bytes = max_line_bytes or transfer_max_line_bytes()
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> ImportResult:
+        result = ImportResult()
+        batch: List[Tuple[int, UserStory]] = []
+        async for number, line in ndjson_lines(chunks, self.max_line_bytes):
+            if line is None:
+                result.invalid += 1
+                self._report(result, ImportFailure(line=number, errors=[
+                    {"field": "line", "message": f"Line is longer than {self.max_line_bytes} bytes"}
+                ]))
+                continue
+            try:
+                story = UserStory.model_validate_json(line)
+            except ValidationError as e:
+                result.invalid += 1
+                self._report(result, ImportFailure(line=number, errors=_parse_errors(e)))
+                continue
+            if not SAFE_ID.fullmatch(story.id):
+                result.invalid += 1
+                self._report(result, ImportFailure(line=number, errors=[INVALID_ID_ERROR]))
+                continue
+            batch.append((number, story))
+            if len(batch) >= self.chunk_size:
+                await self._flush(batch, result)
+                batch = []
+        if batch:
+            await self._flush(batch, result)
+        return result
+
+    async def _flush(self, batch: List[Tuple[int, UserStory]], result: ImportResult):
+        stories = [story for _, story in batch]
+        validations = await asyncio.to_thread(self.rules_engine.validate_many, stories)
+        valid = []
+        for (number, story), validation in zip(batch, validations):
+            if validation["is_valid"]:
+                valid.append(story)
+                continue
+            result.rejected += 1
+            self._report(result, ImportFailure(line=number, id=story.id, errors=validation["errors"]))
+        self.store.add_many(valid)
+        result.imported += len(valid)
+
+    @staticmethod
+    def _report(result: ImportResult, failure: ImportFailure):
+        if len(result.failures) < MAX_REPORTED_FAILURES:
+            result.failures.append(failure)
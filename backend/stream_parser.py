@@ -0,0 +1,75 @@
+import json
+from typing import List, Dict, Any
+
+
+class JSONArrayStreamParser:
+    """Incrementally extracts the objects of a top-level JSON array from streamed text.
+
+    Text before the opening ``[`` (e.g. model preamble) is ignored, and each
+    element object is returned as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buffer: List[str] = []
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text and return the objects completed by it"""
+        completed = []
+        start = None
+        for i, char in enumerate(chunk):
+            if self._finished:
+                break
+
+            if not self._in_array:
+                if char == "[":
+                    self._in_array = True
+                continue
+
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    start = i
+                elif char == "]":
+                    self._finished = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._buffer.append(chunk[start:i + 1])
+                    start = None
+                    text = "".join(self._buffer)
+                    self._buffer = []
+                    try:
+                        completed.append(json.loads(text))
+                    except json.JSONDecodeError:
+                        # Skip malformed elements but keep streaming the rest
+                        pass
+
+        if start is not None:
+            self._buffer.append(chunk[start:])
+        elif self._depth > 0:
+            self._buffer.append(chunk)
+        return completed
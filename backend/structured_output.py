@@ -0,0 +1,140 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import from_json
+
+from models import UserStory
+
+
+# Fields assigned by the backend rather than written by the model; they are also never
+# shared between callers or replayed from the response cache
+SERVER_FIELDS = frozenset({"id", "test_status", "created_at", "updated_at", "duplicate_of"})
+
+STORY_ADAPTER = TypeAdapter(UserStory)
+STORY_LIST_ADAPTER = TypeAdapter(List[UserStory])
+
+
+class _StoriesAnswer(BaseModel):
+    user_stories: List[UserStory]
+
+
+def _make_strict(node: Any):
+    """Apply the rules of OpenAI strict mode: every property required, no extras, no defaults"""
+    if isinstance(node, dict):
+        node.pop("default", None)
+        if node.get("type") == "object" and "properties" in node:
+            node["required"] = list(node["properties"])
+            node["additionalProperties"] = False
+            for child in node["properties"].values():
+                _make_strict(child)
+        for key, child in node.items():
+            if key != "properties":
+                _make_strict(child)
+    elif isinstance(node, list):
+        for child in node:
+            _make_strict(child)
+
+
+def stories_json_schema() -> Dict[str, Any]:
+    """JSON schema of the answer: {"user_stories": [story, ...]} without the server-assigned fields"""
+    story = STORY_ADAPTER.json_schema()
+    defs = story.pop("$defs", {})
+    for field in SERVER_FIELDS:
+        story["properties"].pop(field, None)
+    defs["UserStory"] = story
+    # Drop definitions only the removed fields referred to (e.g. TestStatus)
+    used = json.dumps(story) + json.dumps([d for name, d in defs.items() if name != "UserStory"])
+    defs = {name: d for name, d in defs.items() if f"#/$defs/{name}" in used or name == "UserStory"}
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "user_stories": {"type": "array", "items": {"$ref": "#/$defs/UserStory"}}
+        },
+        "$defs": defs
+    }
+    _make_strict(schema)
+    return schema
+
+
+def story_json_schema() -> Dict[str, Any]:
+    """JSON schema of a single story object, used when repairing one story"""
+    stories = stories_json_schema()
+    defs = dict(stories["$defs"])
+    story = defs.pop("UserStory")
+    return {**story, "$defs": defs}
+
+
+# Sent as ``response_format`` so the model can only answer with schema-valid JSON
+STORIES_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "user_stories", "strict": True, "schema": stories_json_schema()}
+}
+STORY_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "user_story", "strict": True, "schema": story_json_schema()}
+}
+
+
+def _json_span(raw: bytes) -> bytes:
+    """Trim text around the JSON answer (preamble, markdown fences) for models without structured output"""
+    raw = raw.strip()
+    if raw[:1] in (b"{", b"["):
+        return raw
+    starts = [i for i in (raw.find(b"{"), raw.find(b"[")) if i >= 0]
+    if not starts:
+        return b""
+    start = min(starts)
+    end = raw.rfind(b"}" if raw[start:start + 1] == b"{" else b"]")
+    return raw[start:end + 1] if end > start else raw[start:]
+
+
+def _story_items(data: Any) -> List[Any]:
+    if isinstance(data, dict):
+        data = data.get("user_stories", [])
+    return data if isinstance(data, list) else []
+
+
+def parse_stories(content: Union[str, bytes]) -> Tuple[List[UserStory], int]:
+    """Parse a model answer into user stories, returning them with the number of stories dropped
+
+    The whole answer is validated straight from the raw bytes. If any story
+    fails, the answer is re-parsed leniently (tolerating truncation) and each
+    story is validated on its own, so one malformed field only costs its story.
+    """
+    raw = _json_span(content.encode("utf-8") if isinstance(content, str) else content)
+    if not raw:
+        return [], 0
+
+    try:
+        if raw[:1] == b"[":
+            return STORY_LIST_ADAPTER.validate_json(raw), 0
+        return _StoriesAnswer.model_validate_json(raw).user_stories, 0
+    except ValidationError:
+        pass
+
+    try:
+        items = _story_items(from_json(raw, allow_partial=True))
+    except ValueError:
+        return [], 0
+
+    stories = []
+    for item in items:
+        try:
+            stories.append(STORY_ADAPTER.validate_python(item))
+        except ValidationError as e:
+            print(f"Skipping malformed story: {e.error_count()} validation error(s)")
+    return stories, len(items) - len(stories)
+
+
+def parse_story(content: Union[str, bytes]) -> Optional[UserStory]:
+    """Parse an answer holding a single story object (or a list whose first story is valid)"""
+    raw = _json_span(content.encode("utf-8") if isinstance(content, str) else content)
+    if raw[:1] == b"{":
+        try:
+            return STORY_ADAPTER.validate_json(raw)
+        except ValidationError:
+            pass
+    stories, _ = parse_stories(raw)
+    return stories[0] if stories else None
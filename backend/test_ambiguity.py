@@ -0,0 +1,44 @@
+from ambiguity import AmbiguityDetector, default_detector
+
+
+def test_word_boundaries_avoid_substring_false_positives():
+    flags = default_detector.detect("A handsome breakfast menu for the customer, done when complete.")
+    assert flags == []
+
+
+def test_positions_and_single_category_per_phrase():
+    content = "Some users want it Fast.\nSome admins need a\n lot of reports, etc."
+    matches = default_detector.find(content)
+    by_phrase = {match.phrase: match for match in matches}
+
+    assert by_phrase["some"].positions == [0, 25]
+    assert by_phrase["some"].category == "vague_quantifier"
+    assert by_phrase["fast"].positions == [content.index("Fast")]
+    assert by_phrase["a lot"].positions == [content.index("a\n lot")]
+    assert "etc" in by_phrase
+    # Quantifiers listed in two categories are only reported once
+    assert [match.phrase for match in matches].count("some") == 1
+
+
+def test_flags_keep_category_order_and_role_checks():
+    flags = default_detector.detect("Maybe show several reports, such as sales. Make it secure.")
+    assert flags == [
+        "Ambiguous term detected: 'secure' - needs specific definition",
+        "Ambiguous term detected: 'maybe' - needs specific definition",
+        "Vague quantifier detected: 'several' - needs specific numbers",
+        "Incomplete specification detected: 'such as' - needs complete list",
+        "No clear user roles identified - specify who will use the system",
+        "No clear success criteria defined - specify what constitutes completion",
+    ]
+
+
+def test_longest_phrase_wins():
+    detector = AmbiguityDetector([("term", ["good", "good performance"], "{}")])
+    assert [match.phrase for match in detector.find("good performance")] == ["good performance"]
+
+
+def test_role_words_share_the_scan():
+    # "user-friendly" still names a user, as with the previous \buser\b check
+    flags = default_detector.detect("A user-friendly screen is done.")
+    assert flags == ["Ambiguous term detected: 'user-friendly' - needs specific definition"]
+    assert [match.phrase for match in default_detector.find("The customer is done")] == []
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+from batch_scheduler import BatchScheduler, TokenBucket
+from fake_llm import create_fake_openai_app
+from models import (
+    BatchItemStatus, BatchJobStatus, RawNotes, TransformRequest, TransformResponse, UserStory
+)
+
+
+STORY = UserStory.model_validate(create_fake_openai_app(latency=0).state.stories[0])
+
+
+def make_requests(count: int):
+    return [TransformRequest(notes=RawNotes(content=f"Notes {i}")) for i in range(count)]
+
+
+async def wait_for(job):
+    while job.status != BatchJobStatus.COMPLETED:
+        await asyncio.sleep(0.01)
+
+
+def test_concurrency_and_retries():
+    in_flight = {"now": 0, "max": 0}
+    attempts = {}
+
+    async def process(request: TransformRequest) -> TransformResponse:
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        attempts[request.notes.content] = attempts.get(request.notes.content, 0) + 1
+        if request.notes.content == "Notes 0" and attempts["Notes 0"] < 3:
+            raise RuntimeError("upstream rate limited")
+        if request.notes.content == "Notes 1":
+            return TransformResponse(user_stories=[], processing_time=0)
+        return TransformResponse(user_stories=[STORY], processing_time=0)
+
+    async def scenario():
+        scheduler = BatchScheduler(process, concurrency=3, requests_per_minute=6000,
+                                   max_retries=2, retry_base_delay=0.01)
+        job = scheduler.submit(make_requests(10))
+        await wait_for(job)
+        return job
+
+    job = asyncio.run(scenario())
+    assert in_flight["max"] <= 3
+    assert job.completed == 9 and job.failed == 1
+    assert job.items[0].status == BatchItemStatus.SUCCEEDED and job.items[0].attempts == 3
+    assert job.items[1].status == BatchItemStatus.FAILED and job.items[1].attempts == 3
+    assert job.items[1].error == "No user stories generated"
+
+
+def test_finished_jobs_are_evicted_and_batches_are_capped():
+    async def process(request: TransformRequest) -> TransformResponse:
+        return TransformResponse(user_stories=[STORY], processing_time=0)
+
+    async def scenario():
+        scheduler = BatchScheduler(process, requests_per_minute=6000, max_items=3, max_finished_jobs=2)
+        jobs = []
+        for _ in range(4):
+            jobs.append(scheduler.submit(make_requests(2)))
+            await wait_for(jobs[-1])
+        running = scheduler.submit(make_requests(3))
+        # Only the two jobs that finished last are kept, next to the one still running
+        kept = set(scheduler.jobs)
+        await wait_for(running)
+
+        scheduler.job_ttl = 0
+        last = scheduler.submit(make_requests(1))
+        with pytest.raises(ValueError):
+            scheduler.submit(make_requests(4))
+        return jobs, running, kept, set(scheduler.jobs), last
+
+    jobs, running, kept, after_ttl, last = asyncio.run(scenario())
+    assert kept == {jobs[2].id, jobs[3].id, running.id}
+    assert after_ttl == {last.id}
+
+
+def test_token_bucket_throttles():
+    async def scenario():
+        bucket = TokenBucket(per_minute=600)
+        await bucket.acquire(600)
+        started = time.perf_counter()
+        await bucket.acquire(5)
+        return time.perf_counter() - started
+
+    assert 0.4 < asyncio.run(scenario()) < 1.0
+
+
+def test_batch_endpoints(use_fake_llm, override_services):
+    fake_app = use_fake_llm(latency=0.05)
+    override_services(batch_scheduler=BatchScheduler(main.process_transform, concurrency=4))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+            body = {"requests": [request.model_dump() for request in make_requests(6)]}
+            response = await client.post("/transform_notes/batch", json=body)
+            assert response.status_code == 202
+            job_id = response.json()["id"]
+            while True:
+                job = (await client.get(f"/transform_notes/batch/{job_id}")).json()
+                if job["status"] == "completed":
+                    break
+                await asyncio.sleep(0.02)
+            missing = await client.get("/transform_notes/batch/unknown")
+            too_large = await client.post("/transform_notes/batch",
+                                          json={"requests": [request.model_dump() for request in make_requests(101)]})
+            assert too_large.status_code == 413
+        return job, missing.status_code
+
+    job, missing_status = asyncio.run(scenario())
+    assert job["completed"] == 6 and job["failed"] == 0
+    assert all(len(item["result"]["user_stories"]) == 2 for item in job["items"])
+    assert fake_app.state.stats["requests"] == 6
+    assert missing_status == 404
@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from bench_suite import compare, run_suite
+from fake_llm import create_fake_openai_app
+
+
+def test_quick_run_and_regression_check():
+    args = argparse.Namespace(repeat=1, rule_stories=50, parse_stories=[5], notes_chars=[1000])
+    report = run_suite(["rules", "json_parse", "ambiguity"], args)
+    assert report["meta"]["parameters"]["rule_stories"] == 50
+    assert report["results"]["json_parse"]["stories_5"]["parse_us"] > 0
+
+    baseline = {"results": {"rules": {"validate_story_us": 4.0}, "ambiguity": {"chars_1000": {"mb_per_s": 10.0}}}}
+    slower = {"results": {"rules": {"validate_story_us": 6.0}, "ambiguity": {"chars_1000": {"mb_per_s": 7.0}}}}
+    assert len(compare(baseline, slower, tolerance=0.25)) == 2
+    # Lower times and higher rates are improvements
+    assert compare(slower, baseline, tolerance=0.25) == []
+
+
+def test_fake_llm_token_rate():
+    fake_app = create_fake_openai_app(latency=0.05, token_rate=5000)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=fake_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://fake-llm") as client:
+            started = time.perf_counter()
+            response = await client.post("/v1/chat/completions", json={"messages": [{"role": "user", "content": "x"}]})
+            return response.json()["usage"], time.perf_counter() - started
+
+    usage, elapsed = asyncio.run(scenario())
+    assert elapsed >= 0.05 + usage["completion_tokens"] / 5000
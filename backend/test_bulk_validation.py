@@ -0,0 +1,128 @@
+import json
+import asyncio
+from datetime import timedelta, timezone
+
+import httpx
+
+import main
+from bulk_validation import BulkValidator
+import models
+from models import BatchJobStatus, BulkValidationRequest
+from rule_fixtures import make_stories
+from rules_engine import RulesEngine
+from story_store import InMemoryStoryStore
+
+
+def make_store(count: int):
+    store = InMemoryStoryStore()
+    stories = make_stories(count, seed=3)
+    for i, story in enumerate(stories):
+        if i % 3 == 0:
+            story.test_status = models.TestStatus.PASSED
+    store.add_many(stories)
+    return store, stories
+
+
+def test_histogram_and_failures_match_direct_validation():
+    store, stories = make_store(300)
+    engine = RulesEngine()
+    expected = engine.validate_many(stories)
+    expected_failed = {story.id for story, result in zip(stories, expected) if not result["is_valid"]}
+    expected_histogram = {}
+    for result in expected:
+        for error in result["errors"]:
+            field = error["field"].split("[")[0]
+            expected_histogram[field] = expected_histogram.get(field, 0) + 1
+
+    async def scenario():
+        validator = BulkValidator(store, engine, chunk_size=40)
+        job = validator.submit()
+        # Follow the failure stream while the job is still running
+        failures = [failure async for failure in validator.failures(job.id)]
+        return job, failures
+
+    job, failures = asyncio.run(scenario())
+    assert job.status == BatchJobStatus.COMPLETED
+    assert job.processed == 300 and job.invalid == len(expected_failed)
+    assert job.error_histogram == expected_histogram
+    assert {failure["id"] for failure in failures} == expected_failed
+
+
+def test_filters_and_event_loop_stays_responsive():
+    store, stories = make_store(2000)
+    ticks = []
+
+    async def ticker(job):
+        while job.status != BatchJobStatus.COMPLETED:
+            ticks.append(job.processed)
+            await asyncio.sleep(0)
+
+    async def scenario():
+        validator = BulkValidator(store, RulesEngine(), chunk_size=100)
+        job = validator.submit(BulkValidationRequest(test_status=models.TestStatus.PASSED))
+        await ticker(job)
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.processed == len([story for story in stories if story.test_status == models.TestStatus.PASSED])
+    # Other coroutines ran between chunks
+    assert len(set(ticks)) > 3
+
+
+def test_finished_jobs_and_failures_are_evicted():
+    store, _ = make_store(30)
+
+    async def scenario():
+        validator = BulkValidator(store, RulesEngine(), max_finished_jobs=1)
+        jobs = []
+        for _ in range(3):
+            jobs.append(validator.submit())
+            async for _ in validator.failures(jobs[-1].id):
+                pass
+        kept = set(validator.jobs)
+        validator.job_ttl = 0
+        last = validator.submit()
+        return jobs, kept, validator, last
+
+    jobs, kept, validator, last = asyncio.run(scenario())
+    # Submitting the third job dropped the first one; the TTL drops every finished job
+    assert kept == {jobs[1].id, jobs[2].id}
+    assert set(validator.jobs) == set(validator._failures) == set(validator._progress) == {last.id}
+
+
+def test_bulk_validation_endpoints(override_services):
+    store, stories = make_store(120)
+    override_services(bulk_validator=BulkValidator(store, main.services.rules_engine, chunk_size=25))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+            response = await client.post("/validate_stories", json={"min_invest_score": 5})
+            assert response.status_code == 202
+            job_id = response.json()["id"]
+            failures = await client.get(f"/validate_stories/{job_id}/failures")
+            job = (await client.get(f"/validate_stories/{job_id}")).json()
+            missing = await client.get("/validate_stories/unknown")
+        return job, failures, missing.status_code
+
+    job, failures, missing_status = asyncio.run(scenario())
+    lines = [json.loads(line) for line in failures.text.splitlines()]
+    assert job["status"] == "completed" and job["filters"]["min_invest_score"] == 5
+    assert len(lines) == job["invalid"] and job["processed"] == job["valid"] + job["invalid"]
+    assert all(set(line) == {"id", "errors"} for line in lines)
+    assert missing_status == 404
+
+
+def test_timezone_aware_filters_complete():
+    store, stories = make_store(50)
+    newest = max(story.created_at for story in stories)
+
+    async def scenario():
+        validator = BulkValidator(store, RulesEngine(), chunk_size=20)
+        job = validator.submit(BulkValidationRequest.model_validate(
+            {"created_before": (newest + timedelta(seconds=1)).astimezone(timezone.utc).isoformat()}))
+        return job, [failure async for failure in validator.failures(job.id)]
+
+    job, _ = asyncio.run(scenario())
+    assert job.filters.created_before.tzinfo is None
+    assert job.status == BatchJobStatus.COMPLETED and job.processed == 50
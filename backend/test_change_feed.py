@@ -0,0 +1,105 @@
+import json
+import asyncio
+
+from change_feed import ChangeFeed
+from fake_llm import SAMPLE_STORIES
+from models import UserStory, TestStatus
+from story_store import InMemoryStoryStore
+import main
+
+
+def make_story(index: int = 0) -> UserStory:
+    return UserStory.model_validate(SAMPLE_STORIES[index % len(SAMPLE_STORIES)])
+
+
+def parse(frame: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+    return {"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+def test_store_writes_publish_versioned_deltas():
+    store = InMemoryStoryStore()
+    start = store.changes.version
+    stories = [make_story(0), make_story(1)]
+    store.add_many(stories)
+    story = store.get(stories[0].id)
+    story.test_status = TestStatus.PASSED
+    store.update(story)
+    store.delete(stories[1].id)
+    assert not store.delete(stories[1].id)
+
+    events, version = store.changes.since(start)
+    assert version == start + 3
+    assert [(event.version, event.type) for event in events] == [
+        (start + 1, "created"), (start + 2, "updated"), (start + 3, "deleted")
+    ]
+    updated = parse(events[1].frame)["data"]
+    assert [story["test_status"] for story in updated["stories"]] == ["passed"]
+    assert updated["stats"]["test_status_breakdown"] == {"passed": 1, "not_tested": 1}
+    assert parse(events[2].frame)["data"]["story_ids"] == [stories[1].id]
+
+    # Only the changes after a version are replayed; expired history means reload
+    assert [event.version for event in store.changes.since(start + 2)[0]] == [start + 3]
+    assert store.changes.since(start - 1)[0] is None
+
+
+def test_stream_resumes_and_resets():
+    async def scenario():
+        feed = ChangeFeed(history=2)
+        snapshot = lambda: {"total_stories": 0}
+
+        stream = feed.stream(None, snapshot)
+        ready = parse(await anext(stream))
+        assert ready["event"] == "ready" and ready["id"] == feed.version
+
+        # A subscriber waiting for changes is woken by the next write
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        feed.publish("deleted", story_ids=["a"])
+        assert parse(await waiting)["data"]["story_ids"] == ["a"]
+        await stream.aclose()
+
+        feed.publish("deleted", story_ids=["b"])
+        resumed = feed.stream(ready["id"] + 1, snapshot)
+        assert parse(await anext(resumed))["data"]["story_ids"] == ["b"]
+        await resumed.aclose()
+
+        feed.publish("cleared")
+        expired = feed.stream(ready["id"], snapshot)
+        reset = parse(await anext(expired))
+        assert reset["event"] == "reset" and reset["id"] == feed.version
+        await expired.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_history_is_bounded_by_encoded_size():
+    stories = [make_story(index) for index in range(len(SAMPLE_STORIES))]
+    feed = ChangeFeed(history=1000, max_bytes=1)
+    start = feed.version
+    feed.publish("created", stories)
+    first = feed.since(start)[0][0]
+    assert not hasattr(first, "stories")
+    assert len(parse(first.frame)["data"]["stories"]) == len(stories)
+
+    # Over the byte budget only the newest event is kept, so older versions must reload
+    feed.publish("created", stories)
+    assert feed.since(start)[0] is None
+    assert [event.version for event in feed.since(start + 1)[0]] == [start + 2]
+
+
+def test_events_endpoint_resumes_from_last_event_id(override_services):
+    store = InMemoryStoryStore()
+    override_services(story_store=store)
+    start = store.changes.version
+    store.add_many([make_story()])
+
+    async def first_frame():
+        response = await main.story_events(since=None, last_event_id=str(start))
+        assert response.media_type == "text/event-stream"
+        frame = await anext(response.body_iterator)
+        await response.body_iterator.aclose()
+        return parse(frame)
+
+    event = asyncio.run(first_frame())
+    assert event["event"] == "created" and event["id"] == start + 1
@@ -0,0 +1,40 @@
+from compact_story import CompactStory
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+from story_store import InMemoryStoryStore
+import models
+
+
+def make_story(index: int = 0) -> UserStory:
+    return UserStory.model_validate(SAMPLE_STORIES[index % len(SAMPLE_STORIES)])
+
+
+def test_round_trip_is_lossless():
+    story = make_story()
+    story.title = "Als Kundin möchte ich Rückerstattungen sehen 🧾"
+    story.invest_criteria.small = False
+    story.duplicate_of = "other-id"
+    story.acceptance_criteria.append(models.GherkinScenario(
+        scenario_title="Long scenario",
+        steps=[models.GherkinStep(keyword=models.GherkinKeyword.AND, text=f"step {i}") for i in range(300)]
+    ))
+
+    record = CompactStory.from_story(story)
+    assert isinstance(record.step_counts, tuple)
+    rebuilt = record.to_story()
+    assert rebuilt == story
+    assert rebuilt.model_dump_json() == story.model_dump_json()
+
+
+def test_memory_store_returns_copies():
+    store = InMemoryStoryStore()
+    story = make_story()
+    store.add_many([story])
+
+    fetched = store.get(story.id)
+    fetched.test_status = models.TestStatus.FAILED
+    assert store.get(story.id).test_status == models.TestStatus.NOT_TESTED
+
+    store.update(fetched)
+    assert store.get(story.id).test_status == models.TestStatus.FAILED
+    assert store.stats.snapshot()["test_status_breakdown"] == {models.TestStatus.FAILED: 1}
@@ -0,0 +1,67 @@
+from fastapi.testclient import TestClient
+
+import main
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+from story_store import InMemoryStoryStore, SQLiteStoryStore
+
+
+def make_stories(count: int):
+    return [UserStory.model_validate(SAMPLE_STORIES[i % len(SAMPLE_STORIES)]) for i in range(count)]
+
+
+def test_unchanged_reads_get_304_without_querying(monkeypatch, override_services):
+    store = InMemoryStoryStore()
+    stories = make_stories(3)
+    store.add_many(stories)
+    override_services(story_store=store)
+    client = TestClient(main.app)
+
+    first = client.get("/user_stories", params={"limit": 2})
+    etag = first.headers["ETag"]
+    assert first.headers["X-Next-Cursor"]
+
+    queries = []
+    original_query = store.query
+    monkeypatch.setattr(store, "query", lambda query: queries.append(query) or original_query(query))
+    assert client.get("/user_stories", params={"limit": 2}, headers={"If-None-Match": etag}).status_code == 304
+    # Without the header the cached body is served, still without a query
+    again = client.get("/user_stories", params={"limit": 2})
+    assert again.content == first.content and again.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert queries == []
+
+    story_etags = {story.id: client.get(f"/user_stories/{story.id}").headers["ETag"] for story in stories}
+    stats_etag = client.get("/stats").headers["ETag"]
+    assert client.get("/stats", headers={"If-None-Match": stats_etag}).status_code == 304
+
+    # A write changes the store version and that story's version only
+    client.put(f"/user_stories/{stories[0].id}/acceptance_test", json={"test_status": "passed"})
+    changed = client.get("/user_stories", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()[0]["test_status"] == "passed"
+    assert client.get("/stats", headers={"If-None-Match": stats_etag}).json()["test_status_breakdown"]["passed"] == 1
+    assert client.get(f"/user_stories/{stories[0].id}",
+                      headers={"If-None-Match": story_etags[stories[0].id]}).status_code == 200
+    assert client.get(f"/user_stories/{stories[1].id}",
+                      headers={"If-None-Match": story_etags[stories[1].id]}).status_code == 304
+
+    client.delete(f"/user_stories/{stories[1].id}")
+    assert client.get(f"/user_stories/{stories[1].id}").status_code == 404
+
+
+def test_sqlite_version_sees_writes_from_other_connections(tmp_path):
+    path = str(tmp_path / "stories.db")
+    reader = SQLiteStoryStore(path)
+    writer = SQLiteStoryStore(path)
+    stories = make_stories(2)
+    writer.add_many(stories)
+
+    version = reader.version()
+    story_version = reader.story_version(stories[0].id)
+    assert story_version is not None and reader.story_version("missing") is None
+
+    stories[0].title += " (edited)"
+    writer.update(stories[0])
+    assert reader.version() != version
+    assert reader.story_version(stories[0].id) != story_version
+    reader.close()
+    writer.close()
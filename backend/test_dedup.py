@@ -0,0 +1,78 @@
+from fastapi.testclient import TestClient
+
+import main
+from dedup import DuplicateIndex
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+from story_store import InMemoryStoryStore, SQLiteStoryStore
+
+
+def story(index: int = 0, **changes) -> UserStory:
+    return UserStory.model_validate({**SAMPLE_STORIES[index], **changes})
+
+
+REWORDED = {"description": "Allow customers to complete a purchase without registering an account."}
+
+
+def test_near_duplicates_are_flagged():
+    store = InMemoryStoryStore()
+    original = story()
+    store.add_deduplicated([original])
+
+    reported, duplicates = store.add_deduplicated([story(**REWORDED), story(1)])
+    assert duplicates == 1
+    assert reported[0].duplicate_of == original.id and reported[1].duplicate_of is None
+    assert store.count() == 3
+    assert store.stats.snapshot()["duplicate_stories"] == 1
+    assert store.stats.consistency_errors(store.list()) == []
+
+    # Flagged copies aren't indexed, and deleted stories stop matching
+    assert len(store.duplicates) == 2
+    store.delete(original.id)
+    assert store.duplicates.find(story(**REWORDED)) is None
+
+
+def test_merge_mode_and_duplicates_within_a_batch(monkeypatch):
+    monkeypatch.setenv("DEDUP_MODE", "merge")
+    store = InMemoryStoryStore()
+    original = story()
+    store.add(original)
+
+    first, second = story(1), story(1)
+    reported, duplicates = store.add_deduplicated([story(**REWORDED), first, second, story()])
+    assert duplicates == 3
+    # Duplicates are replaced by the story they duplicate, each reported once
+    assert [s.id for s in reported] == [original.id, first.id]
+    assert store.count() == 2 and second.id not in store
+
+
+def test_disabled_and_unrelated_text(monkeypatch):
+    monkeypatch.setenv("DEDUP_MODE", "off")
+    store = InMemoryStoryStore()
+    store.add_deduplicated([story(), story()])
+    assert store.count() == 2 and len(store.duplicates) == 0
+
+    index = DuplicateIndex(threshold=0.8)
+    index.put(story())
+    assert index.find(story(1)) is None
+    # Only template words: nothing to compare
+    assert index.signature(story(title="As a, I want so that", description="The")) is None
+
+
+def test_sqlite_store_rebuilds_index(tmp_path):
+    path = str(tmp_path / "stories.db")
+    original = story()
+    SQLiteStoryStore(path).add_deduplicated([original])
+
+    reopened = SQLiteStoryStore(path)
+    reported, duplicates = reopened.add_deduplicated([story(**REWORDED)])
+    assert duplicates == 1 and reported[0].duplicate_of == original.id
+    assert reopened.get(reported[0].id).duplicate_of == original.id
+    reopened.close()
+
+
+def test_stats_endpoint_counts_duplicates(override_services):
+    store = InMemoryStoryStore()
+    override_services(story_store=store)
+    store.add_deduplicated([story(), story(**REWORDED)])
+    assert TestClient(main.app).get("/stats", params={"verify": True}).json()["duplicate_stories"] == 1
@@ -0,0 +1,36 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from fake_llm import SAMPLE_STORIES
+from models import TransformRequest
+
+
+def test_fast_path_matches_response_model_output(monkeypatch, use_fake_llm):
+    stories = [dict(story) for story in SAMPLE_STORIES]
+    stories[0]["title"] += " — café"
+    use_fake_llm(stories=stories)
+
+    # Generate once, then serve the same result through both encoders
+    request = TransformRequest.model_validate({"notes": {"content": "Guest checkout"}, "include_timings": True})
+    result = asyncio.run(main.process_transform(request))
+    assert result.user_stories and result.timings
+
+    async def fixed_transform(request):
+        return result
+
+    monkeypatch.setattr(main, "process_transform", fixed_transform)
+    client = TestClient(main.app)
+
+    def transform():
+        response = client.post("/transform_notes", json=request.model_dump())
+        assert response.status_code == 200
+        # Floats may be written with a different exponent format, so compare the parsed JSON
+        return response.headers["content-type"], response.json()
+
+    monkeypatch.setattr(main, "fast_json", False)
+    expected = transform()
+    monkeypatch.setattr(main, "fast_json", True)
+    assert transform() == expected
+    assert expected[1]["user_stories"][0]["title"].endswith(" — café")
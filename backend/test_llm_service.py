@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+from fake_llm import create_fake_openai_app
+from models import RawNotes
+
+
+def notes(i: int) -> RawNotes:
+    return RawNotes(content=f"Customers need guest checkout and clearer payment errors ({i}).")
+
+
+def test_transform_does_not_block_event_loop(make_service):
+    service = make_service(create_fake_openai_app(latency=0.3), max_concurrency=10)
+
+    async def scenario():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(service.transform_notes_to_stories(notes(i)) for i in range(10)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(scenario())
+    assert all(len(stories) == 2 for stories in results)
+    # Ten 0.3s calls in parallel finish in roughly one round trip
+    assert elapsed < 1.5
+
+
+def test_concurrency_limit_is_respected(make_service):
+    fake_app = create_fake_openai_app(latency=0.05)
+    service = make_service(fake_app, max_concurrency=3)
+
+    async def scenario():
+        await asyncio.gather(*(service.transform_notes_to_stories(notes(i)) for i in range(12)))
+
+    asyncio.run(scenario())
+    assert fake_app.state.stats["requests"] == 12
+    assert fake_app.state.stats["max_in_flight"] <= 3
@@ -0,0 +1,47 @@
+from fastapi.testclient import TestClient
+
+import main
+from metrics import Histogram, Metrics
+
+
+def test_transform_timings_and_metrics_endpoint(use_fake_llm):
+    use_fake_llm()
+    client = TestClient(main.app)
+
+    body = client.post("/transform_notes", json={"notes": {"content": "Guest checkout"},
+                                                 "include_timings": True}).json()
+    assert {"cache_lookup", "llm_call", "parse", "validation", "repair", "store",
+            "ambiguity_detection"} <= set(body["timings"])
+    assert sum(body["timings"].values()) <= body["processing_time"] + 0.01
+    assert client.post("/transform_notes", json={"notes": {"content": "Refunds"}}).json()["timings"] is None
+
+    story_id = body["user_stories"][0]["id"]
+    client.get(f"/user_stories/{story_id}")
+    text = client.get("/metrics").text
+    assert 'stage_duration_seconds_bucket{stage="llm_call",le="+Inf"}' in text
+    assert 'http_request_duration_seconds_count{method="POST",route="/transform_notes",status="200"}' in text
+    # Routes are labelled by template, not by the IDs in the path
+    assert 'route="/user_stories/{story_id}"' in text and story_id not in text
+    assert 'llm_tokens_total{kind="completion"}' in text
+    assert "stories_stored 4" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.render("latency", (("stage", "x"),)) == [
+        'latency_bucket{stage="x",le="0.1"} 2',
+        'latency_bucket{stage="x",le="1.0"} 3',
+        'latency_bucket{stage="x",le="+Inf"} 4',
+        'latency_sum{stage="x"} 3.65',
+        'latency_count{stage="x"} 4'
+    ]
+
+
+def test_disabled_metrics_record_nothing():
+    disabled = Metrics(enabled=False)
+    with disabled.track() as timings, disabled.stage("llm_call"):
+        pass
+    assert timings == {} and disabled.histograms == {}
+    assert disabled.stage("a") is disabled.stage("b")
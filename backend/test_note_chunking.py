@@ -0,0 +1,71 @@
+import asyncio
+import copy
+import time
+
+from fake_llm import SAMPLE_STORIES, create_fake_openai_app
+from models import RawNotes, UserStory
+from note_chunking import merge_chunk_stories, split_notes
+
+
+def paragraph(index: int) -> str:
+    return f"Requirement {index}. " + "The team discussed this requirement at length. " * 4
+
+
+def long_notes(paragraphs: int) -> str:
+    return "\n\n".join(paragraph(i) for i in range(paragraphs))
+
+
+def test_split_on_boundaries_with_overlap():
+    notes = long_notes(12)
+    chunks = split_notes(notes, chunk_chars=700, overlap_chars=250)
+    assert len(chunks) > 1 and all(len(chunk) <= 700 for chunk in chunks)
+    # Chunks hold whole paragraphs, and each one repeats the last paragraph of the previous chunk
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.startswith("Requirement")
+        assert previous.split("\n\n")[-1] == chunk.split("\n\n")[0]
+    assert {f"Requirement {i}." for i in range(12)} <= {p.split(" The")[0] for c in chunks for p in c.split("\n\n")}
+
+    # Short notes are untouched; an oversized paragraph is cut at sentences
+    assert split_notes("short notes", 700) == ["short notes"]
+    sentences = split_notes("One sentence here. " * 100, chunk_chars=200)
+    assert all(len(chunk) <= 200 and chunk.endswith(".") for chunk in sentences)
+
+
+def test_merge_interleaves_dedupes_and_caps():
+    first, second = (UserStory.model_validate(story) for story in SAMPLE_STORIES)
+    copy_of_first = UserStory.model_validate(SAMPLE_STORIES[0])
+    third = UserStory.model_validate(dict(copy.deepcopy(SAMPLE_STORIES[0]),
+                                          title="As an admin, I want audit logs so that I can trace refunds",
+                                          description="Record who issued each refund and when."))
+    merged = merge_chunk_stories([[first, third], [copy_of_first, second]], max_stories=5)
+    assert [story.id for story in merged] == [first.id, third.id, second.id]
+    assert len(merge_chunk_stories([[first, third], [second]], max_stories=2)) == 2
+
+
+def test_chunks_are_transformed_concurrently(monkeypatch, make_service):
+    monkeypatch.setenv("NOTES_CHUNK_CHARS", "700")
+    monkeypatch.setenv("NOTES_CHUNK_OVERLAP", "250")
+    monkeypatch.setenv("NOTES_CHUNK_CONCURRENCY", "3")
+    fake_app = create_fake_openai_app(latency=0.2)
+    service = make_service(fake_app)
+    notes = RawNotes(content=long_notes(12), context="Checkout")
+    chunk_count = len(service.split_notes(notes))
+
+    async def scenario():
+        started = time.perf_counter()
+        stories = await service.transform_notes_to_stories(notes, max_stories=5)
+        elapsed = time.perf_counter() - started
+        streamed = [story async for story in service.stream_stories(notes, max_stories=5)]
+        return stories, elapsed, streamed
+
+    stories, elapsed, streamed = asyncio.run(scenario())
+    assert chunk_count > 3
+    assert fake_app.state.stats["requests"] == chunk_count
+    assert fake_app.state.stats["max_in_flight"] == 3
+    assert elapsed < 0.2 * chunk_count
+    # Every chunk answers with the same two stories, which merge into one copy each
+    assert [story.title for story in stories] == [story["title"] for story in SAMPLE_STORIES]
+    # The stream replays the cached chunks with the same dedupe
+    assert [story.title for story in streamed] == [story.title for story in stories]
+    assert fake_app.state.stats["requests"] == chunk_count
+    assert "excerpt of a longer document" in fake_app.state.last_request["messages"][1]["content"]
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from fake_llm import create_fake_openai_app
+from models import RawNotes
+from response_cache import ResponseCache, make_cache_key
+
+
+NOTES = RawNotes(content="Customers need guest checkout and clearer payment errors.", context="Shop")
+
+
+def test_cache_key_ignores_whitespace_but_not_parameters():
+    key = make_cache_key("Guest  checkout\n please", None, 5, model="m")
+    assert key == make_cache_key(" Guest checkout please ", "", 5, model="m")
+    assert key != make_cache_key("Guest checkout please", None, 4, model="m")
+    assert key != make_cache_key("Guest checkout please", None, 5, model="other")
+
+
+def test_lru_eviction_and_ttl():
+    cache = ResponseCache(max_entries=2, ttl=0.05)
+    cache.set("a", [{"n": 1}])
+    cache.set("b", [{"n": 2}])
+    cache.get("a")
+    cache.set("c", [{"n": 3}])
+    assert cache.get("b") is None
+    assert cache.get("a") == [{"n": 1}]
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(path=path).set("key", [{"title": "persisted"}])
+
+    reopened = ResponseCache(path=path)
+    assert reopened.get("key") == [{"title": "persisted"}]
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_hits_skip_llm_and_get_fresh_ids(make_service):
+    fake_app = create_fake_openai_app(latency=0.2)
+    service = make_service(fake_app)
+
+    async def scenario():
+        first = await service.transform_notes_to_stories(NOTES, 2)
+        started = time.perf_counter()
+        second = await service.transform_notes_to_stories(NOTES, 2)
+        hit_time = time.perf_counter() - started
+        bypassed = await service.transform_notes_to_stories(NOTES, 2, use_cache=False)
+        return first, second, bypassed, hit_time, service.cache.stats()
+
+    first, second, bypassed, hit_time, stats = asyncio.run(scenario())
+    assert [s.title for s in first] == [s.title for s in second]
+    assert {s.id for s in first}.isdisjoint(s.id for s in second)
+    assert len(bypassed) == 2
+    assert hit_time < 0.05
+    assert fake_app.state.stats["requests"] == 2
+    assert stats["hits"] == 1 and stats["misses"] == 1
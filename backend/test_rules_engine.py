@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from rule_fixtures import legacy_validate, make_stories
+from rules_engine import DEFAULT_RULES, RULE_TYPES, Rule, RulesEngine, register_rule
+
+
+def test_compiled_rules_match_previous_results():
+    stories = make_stories(500, seed=1)
+    engine = RulesEngine()
+    expected = [legacy_validate(story) for story in stories]
+
+    assert [engine.validate_user_story(story) for story in stories] == expected
+    assert engine.validate_many(stories) == expected
+    # The sample exercises both outcomes
+    assert {result["is_valid"] for result in expected} == {True, False}
+
+
+def test_rules_are_data():
+    rules = [dict(rule) for rule in DEFAULT_RULES]
+    rules[-1]["minimum"] = 7
+    engine = RulesEngine(rules)
+    results = engine.validate_many(make_stories(20))
+    assert all("invest_criteria" in [error["field"] for error in result["errors"]] for result in results)
+
+
+def test_custom_rule_type():
+    @register_rule("max_title_length")
+    class MaxTitleLength(Rule):
+        def __init__(self, field, message, maximum):
+            super().__init__(field, message)
+            self.maximum = maximum
+
+        def check(self, story):
+            return [self.error()] if len(story.title) > self.maximum else []
+
+    try:
+        engine = RulesEngine([{"type": "max_title_length", "field": "title",
+                               "maximum": 5, "message": "Title too long"}])
+        result = engine.validate_user_story(make_stories(1)[0])
+        assert result == {"is_valid": False, "errors": [{"field": "title", "message": "Title too long"}]}
+    finally:
+        RULE_TYPES.pop("max_title_length")
+
+
+def test_unknown_rule_type():
+    with pytest.raises(ValueError):
+        RulesEngine([{"type": "missing", "field": "title", "message": "x"}])
+
+
+def test_rules_loaded_from_file(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(DEFAULT_RULES[:1]))
+    monkeypatch.setenv("RULES_PATH", str(path))
+    engine = RulesEngine.from_env()
+    assert [rule.type_name for rule in engine.rules] == ["min_length"]
@@ -0,0 +1,157 @@
+import os
+import math
+import random
+import sqlite3
+from collections import Counter
+
+from fastapi.testclient import TestClient
+
+import main
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+from search_index import SearchIndex, TITLE_WEIGHT, tokenize
+from story_store import InMemoryStoryStore, SQLiteStoryStore
+
+
+WORDS = ["login", "logout", "export", "invoice", "report", "search", "filter", "admin", "user", "email",
+         "password", "reset", "upload", "download", "payment", "refund"]
+
+
+def make_story(rng: random.Random) -> UserStory:
+    words = lambda count: " ".join(rng.choice(WORDS) for _ in range(count))
+    story = dict(SAMPLE_STORIES[0])
+    story.update(title=words(4), description=words(rng.randint(3, 30)), definition_of_done=words(3),
+                 acceptance_criteria=[{"scenario_title": "s", "steps": [{"keyword": "Given", "text": words(5)}]}])
+    return UserStory.model_validate(story)
+
+
+def brute_force(stories, query, k1=1.2, b=0.75):
+    """BM25 computed from scratch over every story"""
+    counts = {}
+    for story in stories:
+        title, body = SearchIndex._fields(story)
+        counts[story.id] = Counter(tokenize(body))
+        for token in tokenize(title):
+            counts[story.id][token] += TITLE_WEIGHT
+    average = sum(sum(c.values()) for c in counts.values()) / len(counts)
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(term in c for c in counts.values())
+        idf = math.log(1 + (len(counts) - df + 0.5) / (df + 0.5))
+        for story_id, c in counts.items():
+            if c[term]:
+                norm = k1 * (1 - b + b * sum(c.values()) / average)
+                scores[story_id] = scores.get(story_id, 0.0) + idf * c[term] * (k1 + 1) / (c[term] + norm)
+    return scores
+
+
+def test_ranking_matches_brute_force_bm25_through_updates_and_deletes():
+    rng = random.Random(7)
+    stories = {story.id: story for story in (make_story(rng) for _ in range(1500))}
+    index = SearchIndex()
+    for story in stories.values():
+        index.put(story)
+    # Enough deletes to trigger compaction, plus updates that re-index and one that doesn't change the text
+    for story_id in list(stories)[:1200]:
+        index.remove(story_id)
+        del stories[story_id]
+    for story in list(stories.values())[:50]:
+        story.description += " refund refund"
+        index.put(story)
+    index.put(next(iter(stories.values())).model_copy(update={"test_status": "passed"}))
+    assert len(index) == 300 and index._removed < 1000
+
+    for query in ["refund", "login export", "admin password reset upload", "zebra invoice"]:
+        expected = brute_force(stories.values(), query)
+        results = index.search(query, limit=10)
+        assert [round(score, 6) for _, score in results] == sorted((round(s, 6) for s in expected.values()),
+                                                                    reverse=True)[:10]
+        for story_id, score in results:
+            assert math.isclose(score, expected[story_id])
+
+
+def test_prefix_queries_and_bad_queries():
+    index = SearchIndex()
+    stories = [UserStory.model_validate(story) for story in SAMPLE_STORIES]
+    for story in stories:
+        index.put(story)
+    word = tokenize(stories[0].title)[-1]
+    assert {story_id for story_id, _ in index.search(f"{word[:3]}*")} >= \
+        {story_id for story_id, _ in index.search(word)}
+    assert index.search("qqqqzzzz") == []
+    try:
+        index.search("  !? ")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_sqlite_index_is_saved_on_close_and_rebuilt_when_stale(tmp_path, monkeypatch):
+    path = str(tmp_path / "stories.db")
+    rng = random.Random(1)
+    stories = [make_story(rng) for _ in range(20)]
+    store = SQLiteStoryStore(path)
+    store.add_many(stories)
+    expected = store.search.search("invoice payment")
+    store.close()
+    # Saved into the database itself
+    assert os.listdir(tmp_path) == ["stories.db"]
+
+    loads = []
+    original_put = SearchIndex.put
+    monkeypatch.setattr(SearchIndex, "put", lambda self, story: loads.append(story.id) or original_put(self, story))
+    reopened = SQLiteStoryStore(path)
+    assert loads == [] and reopened.search.search("invoice payment") == expected
+
+    # Another connection writes after the save: the saved index no longer matches the file
+    other = SQLiteStoryStore(path)
+    other.delete(stories[0].id)
+    reopened.close()
+    other.close()
+    rebuilt = SQLiteStoryStore(path)
+    assert stories[0].id not in {story_id for story_id, _ in rebuilt.search.search("invoice payment", 100)}
+    assert len(rebuilt.search) == 19
+    rebuilt.close()
+
+    # A row deleted without bumping the write counter is caught by the story count
+    with sqlite3.connect(path) as db:
+        db.execute("DELETE FROM user_stories WHERE id = ?", (stories[1].id,))
+    loads.clear()
+    recounted = SQLiteStoryStore(path)
+    assert len(loads) == 18 and len(recounted.search) == 18
+    recounted.close()
+
+
+def test_sqlite_index_is_saved_after_a_rebuild(tmp_path):
+    path = str(tmp_path / "stories.db")
+    rng = random.Random(2)
+    store = SQLiteStoryStore(path)
+    store.add_many([make_story(rng) for _ in range(5)])
+    # Not closed, as after a crash: the next start rebuilds once and saves what it built
+    restarted = SQLiteStoryStore(path)
+    assert len(SearchIndex.load(sqlite3.connect(path), store._writes, 5)) == 5
+    restarted.close()
+    store.close()
+
+
+def test_search_endpoint(override_services):
+    store = InMemoryStoryStore()
+    stories = [UserStory.model_validate(story) for story in SAMPLE_STORIES]
+    store.add_many(stories)
+    override_services(story_store=store)
+    client = TestClient(main.app)
+
+    word = tokenize(stories[0].title)[-1]
+    response = client.get("/search", params={"q": word, "limit": 5})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["query"] == word
+    assert stories[0].id in [hit["user_story"]["id"] for hit in body["results"]]
+    assert client.get("/search", params={"q": word, "limit": 5},
+                      headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    client.delete(f"/user_stories/{stories[0].id}")
+    after = client.get("/search", params={"q": word, "limit": 5}).json()
+    assert stories[0].id not in [hit["user_story"]["id"] for hit in after["results"]]
+    assert client.get("/search", params={"q": "?!"}).status_code == 400
+    assert client.get("/search", params={"q": ""}).status_code == 422
@@ -0,0 +1,76 @@
+import os
+import sys
+import sqlite3
+import asyncio
+import subprocess
+
+import pytest
+
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+from search_index import SearchIndex
+from services import Services
+from story_store import InMemoryStoryStore
+
+
+def test_import_and_health_check_build_nothing_and_need_no_credentials():
+    script = """
+import sys
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+assert client.get("/").status_code == 200
+assert client.get("/metrics").status_code == 200
+assert not any(main.services.is_built(name) for name in main.services.NAMES)
+assert "openai" not in sys.modules
+
+assert client.get("/user_stories").json() == []
+assert main.services.is_built("story_store") and not main.services.is_built("llm_service")
+
+# Without credentials the LLM stats endpoints say so instead of failing
+for path in ("/cache_stats", "/token_usage"):
+    response = client.get(path)
+    assert response.status_code == 503 and "LLM service unavailable" in response.json()["detail"], response.text
+"""
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    env["STORY_STORE"] = "memory"
+    result = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_preload_and_close_only_what_was_built(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("STORY_STORE", "sqlite")
+    monkeypatch.setenv("STORY_DB_PATH", str(tmp_path / "stories.db"))
+    services = Services(process_transform=None)
+    asyncio.run(services.aclose())
+    assert not any(services.is_built(name) for name in Services.NAMES)
+
+    services.story_store.add(UserStory.model_validate(SAMPLE_STORIES[0]))
+    assert services.bulk_validator.store is services.story_store
+    asyncio.run(services.aclose())
+    assert not services.is_built("llm_service")
+    # Closing the SQLite store saved its search index
+    assert SearchIndex.load(sqlite3.connect(str(tmp_path / "stories.db")), 1, 1) is not None
+
+    preloaded = Services(process_transform=None)
+    preloaded.preload()
+    assert all(preloaded.is_built(name) for name in Services.NAMES)
+    assert preloaded.story_store.count() == 1
+    asyncio.run(preloaded.aclose())
+
+
+def test_override_builds_nothing_and_restores():
+    services = Services(process_transform=None)
+    store = InMemoryStoryStore()
+    with services.override(llm_service="fake", story_store=store):
+        assert services.llm_service == "fake" and services.story_store is store
+        with services.override(story_store="other"):
+            assert services.story_store == "other"
+        assert services.story_store is store
+    assert not any(services.is_built(name) for name in Services.NAMES)
+    with pytest.raises(ValueError):
+        with services.override(llm=None):
+            pass
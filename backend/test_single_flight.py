@@ -0,0 +1,60 @@
+import asyncio
+
+from fake_llm import create_fake_openai_app
+from models import RawNotes
+from single_flight import SingleFlight
+
+
+def test_identical_transforms_share_one_call(make_service):
+    fake_app = create_fake_openai_app(latency=0.2)
+    service = make_service(fake_app)
+    notes = RawNotes(content="Customers need guest checkout.")
+
+    async def scenario():
+        results = await asyncio.gather(*(
+            service.transform_notes_to_stories(notes, 2) for _ in range(5)
+        ))
+        return results, service.single_flight.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert fake_app.state.stats["requests"] == 1
+    assert stats == {"in_flight": 0, "upstream_calls": 1, "coalesced": 4}
+    ids = [story.id for stories in results for story in stories]
+    assert len(ids) == 10 and len(set(ids)) == 10
+
+
+def test_bypass_request_does_not_join_a_shared_call(make_service):
+    fake_app = create_fake_openai_app(latency=0.2)
+    service = make_service(fake_app)
+    notes = RawNotes(content="Customers need guest checkout.")
+
+    async def scenario():
+        await asyncio.gather(service.transform_notes_to_stories(notes, 2),
+                             service.transform_notes_to_stories(notes, 2, use_cache=False))
+        return service.single_flight.stats()
+
+    stats = asyncio.run(scenario())
+    assert fake_app.state.stats["requests"] == 2
+    assert stats["upstream_calls"] == 1 and stats["coalesced"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("key", slow))
+        second = asyncio.ensure_future(flight.do("key", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    result, first_cancelled = asyncio.run(scenario())
+    assert result == "done"
+    assert first_cancelled
+    assert len(calls) == 1
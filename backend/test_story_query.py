@@ -0,0 +1,102 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import models
+from fake_llm import SAMPLE_STORIES
+from story_store import InMemoryStoryStore, SQLiteStoryStore, invest_score, matches, sort_key
+
+
+BASE_TIME = datetime(2024, 1, 1)
+FIELDS = ("independent", "negotiable", "valuable", "estimable", "small", "testable")
+
+
+def make_stories(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    stories = []
+    for i in range(count):
+        story = models.UserStory.model_validate(SAMPLE_STORIES[i % len(SAMPLE_STORIES)])
+        for field in FIELDS:
+            setattr(story.invest_criteria, field, rng.random() < 0.6)
+        story.test_status = rng.choice(list(models.TestStatus))
+        # Some stories share a timestamp to exercise the id tie-breaker
+        story.created_at = BASE_TIME + timedelta(seconds=i // 3, microseconds=rng.choice([0, 500]))
+        stories.append(story)
+    return stories
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = InMemoryStoryStore() if request.param == "memory" else SQLiteStoryStore(str(tmp_path / "q.db"))
+    store.add_many(make_stories(200))
+    return store
+
+
+QUERIES = [
+    {},
+    {"descending": True},
+    {"test_status": models.TestStatus.PASSED},
+    {"min_invest_score": 3, "max_invest_score": 4},
+    {"sort": models.StorySortField.INVEST_SCORE, "descending": True},
+    {"sort": models.StorySortField.INVEST_SCORE, "min_invest_score": 2, "test_status": models.TestStatus.FAILED},
+    {"created_after": BASE_TIME + timedelta(seconds=10), "created_before": BASE_TIME + timedelta(seconds=40)},
+]
+
+
+@pytest.mark.parametrize("params", QUERIES)
+def test_pages_match_full_sort(store, params):
+    query = models.StoryQuery(limit=7, **params)
+    expected = sorted((s for s in store.list() if matches(s, query)),
+                      key=lambda s: sort_key(s, query.sort), reverse=query.descending)
+
+    collected, cursor = [], None
+    while True:
+        page, cursor = store.query(query.model_copy(update={"cursor": cursor}))
+        assert len(page) <= 7
+        collected.extend(page)
+        if cursor is None:
+            break
+    assert [s.id for s in collected] == [s.id for s in expected]
+
+
+def test_invalid_cursor(store):
+    with pytest.raises(ValueError):
+        store.query(models.StoryQuery(cursor="not-a-cursor"))
+
+
+def test_aware_bounds_match_local_time(store):
+    after, before = BASE_TIME + timedelta(seconds=10), BASE_TIME + timedelta(seconds=40)
+    shifted = timezone(timedelta(hours=5))
+    aware = models.StoryQuery(limit=500, created_after=after.astimezone(shifted),
+                              created_before=before.astimezone(timezone.utc))
+    naive = models.StoryQuery(limit=500, created_after=after, created_before=before)
+    assert aware.created_after == after and aware.created_after.tzinfo is None
+    assert [s.id for s in store.query(aware)[0]] == [s.id for s in store.query(naive)[0]]
+
+
+def test_endpoint_pagination_and_projection(override_services):
+    store = InMemoryStoryStore()
+    store.add_many(make_stories(30))
+    override_services(story_store=store)
+    client = TestClient(main.app)
+
+    first = client.get("/user_stories", params={"limit": 10, "fields": "id,title,invest_criteria"})
+    assert first.status_code == 200
+    assert len(first.json()) == 10
+    assert set(first.json()[0]) == {"id", "title", "invest_criteria"}
+
+    second = client.get("/user_stories", params={"limit": 10, "cursor": first.headers["X-Next-Cursor"]})
+    assert {s["id"] for s in second.json()}.isdisjoint(s["id"] for s in first.json())
+    assert "acceptance_criteria" in second.json()[0]
+
+    high = client.get("/user_stories", params={"min_invest_score": 5, "fields": "id"}).json()
+    assert all(invest_score(store.get(s["id"])) >= 5 for s in high)
+
+    assert len(client.get("/user_stories").json()) == 30
+    assert client.get("/user_stories", params={"fields": "nope"}).status_code == 400
+    assert client.get("/user_stories", params={"cursor": "bad"}).status_code == 400
+    aware = client.get("/user_stories", params={"created_after": "2024-01-01T00:00:05+00:00", "fields": "id"})
+    assert aware.status_code == 200
@@ -0,0 +1,67 @@
+import copy
+import json
+import asyncio
+
+import httpx
+
+import main
+from fake_llm import SAMPLE_STORIES
+from models import RawNotes, TransformRequest
+
+
+BAD_TITLE = dict(copy.deepcopy(SAMPLE_STORIES[1]), title="Payment error messages")
+FIXED = dict(copy.deepcopy(SAMPLE_STORIES[1]))
+
+
+def transform(notes: str, bypass_cache: bool = False):
+    request = TransformRequest(notes=RawNotes(content=notes), bypass_cache=bypass_cache)
+    return asyncio.run(main.process_transform(request))
+
+
+def test_failing_story_is_repaired_in_place(use_fake_llm):
+    fake_app = use_fake_llm(stories=[BAD_TITLE, SAMPLE_STORIES[0]])
+    fake_app.state.repaired_story = FIXED
+    response = transform("Payment and checkout notes")
+
+    assert [story.title for story in response.user_stories] == [FIXED["title"], SAMPLE_STORIES[0]["title"]]
+    assert response.repaired_count == 1 and response.rejected_count == 0
+    assert main.services.story_store.count() == 2
+    assert fake_app.state.stats["requests"] == 2
+
+    # The repair call carries only the failing story and its errors
+    repair_request = fake_app.state.last_request
+    assert repair_request["max_tokens"] == main.services.llm_service.repair_max_tokens
+    prompt = repair_request["messages"][1]["content"]
+    assert "title: Title must follow format" in prompt
+    assert BAD_TITLE["title"] in prompt and "Payment and checkout notes" not in prompt
+
+
+def test_retry_budget_is_bounded(monkeypatch, use_fake_llm):
+    monkeypatch.setenv("STORY_REPAIR_ATTEMPTS", "3")
+    fake_app = use_fake_llm(stories=[BAD_TITLE])
+    fake_app.state.repaired_story = BAD_TITLE
+
+    response = transform("Payment notes", bypass_cache=True)
+    assert response.user_stories == [] and response.rejected_count == 1
+    assert fake_app.state.stats["requests"] == 1 + 3
+
+    monkeypatch.setenv("STORY_REPAIR_ATTEMPTS", "0")
+    response = transform("Other payment notes", bypass_cache=True)
+    assert response.rejected_count == 1
+    assert fake_app.state.stats["requests"] == 1 + 3 + 1
+
+
+def test_stream_emits_repaired_stories(use_fake_llm):
+    use_fake_llm(stories=[BAD_TITLE, SAMPLE_STORIES[0]]).state.repaired_story = FIXED
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+            response = await client.post("/transform_notes/stream",
+                                         json={"notes": {"content": "Payment notes"}})
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    events = asyncio.run(scenario())
+    stories = [event for event in events if event["type"] == "user_story"]
+    assert [event.get("repaired", False) for event in stories] == [False, True]
+    assert events[-1]["repaired_count"] == 1 and events[-1]["story_count"] == 2
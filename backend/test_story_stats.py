@@ -0,0 +1,67 @@
+import random
+
+from fastapi.testclient import TestClient
+
+import main
+import models
+from fake_llm import SAMPLE_STORIES
+from story_stats import StoryStats
+from story_store import InMemoryStoryStore, SQLiteStoryStore
+
+
+def make_story(rng: random.Random) -> models.UserStory:
+    story = models.UserStory.model_validate(SAMPLE_STORIES[0])
+    for field in ("independent", "negotiable", "valuable", "estimable", "small", "testable"):
+        setattr(story.invest_criteria, field, rng.random() < 0.7)
+    story.test_status = rng.choice(list(models.TestStatus))
+    return story
+
+
+def exercise(store, rng: random.Random, operations: int = 500):
+    ids = []
+    for _ in range(operations):
+        action = rng.random()
+        if action < 0.5 or not ids:
+            batch = [make_story(rng) for _ in range(rng.randint(1, 5))]
+            store.add_many(batch)
+            ids.extend(story.id for story in batch)
+        elif action < 0.8:
+            story = store.get(rng.choice(ids))
+            story.test_status = rng.choice(list(models.TestStatus))
+            store.update(story)
+        else:
+            store.delete(ids.pop(rng.randrange(len(ids))))
+
+
+def test_running_counters_match_full_recompute(tmp_path):
+    for store in (InMemoryStoryStore(), SQLiteStoryStore(str(tmp_path / "stats.db"))):
+        exercise(store, random.Random(7))
+        assert store.stats.consistency_errors(store.list()) == []
+        assert store.stats.snapshot() == StoryStats.from_stories(store.list()).snapshot()
+
+
+def test_sqlite_stats_seeded_on_restart(tmp_path):
+    path = str(tmp_path / "stats.db")
+    store = SQLiteStoryStore(path)
+    exercise(store, random.Random(3), operations=100)
+    assert SQLiteStoryStore(path).stats.snapshot() == store.stats.snapshot()
+
+
+def test_stats_endpoint(override_services):
+    store = InMemoryStoryStore()
+    override_services(story_store=store)
+    client = TestClient(main.app)
+    assert client.get("/stats").json() == {
+        "total_stories": 0, "test_status_breakdown": {}, "invest_compliance": {}, "duplicate_stories": 0
+    }
+
+    story = models.UserStory.model_validate(SAMPLE_STORIES[0])
+    store.add(story)
+    client.put(f"/user_stories/{story.id}/acceptance_test", json={"test_status": "passed"})
+    stats = client.get("/stats", params={"verify": True}).json()
+    assert stats["total_stories"] == 1
+    assert stats["test_status_breakdown"] == {"passed": 1}
+    assert stats["invest_compliance"]["testable"] == 100.0
+
+    client.delete(f"/user_stories/{story.id}")
+    assert client.get("/stats", params={"verify": True}).json()["total_stories"] == 0
@@ -0,0 +1,64 @@
+import pytest
+
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+import models
+from story_store import InMemoryStoryStore, SQLiteStoryStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryStoryStore()
+    return SQLiteStoryStore(str(tmp_path / "stories.db"))
+
+
+def make_story(index: int = 0) -> UserStory:
+    return UserStory.model_validate(SAMPLE_STORIES[index % len(SAMPLE_STORIES)])
+
+
+def test_crud_round_trip(store):
+    stories = [make_story(i) for i in range(3)]
+    store.add_many(stories)
+    assert len(store) == 3
+    assert stories[1].id in store
+    assert store.get(stories[1].id) == stories[1]
+    assert [story.id for story in store.list()] == [story.id for story in stories]
+
+    story = store.get(stories[0].id)
+    story.test_status = models.TestStatus.PASSED
+    store.update(story)
+    assert store.get(stories[0].id).test_status == models.TestStatus.PASSED
+
+    assert store.delete(stories[2].id)
+    assert not store.delete(stories[2].id)
+    assert store.get(stories[2].id) is None
+    assert len(store) == 2
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = str(tmp_path / "stories.db")
+    story = make_story()
+    SQLiteStoryStore(path).add(story)
+
+    reopened = SQLiteStoryStore(path)
+    assert reopened.get(story.id) == story
+    assert reopened._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sqlite_indexes_follow_other_writers(tmp_path):
+    path = str(tmp_path / "stories.db")
+    worker, other = SQLiteStoryStore(path), SQLiteStoryStore(path)
+    first, second = make_story(0), make_story(1)
+    worker.add(first)
+
+    other.add(second)
+    assert worker.stats.snapshot()["total_stories"] == 2
+    assert [story_id for story_id, _ in worker.search.search("payment error")] == [second.id]
+    assert worker.duplicates.find(second.model_copy(update={"id": "copy"}))[0] == second.id
+
+    other.delete(first.id)
+    worker.update(second.model_copy(update={"test_status": models.TestStatus.PASSED}))
+    assert worker.stats.snapshot()["total_stories"] == 1
+    assert worker.stats.consistency_errors(worker.list()) == []
+    assert worker.search.search("guest") == []
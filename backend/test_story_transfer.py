@@ -0,0 +1,177 @@
+import io
+import json
+import asyncio
+import zipfile
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+import main
+from fake_llm import SAMPLE_STORIES
+from models import UserStory
+from rules_engine import RulesEngine
+from story_store import InMemoryStoryStore, SQLiteStoryStore
+from story_transfer import (
+    StoryImporter, StreamingZipWriter, export_ndjson, feature_filename, ndjson_lines, to_feature,
+)
+
+
+def make_stories(count: int):
+    return [UserStory.model_validate(SAMPLE_STORIES[i % len(SAMPLE_STORIES)]) for i in range(count)]
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+async def body(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_ndjson_lines_are_split_across_chunks():
+    lines = asyncio.run(collect(ndjson_lines(body(b'{"a"', b': 1}\n\n{"b": 2}\n{"c"', b": 3}"), 100)))
+    assert lines == [(1, b'{"a": 1}'), (3, b'{"b": 2}'), (4, b'{"c": 3}')]
+
+
+def test_overlong_lines_are_not_buffered():
+    chunks = body(b'{"a": 1}\n' + b"x" * 6, b"x" * 6, b"x" * 6 + b'\n{"b": 2}\n', b"y" * 20)
+    lines = asyncio.run(collect(ndjson_lines(chunks, 10)))
+    assert lines == [(1, b'{"a": 1}'), (2, None), (3, b'{"b": 2}'), (4, None)]
+
+    story = make_stories(1)[0].model_dump_json()
+    store = InMemoryStoryStore()
+    result = asyncio.run(StoryImporter(store, RulesEngine(), max_line_bytes=len(story))
+                         .run(body(f"{story}\n{story} \n".encode())))
+    assert (result.imported, result.invalid) == (1, 1)
+    assert result.failures[0].line == 2 and result.failures[0].errors[0]["field"] == "line"
+
+
+def test_export_reads_one_page_at_a_time_and_round_trips(tmp_path):
+    source = SQLiteStoryStore(str(tmp_path / "source.db"))
+    stories = make_stories(23)
+    source.add_many(stories)
+    chunks = asyncio.run(collect(export_ndjson(source, chunk_size=10)))
+    assert [chunk.count(b"\n") for chunk in chunks] == [10, 10, 3]
+
+    target = InMemoryStoryStore()
+    result = asyncio.run(StoryImporter(target, RulesEngine(), chunk_size=7).run(body(*chunks)))
+    assert (result.imported, result.invalid, result.rejected) == (23, 0, 0)
+    assert {story.id: story for story in target.list()} == {story.id: story for story in stories}
+    source.close()
+
+
+def test_import_reports_invalid_and_rejected_lines():
+    good, bad = make_stories(2)
+    bad.title = "Not a user story"
+    lines = [good.model_dump_json(), "{not json", json.dumps({"title": "missing fields"}), bad.model_dump_json()]
+    store = InMemoryStoryStore()
+    result = asyncio.run(StoryImporter(store, RulesEngine(), chunk_size=2).run(body("\n".join(lines).encode())))
+    assert (result.imported, result.invalid, result.rejected) == (1, 2, 1)
+    assert [failure.line for failure in result.failures] == [2, 3, 4]
+    assert result.failures[2].id == bad.id and result.failures[2].errors[0]["field"] == "title"
+    assert [story.id for story in store.list()] == [good.id]
+
+
+def test_replaced_stories_are_published_as_updated(tmp_path):
+    existing, new = make_stories(2)
+    lines = "\n".join(story.model_dump_json() for story in (existing, new)).encode()
+    for store in (InMemoryStoryStore(), SQLiteStoryStore(str(tmp_path / "stories.db"))):
+        store.add(existing)
+        start = store.changes.version
+        asyncio.run(StoryImporter(store, RulesEngine()).run(body(lines)))
+        events, _ = store.changes.since(start)
+        assert [(event.type, [story["id"] for story in json.loads(event.frame.split("data: ", 1)[1])["stories"]])
+                for event in events] == [("created", [new.id]), ("updated", [existing.id])]
+        store.close()
+
+
+def test_import_normalizes_aware_timestamps():
+    first, second = make_stories(2)
+    line = json.loads(first.model_dump_json())
+    line["created_at"], line["updated_at"] = "2020-01-01T00:00:00Z", "2020-01-02T12:00:00+02:00"
+    store = InMemoryStoryStore()
+    result = asyncio.run(StoryImporter(store, RulesEngine()).run(body(json.dumps(line).encode())))
+    assert result.imported == 1
+    imported = store.get(first.id)
+    assert imported.created_at == datetime(2020, 1, 1, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    assert imported.updated_at.tzinfo is None
+
+    # Later writes still compare against the stored timestamps
+    store.add(second)
+    assert store.count() == 2 and second.id in {story.id for story in store.list()}
+
+
+def test_feature_text():
+    story = make_stories(1)[0]
+    text = to_feature(story)
+    assert text.startswith(f"# id: {story.id}\n@not_tested\nFeature: {story.title}\n")
+    for scenario in story.acceptance_criteria:
+        assert f"  Scenario: {scenario.scenario_title}\n" in text
+        for step in scenario.steps:
+            assert f"    {step.keyword.value} {step.text}\n" in text
+
+
+def test_feature_file_names_and_lines_cannot_escape():
+    story = make_stories(1)[0]
+    assert feature_filename(story) == f"{story.id}.feature"
+    for unsafe in ("../../etc/cron.d/x", "/abs", "a\\b", "..", ".hidden", "x" * 200, ""):
+        name = feature_filename(story.model_copy(update={"id": unsafe}))
+        assert name.startswith("story-") and "/" not in name and "\\" not in name
+
+    story.title = "As a user\nScenario: injected"
+    story.acceptance_criteria[0].steps[0].text = "a step\n    Then injected"
+    text = to_feature(story)
+    assert "Feature: As a user Scenario: injected\n" in text and "a step Then injected\n" in text
+    assert "\n    Then injected" not in text
+
+
+def test_import_rejects_unsafe_ids():
+    lines = []
+    for story_id in ("../evil", "ok-id_1.2", ".hidden"):
+        story = make_stories(1)[0]
+        story.id = story_id
+        lines.append(story.model_dump_json())
+    store = InMemoryStoryStore()
+    result = asyncio.run(StoryImporter(store, RulesEngine()).run(body("\n".join(lines).encode())))
+    assert (result.imported, result.invalid) == (1, 2)
+    assert [(failure.line, failure.errors[0]["field"]) for failure in result.failures] == [(1, "id"), (3, "id")]
+    assert [story.id for story in store.list()] == ["ok-id_1.2"]
+
+
+def test_zip_writer_switches_to_zip64_past_65535_members():
+    writer = StreamingZipWriter()
+    data = io.BytesIO()
+    for i in range(70000):
+        data.write(writer.add(f"{i}.feature", f"Feature: {i}\n".encode(), datetime(2024, 1, 2, 3, 4, 6)))
+    data.write(writer.finish())
+    archive = zipfile.ZipFile(data)
+    assert len(archive.infolist()) == 70000 and archive.testzip() is None
+    assert archive.read("69999.feature") == b"Feature: 69999\n"
+    assert archive.getinfo("0.feature").date_time == (2024, 1, 2, 3, 4, 6)
+
+
+def test_export_and_import_endpoints(monkeypatch, override_services):
+    store = InMemoryStoryStore()
+    stories = make_stories(5)
+    store.add_many(stories)
+    override_services(story_store=store)
+    monkeypatch.setenv("TRANSFER_CHUNK_SIZE", "2")
+    client = TestClient(main.app)
+
+    exported = client.get("/export")
+    assert exported.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["id"] for line in exported.text.splitlines()] == [story.id for story in stories]
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get("/export", params={"format": "feature", "zip": True}).content))
+    assert sorted(archive.namelist()) == sorted(f"{story.id}.feature" for story in stories)
+    assert archive.read(f"{stories[0].id}.feature").decode() == to_feature(stories[0])
+    assert client.get("/export", params={"format": "feature"}).text.count("Feature: ") == 5
+    assert client.get("/export", params={"zip": True}).status_code == 400
+
+    target = InMemoryStoryStore()
+    override_services(story_store=target)
+    response = client.post("/import", content=exported.content, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.json()["imported"] == 5
+    assert target.count() == 5 and target.stats.snapshot() == store.stats.snapshot()
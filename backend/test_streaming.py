@@ -0,0 +1,83 @@
+import json
+import asyncio
+import time
+
+import httpx
+
+import main
+from fake_llm import create_fake_openai_app, SAMPLE_STORIES
+from load_test import start_fake_server
+from llm_service_simple import LLMService
+from metrics import metrics
+from models import RawNotes
+from response_cache import ResponseCache
+from stream_parser import JSONArrayStreamParser
+
+
+def test_parser_handles_arbitrary_chunk_boundaries():
+    text = 'Sure! Here you go:\n[{"a": "x}]{", "b": [1, {"c": "\\"q\\""}]}, {"a": 2}]\ntrailing'
+    for size in (1, 2, 5, len(text)):
+        parser = JSONArrayStreamParser()
+        objects = []
+        for i in range(0, len(text), size):
+            objects.extend(parser.feed(text[i:i + size]))
+        assert objects == [{"a": "x}]{", "b": [1, {"c": '"q"'}]}, {"a": 2}]
+        assert parser.finished
+
+
+def test_parser_skips_malformed_elements():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"a": 1,}, {"a": 2}]') == [{"a": 2}]
+
+
+def test_stream_endpoint_emits_flags_then_stories(use_fake_llm):
+    use_fake_llm(latency=0.1)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+            response = await client.post("/transform_notes/stream", json={"notes": {"content": "Guest checkout"}})
+            return [json.loads(line) for line in response.text.splitlines() if line]
+
+    events = asyncio.run(scenario())
+    assert [event["type"] for event in events] == ["ambiguity_flags", "user_story", "user_story", "done"]
+    assert events[1]["user_story"]["title"] == SAMPLE_STORIES[0]["title"]
+    assert events[1]["user_story"]["id"] in main.services.story_store
+
+
+def test_first_story_arrives_before_completion_ends():
+    base_url = start_fake_server(latency=1.0)
+
+    async def scenario():
+        service = LLMService(api_key="test-key", base_url=base_url, cache=ResponseCache())
+        arrivals = []
+        started = time.perf_counter()
+        async for _ in service.stream_stories(RawNotes(content="Guest checkout")):
+            arrivals.append(time.perf_counter() - started)
+        total = time.perf_counter() - started
+        await service.aclose()
+        return arrivals, total
+
+    arrivals, total = asyncio.run(scenario())
+    assert len(arrivals) == 2
+    assert arrivals[0] < total * 0.75
+
+
+def test_closing_stream_early_frees_the_slot_and_drops_server_fields(make_service):
+    stories = [dict(story, id="../model-chosen", test_status="passed") for story in SAMPLE_STORIES]
+    service = make_service(create_fake_openai_app(latency=0.2, stories=stories), max_concurrency=1)
+
+    async def scenario():
+        with metrics.track() as timings:
+            stories = service.stream_stories(RawNotes(content="Guest checkout"))
+            first = await stories.__anext__()
+            await stories.aclose()
+        # The only slot is free again, so a second stream can start
+        second = [story async for story in service.stream_stories(RawNotes(content="Guest checkout"),
+                                                                  use_cache=False)]
+        return first, second, timings
+
+    first, second, timings = asyncio.run(asyncio.wait_for(scenario(), timeout=10))
+    assert first.id != "../model-chosen" and first.test_status.value == "not_tested"
+    assert len(second) == 2 and len({story.id for story in [first, *second]}) == 3
+    assert {"llm_wait", "llm_call"} <= set(timings)
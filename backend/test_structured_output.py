@@ -0,0 +1,72 @@
+import asyncio
+import copy
+import json
+
+from fake_llm import SAMPLE_STORIES, create_fake_openai_app
+from models import RawNotes
+from structured_output import STORIES_RESPONSE_FORMAT, parse_stories
+
+
+def walk_objects(node):
+    if isinstance(node, dict):
+        if node.get("type") == "object":
+            yield node
+        for child in node.values():
+            yield from walk_objects(child)
+    elif isinstance(node, list):
+        for child in node:
+            yield from walk_objects(child)
+
+
+def test_schema_is_strict_and_excludes_server_fields():
+    schema = STORIES_RESPONSE_FORMAT["json_schema"]["schema"]
+    for node in walk_objects(schema):
+        assert node["additionalProperties"] is False
+        assert node["required"] == list(node["properties"])
+    story = schema["$defs"]["UserStory"]
+    assert "id" not in story["properties"] and "test_status" not in story["properties"]
+    assert "TestStatus" not in schema["$defs"]
+    assert "default" not in json.dumps(schema)
+
+
+def test_parses_envelope_array_and_wrapped_answers():
+    envelope = json.dumps({"user_stories": SAMPLE_STORIES})
+    array = json.dumps(SAMPLE_STORIES)
+    fenced = f"Here are your stories:\n```json\n{array}\n```"
+    for content in (envelope, envelope.encode(), array, fenced):
+        stories, dropped = parse_stories(content)
+        assert [story.title for story in stories] == [story["title"] for story in SAMPLE_STORIES]
+        assert dropped == 0
+    assert parse_stories("Sorry, I can't help with that") == ([], 0)
+
+
+def test_malformed_story_is_salvaged_individually():
+    broken = copy.deepcopy(SAMPLE_STORIES)
+    broken[0]["acceptance_criteria"][0]["steps"][0]["keyword"] = "Whenever"
+    stories, dropped = parse_stories(json.dumps({"user_stories": broken}))
+    assert [story.title for story in stories] == [SAMPLE_STORIES[1]["title"]]
+    assert dropped == 1
+
+    # An answer cut off by max_tokens keeps the stories that were completed
+    truncated = json.dumps({"user_stories": SAMPLE_STORIES})[:-60]
+    stories, dropped = parse_stories(truncated)
+    assert [story.title for story in stories] == [SAMPLE_STORIES[0]["title"]]
+    assert dropped == 1
+
+
+def test_service_requests_schema_and_keeps_valid_stories(monkeypatch, make_service):
+    broken = copy.deepcopy(SAMPLE_STORIES)
+    del broken[1]["invest_criteria"]
+    fake_app = create_fake_openai_app(latency=0, stories=broken)
+
+    async def scenario(structured: str):
+        monkeypatch.setenv("LLM_STRUCTURED_OUTPUT", structured)
+        return await make_service(fake_app).transform_notes_to_stories(RawNotes(content="Guest checkout"))
+
+    stories = asyncio.run(scenario("true"))
+    assert [story.title for story in stories] == [SAMPLE_STORIES[0]["title"]]
+    assert fake_app.state.last_request["response_format"] == STORIES_RESPONSE_FORMAT
+
+    stories = asyncio.run(scenario("false"))
+    assert len(stories) == 1
+    assert "response_format" not in fake_app.state.last_request
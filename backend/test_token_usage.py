@@ -0,0 +1,61 @@
+import json
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from fake_llm import CHARS_PER_TOKEN
+from llm_service_simple import SYSTEM_PROMPT, LLMService
+from models import RawNotes, TransformRequest
+
+
+def test_static_prefix_is_identical_across_requests():
+    service = LLMService(api_key="test-key")
+    first = service._completion_params(RawNotes(content="Guest checkout"), 3)
+    second = service._completion_params(RawNotes(content="Refunds", context="Back office"), 7)
+
+    assert first["messages"][0] == second["messages"][0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert first.get("response_format") == second.get("response_format")
+    # Request-specific text only starts in the user message
+    assert first["messages"][1]["content"].startswith("Raw Notes:\nGuest checkout")
+    assert "7 or fewer" in second["messages"][1]["content"]
+
+
+def test_usage_per_request_and_cumulative(use_fake_llm):
+    use_fake_llm()
+
+    def transform(notes: str):
+        request = TransformRequest(notes=RawNotes(content=notes))
+        return asyncio.run(main.process_transform(request)).token_usage
+
+    first = transform("Guest checkout notes")
+    assert first.llm_calls == 1 and first.cached_tokens == 0
+    assert first.total_tokens == first.prompt_tokens + first.completion_tokens > 0
+
+    # The fake server reports a repeated system prompt as cached
+    second = transform("Refund notes")
+    assert second.cached_tokens == len(SYSTEM_PROMPT) // CHARS_PER_TOKEN
+
+    # Response cache hits spend nothing
+    assert transform("Guest checkout notes").llm_calls == 0
+
+    totals = TestClient(main.app).get("/token_usage").json()
+    assert totals["llm_calls"] == 2 and totals["stories"] == 4
+    assert totals["prompt_tokens"] == first.prompt_tokens + second.prompt_tokens
+    assert totals["cached_prompt_ratio"] == second.cached_tokens / totals["prompt_tokens"]
+    assert totals["tokens_per_story"] == totals["total_tokens"] / 4
+
+
+def test_stream_reports_usage(use_fake_llm):
+    use_fake_llm()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+            response = await client.post("/transform_notes/stream", json={"notes": {"content": "Guest checkout"}})
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    usage = asyncio.run(scenario())[-1]["token_usage"]
+    assert usage["llm_calls"] == 1 and usage["completion_tokens"] > 0
+    assert main.services.llm_service.usage.totals.llm_calls == 1
@@ -0,0 +1,72 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from models import TokenUsage
+
+
+# Usage of the request currently being processed; tasks started for it inherit the same object
+_current_usage: ContextVar[Optional[TokenUsage]] = ContextVar("current_usage", default=None)
+
+
+def _add(totals: TokenUsage, prompt: int, completion: int, cached: int):
+    totals.llm_calls += 1
+    totals.prompt_tokens += prompt
+    totals.completion_tokens += completion
+    totals.cached_tokens += cached
+    totals.total_tokens += prompt + completion
+
+
+class UsageTracker:
+    """Token counters from completion ``usage``, per request and since startup
+
+    Per-request totals are collected with ``track()``, which binds a fresh
+    ``TokenUsage`` to the current context. Completions made inside it,
+    including those in tasks it spawns, add to it. Callers served from
+    the response cache or coalesced into another caller's completion
+    spend nothing.
+    """
+
+    def __init__(self):
+        self.totals = TokenUsage()
+        self.stories = 0
+
+    @contextmanager
+    def track(self) -> Iterator[TokenUsage]:
+        usage = TokenUsage()
+        previous = _current_usage.get()
+        # Restored with set() rather than reset(): a streaming response's generator may be
+        # closed from another context when the client disconnects
+        _current_usage.set(usage)
+        try:
+            yield usage
+        finally:
+            _current_usage.set(previous)
+
+    def record(self, usage: Any):
+        """Add an OpenAI ``CompletionUsage`` (None when the server doesn't report it)"""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        counts = (
+            usage.prompt_tokens or 0,
+            usage.completion_tokens or 0,
+            (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+        )
+        _add(self.totals, *counts)
+        current = _current_usage.get()
+        if current is not None:
+            _add(current, *counts)
+
+    def record_stories(self, count: int):
+        """Count stories produced by completions, for the cost per story"""
+        self.stories += count
+
+    def stats(self) -> Dict[str, Any]:
+        totals = self.totals
+        return {
+            **totals.model_dump(),
+            "stories": self.stories,
+            "cached_prompt_ratio": totals.cached_tokens / totals.prompt_tokens if totals.prompt_tokens else 0.0,
+            "tokens_per_story": totals.total_tokens / self.stories if self.stories else 0.0
+        }
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import NotesInput from './components/NotesInput.jsx'
 import UserStoryCard from './components/UserStoryCard.jsx'
 import AmbiguityAlert from './components/AmbiguityAlert.jsx'
@@ -39,28 +39,66 @@ function App() {
     }
   }
 
-  const fetchUserStories = async () => {
+  const upsertStories = (stories, changed) => {
+    const byId = new Map(changed.map(story => [story.id, story]))
+    const updated = stories.map(story => {
+      const change = byId.get(story.id)
+      byId.delete(story.id)
+      return change || story
+    })
+    return [...updated, ...byId.values()]
+  }
+
+  const applyChange = (stories, type, data) => {
+    if (type === 'created' || type === 'updated') {
+      return upsertStories(stories, data.stories)
+    } else if (type === 'deleted') {
+      const deleted = new Set(data.story_ids)
+      return stories.filter(story => !deleted.has(story.id))
+    } else if (type === 'cleared') {
+      return []
+    }
+    return stories
+  }
+
+  // Changes pushed while the backlog is loading, replayed on top of it once it arrives
+  const pendingChanges = useRef(null)
+
+  const fetchUserStories = async (refreshStats = false) => {
+    const pending = []
+    pendingChanges.current = pending
     try {
       const stories = await ApiService.getUserStories()
-      setUserStories(stories)
-      await fetchStats()
+      if (pendingChanges.current !== pending) return  // a newer load replaced this one
+      setUserStories(pending.reduce((current, [type, data]) => applyChange(current, type, data), stories))
+      if (refreshStats) await fetchStats()
     } catch (error) {
       showMessage("Failed to fetch user stories", "error")
+    } finally {
+      if (pendingChanges.current === pending) pendingChanges.current = null
     }
   }
 
   useEffect(() => {
-    fetchUserStories()
+    // Load the backlog once, then apply the changes the server pushes
+    return ApiService.subscribeToChanges((type, data) => {
+      setStats(data.stats)
+      if (type === 'ready' || type === 'reset') {
+        fetchUserStories()
+        return
+      }
+      pendingChanges.current?.push([type, data])
+      setUserStories(prev => applyChange(prev, type, data))
+    })
   }, [])
 
   const handleTransform = async (transformRequest) => {
     setIsLoading(true)
     try {
       const result = await ApiService.transformNotes(transformRequest)
-      setUserStories(result.user_stories)
+      setUserStories(prev => upsertStories(prev, result.user_stories))
       setAmbiguities(result.ambiguity_flags)
       setProcessingTime(result.processing_time)
-      await fetchStats()
       
       showMessage(`Generated ${result.user_stories.length} user stories in ${result.processing_time.toFixed(2)}s`)
     } catch (error) {
@@ -83,8 +121,6 @@ function App() {
         )
       )
       
-      await fetchStats()
-      
       showMessage(`Test status updated to ${testStatus.replace('_', ' ')}`)
     } catch (error) {
       showMessage(error.message, "error")
@@ -175,7 +211,7 @@ function App() {
                 <Badge variant="outline">{userStories.length}</Badge>
               </h2>
               <div className="flex gap-2">
-                <Button variant="outline" onClick={fetchUserStories}>
+                <Button variant="outline" onClick={() => fetchUserStories(true)}>
                   <RefreshCw className="h-4 w-4 mr-2" />
                   Refresh
                 </Button>
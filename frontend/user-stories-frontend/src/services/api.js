@@ -55,6 +55,17 @@ class ApiService {
     return response.json()
   }
 
+  subscribeToChanges(onEvent) {
+    // EventSource reconnects by itself and resumes from the Last-Event-ID header
+    const source = new EventSource(`${API_BASE_URL}/events`)
+    const types = ['ready', 'reset', 'created', 'updated', 'deleted', 'cleared']
+    types.forEach(type =>
+      source.addEventListener(type, event => onEvent(type, JSON.parse(event.data)))
+    )
+
+    return () => source.close()
+  }
+
   async validateStory(storyId) {
     const response = await fetch(`${API_BASE_URL}/validate_story/${storyId}`, {
       method: 'POST',